@@ -15,20 +15,54 @@ class AnnotationFormat(Enum):
     pass
 
 
+def intern_label(label):
+    """Interns label strings, so all annotations with the same label share one string object."""
+    return sys.intern(label) if type(label) is str else label
+
+
 class Annotation(ABC):
+    __slots__ = ('_label', '_instance', '_additional_labels', 'verified', 'auto_created')
+
     def __init__(self, **kwargs):
         self.label = '' if kwargs.get('label') is None else kwargs.get('label')
         self.instance = '' if kwargs.get('instance') is None else kwargs.get('instance')
-        self.additional_labels = [] if kwargs.get('additionalLabels') is None else kwargs.get('additionalLabels')
+        self.additional_labels = kwargs.get('additionalLabels')
         self.verified = False if kwargs.get('verified') is None else kwargs.get('verified')
         self.auto_created = False if kwargs.get('autoCreated') is None else kwargs.get('autoCreated')
 
+    @property
+    def label(self) -> str:
+        return self._label
+
+    @label.setter
+    def label(self, label: str):
+        self._label = intern_label(label)
+
+    @property
+    def instance(self) -> str:
+        return self._instance
+
+    @instance.setter
+    def instance(self, instance: str):
+        self._instance = intern_label(instance)
+
+    @property
+    def additional_labels(self) -> list:
+        # empty lists are only created when they are accessed
+        if self._additional_labels is None:
+            self._additional_labels = []
+        return self._additional_labels
+
+    @additional_labels.setter
+    def additional_labels(self, additional_labels: list):
+        self._additional_labels = [intern_label(label) for label in additional_labels] if additional_labels else None
+
     @abstractmethod
     def to_std_dict(self, annotation_format: AnnotationFormat = None) -> dict:
         return {
             'label': self.label,
             "instance": self.instance,
-            "additionalLabels": self.additional_labels,
+            "additionalLabels": [] if self._additional_labels is None else self._additional_labels,
             "verified": self.verified,
             "autoCreated": self.auto_created,
         }
@@ -42,7 +42,17 @@ class BoundingBoxFormat(AnnotationFormat):
 
 
 class BoundingBox(Annotation):
-    def __init__(self, box_values: tuple = None, box_format: BoundingBoxFormat = None, **kwargs):
+    __slots__ = ('format', 'box_values')
+    type = AnnotationType.BOUNDING_BOX.value
+
+    def __init__(self, box_values: tuple = None, box_format: BoundingBoxFormat = None,
+                 img_wh: Tuple[int, int] = None, **kwargs):
+        """Bounding box that stores its values in coco format.
+
+        :param box_values: four box values in the order of the format, read from kwargs if None
+        :param box_format: format of the box values, read from kwargs if None
+        :param img_wh: image width and height, only required for relative formats
+        """
         super().__init__(**kwargs)
 
         if box_values is not None and len(box_values) != 4:
@@ -60,20 +70,24 @@ class BoundingBox(Annotation):
             if box_values is None:
                 raise ValueError('There are no box values defined')
         # transform every format into coco format
-        self.box_values = transform_to_coco(box=box_values, box_format=self.format)
-
-        self.type = AnnotationType.BOUNDING_BOX.value
+        img_width, img_height = (None, None) if img_wh is None else img_wh
+        self.box_values = transform_to_coco(box=box_values, box_format=self.format,
+                                            img_width=img_width, img_height=img_height)
 
     def __repr__(self):
         n1, n2, n3, n4 = self.format.get_value_names()
         v1, v2, v3, v4 = self.box_values
         return 'BoundingBox[{},{}:{},{}:{},{}:{},{}:{}]'.format(self.format.value, n1, v1, n2, v2, n3, v3, n4, v4)
 
-    def to_std_dict(self, annotation_format: BoundingBoxFormat = None) -> dict:
+    def to_std_dict(self, annotation_format: BoundingBoxFormat = None,
+                    transform_cache: 'TransformCache' = None) -> dict:
         if annotation_format is None:
             annotation_format = self.format
         base_annotation = super().to_std_dict()
-        transformed_box_values = transform_from_coco(box=self.box_values, box_format=annotation_format)
+        if transform_cache is None:
+            transformed_box_values = transform_from_coco(box=self.box_values, box_format=annotation_format)
+        else:
+            transformed_box_values = transform_cache.transform(self, annotation_format)
         box_values_dict = box_values_to_dict(box=transformed_box_values, box_format=annotation_format)
         return {
             **base_annotation,
@@ -83,6 +97,24 @@ class BoundingBox(Annotation):
         }
 
 
+class TransformCache:
+    """Caches transformed box values of an image, so every box is transformed only once per format.
+
+    Used if several writers need the same format. Create a new cache for every image.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self):
+        self.values = {}
+
+    def transform(self, box: BoundingBox, box_format: BoundingBoxFormat, img_wh: Tuple[int, int] = None) -> tuple:
+        key = (id(box), box_format)
+        values = self.values.get(key)
+        if values is None:
+            values = self.values[key] = transform_from_coco(box=box.box_values, box_format=box_format, img_wh=img_wh)
+        return values
+
+
 def box_values_to_dict(box: tuple, box_format: BoundingBoxFormat):
     """Converts the box values to a dict.
 
@@ -113,8 +145,8 @@ def transform_from_coco(box: tuple, box_format: AnnotationFormat, img_wh: Tuple[
     if len(box) != 4:
         raise ValueError('There only must be four box values')
 
-    if box_format is (BoundingBoxFormat.RELATIVE_COCO or BoundingBoxFormat.RELATIVE_VOC
-                      or BoundingBoxFormat.RELATIVE_CENTER):
+    if box_format in (BoundingBoxFormat.RELATIVE_COCO, BoundingBoxFormat.RELATIVE_VOC,
+                      BoundingBoxFormat.RELATIVE_CENTER):
         if img_wh is None or len(img_wh) != 2:
             raise ValueError('Image width and height must be defined if a relative transformation is desired')
 
@@ -140,10 +172,10 @@ def transform_to_coco(box: tuple, box_format: AnnotationFormat,
         raise ValueError('Box value and format must be present')
     if len(box) != 4:
         raise ValueError('There only must be four box values')
-    if box_format is (BoundingBoxFormat.RELATIVE_COCO
-                      or BoundingBoxFormat.RELATIVE_VOC
-                      or BoundingBoxFormat.RELATIVE_CENTER):
-        if img_width or img_height is None:
+    if box_format in (BoundingBoxFormat.RELATIVE_COCO,
+                      BoundingBoxFormat.RELATIVE_VOC,
+                      BoundingBoxFormat.RELATIVE_CENTER):
+        if img_width is None or img_height is None:
             raise ValueError('Image width and height must be defined if a relative transformation is desired')
 
     if box_format is BoundingBoxFormat.COCO:
@@ -0,0 +1,241 @@
+"""Columnar storage for large amounts of bounding boxes.
+
+All boxes are stored in the coco format inside a single float array, so that format transformations
+are done for every box at once instead of calling the transformation functions box by box.
+
+The array is a library API for scripts: it is written by 'dsv_box_array_writer' and 'write_box_array', while
+'main.py' and 'dsv.py' process image objects.
+"""
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from annotation.base_annotation import AnnotationType
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat
+
+RELATIVE_FORMATS = (BoundingBoxFormat.RELATIVE_COCO, BoundingBoxFormat.RELATIVE_VOC, BoundingBoxFormat.RELATIVE_CENTER)
+
+
+def _check_boxes(boxes: np.ndarray) -> np.ndarray:
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if boxes.ndim != 2 or boxes.shape[1] != 4:
+        raise ValueError('There only must be four box values')
+    return boxes
+
+
+def _check_dimensions(box_format: BoundingBoxFormat, img_width, img_height, count: int):
+    if box_format not in RELATIVE_FORMATS:
+        return None, None
+    if img_width is None or img_height is None:
+        raise ValueError('Image width and height must be defined if a relative transformation is desired')
+    img_width = np.broadcast_to(np.asarray(img_width, dtype=np.float64), (count,))
+    img_height = np.broadcast_to(np.asarray(img_height, dtype=np.float64), (count,))
+    return img_width, img_height
+
+
+def transform_array_from_coco(boxes: np.ndarray, box_format: BoundingBoxFormat,
+                              img_width: np.ndarray = None, img_height: np.ndarray = None) -> np.ndarray:
+    """Transforms an array of coco boxes with the shape (n, 4) into any other supported format.
+
+    :param boxes: box values in coco format, one box per row
+    :param box_format: desired output format
+    :param img_width: image width per box or a single width for all boxes, only needed by relative formats
+    :param img_height: image height per box or a single height for all boxes, only needed by relative formats
+    :return: a new array with the transformed box values
+    """
+    boxes = _check_boxes(boxes)
+    img_width, img_height = _check_dimensions(box_format, img_width, img_height, len(boxes))
+    x, y, width, height = boxes.T
+    if box_format in (BoundingBoxFormat.COCO, BoundingBoxFormat.RELATIVE_COCO):
+        result = np.array(boxes)
+    elif box_format in (BoundingBoxFormat.VOC, BoundingBoxFormat.RELATIVE_VOC):
+        result = np.column_stack((x, y, x + width, y + height))
+    elif box_format in (BoundingBoxFormat.CENTER, BoundingBoxFormat.RELATIVE_CENTER):
+        result = np.column_stack((x + (width / 2), y + (height / 2), width, height))
+    else:
+        raise ValueError("Box format of type '{}' is not supported".format(box_format.value))
+    if img_width is not None:
+        result[:, 0::2] /= img_width[:, None]
+        result[:, 1::2] /= img_height[:, None]
+    return result
+
+
+def transform_array_to_coco(boxes: np.ndarray, box_format: BoundingBoxFormat,
+                            img_width: np.ndarray = None, img_height: np.ndarray = None) -> np.ndarray:
+    """Transforms an array of boxes with the shape (n, 4) from any supported format into the coco format.
+
+    :param boxes: box values in the given format, one box per row
+    :param box_format: format of the box values
+    :param img_width: image width per box or a single width for all boxes, only needed by relative formats
+    :param img_height: image height per box or a single height for all boxes, only needed by relative formats
+    :return: a new array with the box values in coco format
+    """
+    boxes = np.array(_check_boxes(boxes))
+    img_width, img_height = _check_dimensions(box_format, img_width, img_height, len(boxes))
+    if img_width is not None:
+        boxes[:, 0::2] *= img_width[:, None]
+        boxes[:, 1::2] *= img_height[:, None]
+    v1, v2, v3, v4 = boxes.T
+    if box_format in (BoundingBoxFormat.COCO, BoundingBoxFormat.RELATIVE_COCO):
+        return boxes
+    elif box_format in (BoundingBoxFormat.VOC, BoundingBoxFormat.RELATIVE_VOC):
+        return np.column_stack((v1, v2, v3 - v1, v4 - v2))
+    elif box_format in (BoundingBoxFormat.CENTER, BoundingBoxFormat.RELATIVE_CENTER):
+        return np.column_stack((v1 - (v3 / 2), v2 - (v4 / 2), v3, v4))
+    else:
+        raise ValueError("Box format of type '{}' is not supported".format(box_format.value))
+
+
+class BoundingBoxArray:
+    def __init__(self, boxes: np.ndarray, image_index: np.ndarray, label_codes: np.ndarray, labels: list[str],
+                 filenames: list[str], widths: np.ndarray, heights: np.ndarray, paths: list[Optional[str]] = None):
+        """Column store for the bounding boxes of a dataset.
+
+        Boxes have to be grouped by image, i.e. the image index must not decrease.
+
+        :param boxes: box values in coco format with the shape (n, 4)
+        :param image_index: index of the image for every box
+        :param label_codes: index into 'labels' for every box
+        :param labels: label table
+        :param filenames: filename per image
+        :param widths: width per image
+        :param heights: height per image
+        :param paths: folder path per image
+        """
+        self.boxes = _check_boxes(boxes)
+        self.image_index = np.asarray(image_index, dtype=np.int64)
+        self.label_codes = np.asarray(label_codes, dtype=np.int32)
+        self.labels = labels
+        self.filenames = filenames
+        self.widths = np.asarray(widths, dtype=np.float64)
+        self.heights = np.asarray(heights, dtype=np.float64)
+        self.paths = [None] * len(filenames) if paths is None else paths
+        if not (len(self.boxes) == len(self.image_index) == len(self.label_codes)):
+            raise ValueError('Every box needs an image index and a label code')
+        if not (len(self.filenames) == len(self.widths) == len(self.heights) == len(self.paths)):
+            raise ValueError('Every image needs a filename, width and height')
+        # boxes of image i are located in [image_offsets[i], image_offsets[i + 1])
+        self.image_offsets = np.searchsorted(self.image_index, np.arange(len(self.filenames) + 1))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __repr__(self):
+        return 'BoundingBoxArray[images:{},boxes:{},labels:{}]'.format(len(self.filenames), len(self), len(self.labels))
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.boxes[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.boxes[:, 1]
+
+    @property
+    def width(self) -> np.ndarray:
+        return self.boxes[:, 2]
+
+    @property
+    def height(self) -> np.ndarray:
+        return self.boxes[:, 3]
+
+    @property
+    def image_count(self) -> int:
+        return len(self.filenames)
+
+    def to_format(self, box_format: BoundingBoxFormat) -> np.ndarray:
+        """Returns all boxes transformed into the given format, relative formats use the size of each box's image."""
+        return transform_array_from_coco(self.boxes, box_format,
+                                         self.widths[self.image_index], self.heights[self.image_index])
+
+    def image_slice(self, index: int) -> slice:
+        """Gets the slice of all boxes that belong to the image with the given index."""
+        return slice(int(self.image_offsets[index]), int(self.image_offsets[index + 1]))
+
+    @classmethod
+    def from_images(cls, images: Iterable) -> 'BoundingBoxArray':
+        """Collects the bounding boxes of image objects, other annotation types are skipped."""
+        builder = _Builder()
+        for image in images:
+            builder.add_image(image.filename, image.width, image.height, image.path)
+            for annotation in image.annotations:
+                if isinstance(annotation, BoundingBox):
+                    builder.add_box(annotation.box_values, BoundingBoxFormat.COCO, annotation.label)
+        return builder.build()
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> 'BoundingBoxArray':
+        """Collects the bounding boxes of image records from the standard JSON without creating annotation objects.
+
+        :param records: image dicts like the ones in the 'images' array of the standard JSON
+        """
+        builder = _Builder()
+        for record in records:
+            builder.add_image(record['filename'], record['width'], record['height'], record.get('path'))
+            for annotation in record.get('annotations') or ():
+                if annotation.get('type') != AnnotationType.BOUNDING_BOX.value:
+                    continue
+                box_format = BoundingBoxFormat(annotation.get('format'))
+                values = tuple(annotation.get(key) for key in box_format.get_value_names())
+                if any(v is None for v in values):
+                    raise ValueError('There are no box values defined')
+                builder.add_box(values, box_format, annotation.get('label'))
+        return builder.build()
+
+
+class _Builder:
+    """Collects boxes in plain lists and converts them per format into coco at the end."""
+
+    def __init__(self):
+        self.values = []
+        self.formats = []
+        self.image_index = []
+        self.label_codes = []
+        self.label_table = {}
+        self.filenames = []
+        self.widths = []
+        self.heights = []
+        self.paths = []
+
+    def add_image(self, filename: str, width: int, height: int, path: Optional[str]) -> None:
+        if filename is None or width is None or height is None:
+            raise ValueError('Image filename, width and height are required')
+        self.filenames.append(filename)
+        self.widths.append(width)
+        self.heights.append(height)
+        self.paths.append(path)
+
+    def add_box(self, values: tuple, box_format: BoundingBoxFormat, label: Optional[str]) -> None:
+        label = '' if label is None else label
+        code = self.label_table.get(label)
+        if code is None:
+            code = self.label_table[label] = len(self.label_table)
+        self.values.append(values)
+        self.formats.append(box_format)
+        self.image_index.append(len(self.filenames) - 1)
+        self.label_codes.append(code)
+
+    def build(self) -> BoundingBoxArray:
+        boxes = np.array(self.values, dtype=np.float64).reshape(-1, 4)
+        image_index = np.array(self.image_index, dtype=np.int64)
+        widths = np.array(self.widths, dtype=np.float64)
+        heights = np.array(self.heights, dtype=np.float64)
+        # convert each group of boxes with the same format at once
+        formats = np.array([f.value for f in self.formats], dtype=object)
+        for box_format in set(self.formats):
+            if box_format is BoundingBoxFormat.COCO:
+                continue
+            mask = formats == box_format.value
+            boxes[mask] = transform_array_to_coco(boxes[mask], box_format,
+                                                  widths[image_index[mask]], heights[image_index[mask]])
+        return BoundingBoxArray(boxes=boxes, image_index=image_index, label_codes=self.label_codes,
+                                labels=list(self.label_table), filenames=self.filenames,
+                                widths=widths, heights=heights, paths=self.paths)
+
+
+def iter_rows(box_array: BoundingBoxArray, box_format: BoundingBoxFormat) -> Iterator[tuple[int, list[list]]]:
+    """Yields the image index and the transformed box values as lists for every image."""
+    values = box_array.to_format(box_format).tolist()
+    offsets = box_array.image_offsets.tolist()
+    for index in range(box_array.image_count):
+        yield index, values[offsets[index]:offsets[index + 1]]
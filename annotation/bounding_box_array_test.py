@@ -0,0 +1,75 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from annotation.bounding_box import BoundingBoxFormat, transform_from_coco
+from annotation.bounding_box_array import BoundingBoxArray, transform_array_from_coco, transform_array_to_coco
+from image import Image
+from writer.delimiter_separated_values import box_array_image_strs, dsv_box_array_writer, dsv_image_str, \
+    dsv_writer, image_sv
+
+
+class TestBoundingBoxArray(TestCase):
+    config = {'delimiter': ',', 'lineTerminator': '\r\n', 'ignoreEmptyClass': False, 'classAtEnd': True,
+              'defaultClass': 'unk', 'quoting': True, 'quoteChar': '"', 'withPath': True, 'pathAtEnd': False,
+              'annotationPerLine': True, 'annotationDelimiter': ' ', 'classMapping': {'Cat': 0}}
+
+    def records(self):
+        return [
+            {'filename': '1.png', 'width': 960, 'height': 540, 'annotations': [
+                {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 128, 'y': 216, 'width': 201, 'height': 35},
+                {'type': 'boundingBox', 'format': 'voc', 'label': 'Dog', 'xMin': 1, 'yMin': 2, 'xMax': 5, 'yMax': 9}]},
+            {'filename': '2.png', 'width': 640, 'height': 480, 'annotations': []},
+            {'filename': '3.png', 'width': 640, 'height': 480, 'annotations': [
+                {'type': 'boundingBox', 'format': 'center', 'xCenter': 10, 'yCenter': 20, 'width': 4, 'height': 6}]},
+        ]
+
+    def test_transforms(self):
+        boxes = np.array([(128, 216, 201, 35), (0.5, 1.5, 10, 20)], dtype=np.float64)
+        widths, heights = np.array([960, 640]), np.array([540, 480])
+        for box_format in BoundingBoxFormat:
+            transformed = transform_array_from_coco(boxes, box_format, widths, heights)
+            for box, wh, row in zip(boxes.tolist(), zip(widths, heights), transformed.tolist()):
+                self.assertEqual(tuple(row), transform_from_coco(tuple(box), box_format, img_wh=wh))
+            np.testing.assert_allclose(transform_array_to_coco(transformed, box_format, widths, heights), boxes)
+        with self.assertRaises(ValueError):
+            transform_array_from_coco(boxes, BoundingBoxFormat.RELATIVE_VOC)
+
+    def test_dsv_matches_image_objects(self):
+        box_array = BoundingBoxArray.from_records(self.records())
+        self.assertEqual(len(box_array), 3)
+        self.assertEqual(box_array.labels, ['Cat', 'Dog', ''])
+        images = [Image(**record) for record in self.records()]
+        # relative values are floats in both paths
+        for box_format in ('relativeVoc', 'relativeCenter'):
+            for per_line in (True, False):
+                config = {**self.config, 'boundingBox': box_format, 'annotationPerLine': per_line}
+                expected = [(image.filename, dsv_image_str(image_sv(image, 'data', **config), **config))
+                            for image in images]
+                self.assertEqual(list(box_array_image_strs(box_array, 'data', **config)), expected)
+
+    def test_absolute_dsv_matches_dsv_writer(self):
+        # odd sizes keep the centers fractional, so both paths see the same integral values
+        records = [
+            {'filename': '1.png', 'width': 960, 'height': 540, 'annotations': [
+                {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 128, 'y': 216, 'width': 201,
+                 'height': 35},
+                {'type': 'boundingBox', 'format': 'coco', 'label': 'Dog', 'x': 0.5, 'y': 1.5, 'width': 10,
+                 'height': 20}]},
+            {'filename': '2.png', 'width': 640, 'height': 480, 'annotations': []}]
+        box_array = BoundingBoxArray.from_records(records)
+        expected = {'coco': b'data/1.png,128,216,201,35,0', 'voc': b'data/1.png,128,216,329,251,0',
+                    'center': b'data/1.png,228.5,233.5,201,35,0'}
+        with tempfile.TemporaryDirectory() as folder:
+            for box_format, first_line in expected.items():
+                config = {**self.config, 'boundingBox': box_format, 'filePerImage': False}
+                images_file, array_file = os.path.join(folder, 'images.txt'), os.path.join(folder, 'array.txt')
+                images = [Image(**record) for record in records]
+                self.assertEqual(dsv_writer(images, 'data', **{**config, 'outputFile': images_file}), {})
+                self.assertEqual(dsv_box_array_writer(box_array, 'data', **{**config, 'outputFile': array_file}), {})
+                with open(file=images_file, mode='rb') as f, open(file=array_file, mode='rb') as g:
+                    written = f.read()
+                    self.assertTrue(written.startswith(first_line + b'\r\n'))
+                    self.assertEqual(g.read(), written)
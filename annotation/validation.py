@@ -0,0 +1,201 @@
+"""Vectorized validation and repair of bounding boxes.
+
+Boxes of a chunk of images are checked at once with numpy. A box is invalid if a value is not finite (NaN or
+infinite) or its width or height is not positive, and it is outside if it is not completely inside its image.
+Images without width or height are only checked for invalid boxes.
+
+With 'keep_undecoded', undecoded annotations are checked on their dicts, so they stay undecoded and can be passed
+through by the base JSON writer ('passThroughAnnotations') unless one of their boxes is repaired. Otherwise the
+annotations are decoded, which is faster if the writers decode them anyway.
+
+Modes:
+- off: no validation
+- report: only counts the issues
+- clip: clips outside boxes to the image and drops invalid boxes and boxes that are completely outside
+- drop: drops invalid and outside boxes
+"""
+from enum import Enum, unique
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from annotation.base_annotation import Annotation, AnnotationType, read_annotation
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat, dict_to_box_values, transform_to_coco
+from image import Image
+
+
+@unique
+class ValidationMode(Enum):
+    OFF = 'off'
+    REPORT = 'report'
+    CLIP = 'clip'
+    DROP = 'drop'
+
+
+class ValidationReport:
+    MAX_EXAMPLES = 5
+
+    def __init__(self):
+        self.box_count = 0
+        self.non_finite = 0
+        self.non_positive_size = 0
+        self.outside = 0
+        self.unknown_image_size = 0
+        self.clipped = 0
+        self.dropped = 0
+        self.examples = []  # filenames of the first images with issues
+
+    @property
+    def issue_count(self) -> int:
+        return self.non_finite + self.non_positive_size + self.outside
+
+    def merge(self, other: 'ValidationReport') -> 'ValidationReport':
+        for key in ('box_count', 'non_finite', 'non_positive_size', 'outside', 'unknown_image_size', 'clipped',
+                    'dropped'):
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+        self.examples += other.examples[:self.MAX_EXAMPLES - len(self.examples)]
+        return self
+
+    def __str__(self):
+        text = 'Validated {} boxes: {} not finite, {} without positive size, {} outside of the image'.format(
+            self.box_count, self.non_finite, self.non_positive_size, self.outside)
+        if self.unknown_image_size:
+            text += ', {} in images without size'.format(self.unknown_image_size)
+        if self.clipped or self.dropped:
+            text += ' ({} clipped, {} dropped)'.format(self.clipped, self.dropped)
+        if self.examples:
+            text += '\nImages with issues: ' + ', '.join(self.examples)
+        return text
+
+
+def integral(values) -> tuple:
+    """Converts integral floats back into ints, so repaired boxes are written like the others."""
+    return tuple(int(v) if v.is_integer() else v for v in values)
+
+
+def raw_box_values(annotation: dict, image: Image) -> Optional[tuple]:
+    """Gets the coco values of an undecoded bounding box, None if the annotation is no bounding box."""
+    if annotation.get('type') != AnnotationType.BOUNDING_BOX.value:
+        return None
+    box_format = BoundingBoxFormat(annotation.get('format'))
+    box_values = dict_to_box_values(box_format, **annotation)
+    if box_values is None:
+        raise ValueError('There are no box values defined')
+    return transform_to_coco(box_values, box_format, img_width=image.width, img_height=image.height)
+
+
+def decode_indexed(image: Image) -> dict[int, Optional[Annotation]]:
+    """Decodes the annotations of an image and returns them by the index of their dict."""
+    annotations = {index: read_annotation(annotation) for index, annotation in enumerate(image.raw_annotations)}
+    image.annotations = [annotation for annotation in annotations.values() if annotation is not None]
+    return annotations
+
+
+def validate_chunk(images: list[Image], mode: ValidationMode, report: ValidationReport,
+                   keep_undecoded: bool = False) -> None:
+    """Validates all bounding boxes of the images at once and repairs them in place if the mode requires it.
+
+    :param keep_undecoded: if true, undecoded annotations are only decoded if one of their boxes is repaired
+    """
+    values, owners, counts = [], [], []
+    for image in images:
+        raw_annotations = image.raw_annotations if keep_undecoded else None
+        if raw_annotations is not None:
+            # undecoded boxes are owned by their image and the index of their dict
+            image_values = [(index, raw_box_values(annotation, image))
+                            for index, annotation in enumerate(raw_annotations)]
+            image_values = [(index, box_values) for index, box_values in image_values if box_values is not None]
+            owners += [(image, index) for index, _ in image_values]
+            values += [box_values for _, box_values in image_values]
+            counts.append(len(image_values))
+        else:
+            image_boxes = [annotation for annotation in image.annotations if isinstance(annotation, BoundingBox)]
+            owners += image_boxes
+            values += [bb.box_values for bb in image_boxes]
+            counts.append(len(image_boxes))
+    if not owners:
+        return
+    boxes = np.array(values, dtype=np.float64)
+    sizes = np.array([(np.nan if image.width is None else image.width,
+                       np.nan if image.height is None else image.height) for image in images], dtype=np.float64)
+    sizes = np.repeat(sizes, counts, axis=0)
+
+    x, y, width, height = boxes.T
+    with np.errstate(invalid='ignore'):
+        finite = np.isfinite(boxes).all(axis=1)
+        positive = (width > 0) & (height > 0)
+        invalid = ~finite | ~positive
+        known_size = np.isfinite(sizes).all(axis=1)
+        x2, y2 = x + width, y + height
+        outside = ~invalid & known_size & ((x < 0) | (y < 0) | (x2 > sizes[:, 0]) | (y2 > sizes[:, 1]))
+    report.box_count += len(boxes)
+    report.non_finite += int(np.count_nonzero(~finite))
+    report.non_positive_size += int(np.count_nonzero(finite & ~positive))
+    report.outside += int(np.count_nonzero(outside))
+    report.unknown_image_size += int(np.count_nonzero(~known_size))
+
+    issues = invalid | outside
+    if not issues.any():
+        return
+    image_index = np.repeat(np.arange(len(images)), counts)
+    if len(report.examples) < report.MAX_EXAMPLES:
+        for index in np.unique(image_index[issues])[:report.MAX_EXAMPLES - len(report.examples)].tolist():
+            report.examples.append(str(images[index].filename))
+    if mode is ValidationMode.REPORT:
+        return
+
+    # only images with boxes to repair are decoded
+    decoded = {}
+    for index in np.flatnonzero(issues).tolist():
+        if isinstance(owners[index], tuple):
+            image, raw_index = owners[index]
+            if id(image) not in decoded:
+                decoded[id(image)] = decode_indexed(image)
+            owners[index] = decoded[id(image)][raw_index]
+
+    drop = issues
+    if mode is ValidationMode.CLIP:
+        clipped = np.clip(np.stack([x, y, x2, y2], axis=1)[outside], 0, np.tile(sizes[outside], 2))
+        clipped[:, 2:] -= clipped[:, :2]  # back to width and height
+        inside = (clipped[:, 2] > 0) & (clipped[:, 3] > 0)
+        drop = invalid.copy()
+        drop[np.flatnonzero(outside)[~inside]] = True
+        for index, values in zip(np.flatnonzero(outside)[inside].tolist(), clipped[inside].tolist()):
+            owners[index].box_values = integral(values)
+        report.clipped += int(np.count_nonzero(inside))
+    if drop.any():
+        # only the images that own a dropped box are rewritten, the others stay undecoded
+        dropped = {}
+        for index in np.flatnonzero(drop).tolist():
+            dropped.setdefault(int(image_index[index]), set()).add(id(owners[index]))
+        for index, box_ids in dropped.items():
+            image = images[index]
+            image.annotations = [annotation for annotation in image.annotations if id(annotation) not in box_ids]
+            report.dropped += len(box_ids)
+
+
+def validate_images(images: Iterable[Image], mode: ValidationMode = ValidationMode.REPORT,
+                    report: ValidationReport = None, chunk_size: int = 1024,
+                    keep_undecoded: bool = False) -> Iterator[Image]:
+    """Validates the bounding boxes of a stream of images in chunks and yields the (repaired) images.
+
+    :param images: images to validate
+    :param mode: what happens with invalid and outside boxes
+    :param report: collects the counts of all issues
+    :param chunk_size: number of images that are validated at once
+    :param keep_undecoded: if true, undecoded annotations are only decoded if one of their boxes is repaired
+    """
+    if mode is ValidationMode.OFF:
+        yield from images
+        return
+    report = ValidationReport() if report is None else report
+    chunk = []
+    for image in images:
+        chunk.append(image)
+        if len(chunk) >= chunk_size:
+            validate_chunk(chunk, mode, report, keep_undecoded)
+            yield from chunk
+            chunk = []
+    if chunk:
+        validate_chunk(chunk, mode, report, keep_undecoded)
+        yield from chunk
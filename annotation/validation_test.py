@@ -0,0 +1,63 @@
+from unittest import TestCase
+from annotation.validation import ValidationMode, ValidationReport, validate_images
+from image import Image
+from writer.base_json_writer import image_json
+
+
+def images() -> list[Image]:
+    def box(x, y, width, height):
+        return {'type': 'boundingBox', 'format': 'coco', 'x': x, 'y': y, 'width': width, 'height': height}
+
+    unknown_size = Image(filename='c.png', width=1, height=1, annotations=[box(1, 1, -2, 3), box(100, 1, 2, 3)])
+    unknown_size.width = unknown_size.height = None
+    return [Image(filename='a.png', width=10, height=10,
+                  annotations=[box(-2, 1, 5, 3), box(1, 1, float('nan'), 3), box(1, 1, 2, 3), box(20, 1, 2, 3)]),
+            Image(filename='b.png', width=10, height=10, annotations=[]),
+            unknown_size]
+
+
+class TestValidation(TestCase):
+
+    def test_modes(self):
+        expected = {ValidationMode.REPORT: [4, 0, 2], ValidationMode.CLIP: [2, 0, 1], ValidationMode.DROP: [1, 0, 1]}
+        for mode, counts in expected.items():
+            report = ValidationReport()
+            # a chunk size of two splits the images between chunks
+            result = list(validate_images(images(), mode, report, chunk_size=2))
+            self.assertEqual([len(image.annotations) for image in result], counts)
+            self.assertEqual((report.box_count, report.non_finite, report.non_positive_size, report.outside),
+                             (6, 1, 1, 2))
+            self.assertEqual(report.unknown_image_size, 2)
+            self.assertEqual(report.examples, ['a.png', 'c.png'])
+        clipped = list(validate_images(images(), ValidationMode.CLIP))[0].annotations[0]
+        self.assertEqual(clipped.box_values, (0, 1, 3, 3))
+
+    def test_pass_through_annotations(self):
+        config = {'boundingBox': 'coco', 'passThroughAnnotations': True}
+        box = {'type': 'boundingBox', 'format': 'coco', 'x': 1, 'y': 1, 'width': 2, 'height': 3, 'score': 0.9}
+        outside = {**box, 'x': 9}
+        # checked boxes stay undecoded, so their extra keys are written
+        report = ValidationReport()
+        image = Image(filename='a.png', width=10, height=10, annotations=[box, outside])
+        result = list(validate_images([image], ValidationMode.REPORT, report, keep_undecoded=True))[0]
+        self.assertEqual(report.outside, 1)
+        self.assertEqual(image_json(result, **config)['annotations'], [box, outside])
+        image = Image(filename='a.png', width=10, height=10, annotations=[box])
+        result = list(validate_images([image], ValidationMode.CLIP, keep_undecoded=True))[0]
+        self.assertEqual(image_json(result, **config)['annotations'], [box])
+        # images with repaired boxes are decoded
+        image = Image(filename='a.png', width=10, height=10, annotations=[box, outside])
+        result = list(validate_images([image], ValidationMode.CLIP, keep_undecoded=True))[0]
+        self.assertIsNone(result.raw_annotations)
+        self.assertEqual(result.annotations[1].box_values, (9, 1, 1, 3))
+
+    def test_drop_keeps_other_images_undecoded(self):
+        box = {'type': 'boundingBox', 'format': 'coco', 'x': 1, 'y': 1, 'width': 2, 'height': 3}
+        outside = {**box, 'x': 20}
+        report = ValidationReport()
+        bad = Image(filename='a.png', width=10, height=10, annotations=[box, outside])
+        good = Image(filename='b.png', width=10, height=10, annotations=[box])
+        results = list(validate_images([bad, good], ValidationMode.DROP, report, keep_undecoded=True))
+        self.assertEqual(report.dropped, 1)
+        self.assertEqual(len(results[0].annotations), 1)
+        self.assertIsNotNone(results[1].raw_annotations)
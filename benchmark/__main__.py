@@ -0,0 +1,54 @@
+"""Benchmark suite of the converter.
+
+Usage:
+    python -m benchmark run [--images N] [--boxes N] [--labels N] [--format FORMAT] [--no-imports]
+                         [--output RESULTS.json]
+    python -m benchmark compare BASELINE.json CURRENT.json [--threshold 0.1]
+"""
+import argparse
+import sys
+
+from benchmark.suite import CASES, compare, read_results, run, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of all load, transform and write paths')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmark cases on a synthetic dataset')
+    run_parser.add_argument('--images', type=int, default=10000, help='number of images')
+    run_parser.add_argument('--boxes', type=int, default=5, help='number of boxes per image')
+    run_parser.add_argument('--labels', type=int, default=20, help='number of distinct labels')
+    # relative boxes cannot be read from the standard JSON, because annotations are decoded without the image size
+    run_parser.add_argument('--format', type=str, choices=['coco', 'voc', 'center'], default='coco',
+                            help='box format of the standard JSON')
+    run_parser.add_argument('--repeats', type=int, default=3, help='number of timed runs per case')
+    run_parser.add_argument('--cases', type=str, nargs='+', metavar='PREFIX',
+                            help='cases to run by name or prefix: ' + ', '.join(CASES))
+    run_parser.add_argument('--no-imports', action='store_true',
+                            help='do not measure the import times of the entry points (python -X importtime)')
+    run_parser.add_argument('--output', type=str, help='JSON file for the results')
+
+    compare_parser = commands.add_parser('compare', help='flags regressions between two runs')
+    compare_parser.add_argument('baseline', type=str, help='results of the earlier run')
+    compare_parser.add_argument('current', type=str, help='results of the later run')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='relative increase of time or peak memory that is a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run(args.images, args.boxes, args.labels, args.format, args.repeats, args.cases,
+                      imports=not args.no_imports)
+        if args.output:
+            write_results(results, args.output)
+    else:
+        regressions = compare(read_results(args.baseline), read_results(args.current), args.threshold)
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Synthetic datasets with a configurable number of images, boxes per image, labels and box format."""
+import json
+import random
+from pathlib import Path
+
+from annotation.bounding_box import BoundingBoxFormat, transform_from_coco
+
+
+def synthetic_records(image_count: int, box_count: int, label_count: int, box_format: str = 'coco',
+                      seed: int = 0) -> list[dict]:
+    """Image records of the standard JSON, the same arguments always create the same records.
+
+    Every record has its own strings and lists, like the records decoded by the loader.
+
+    :param image_count: number of images
+    :param box_count: number of bounding boxes per image
+    :param label_count: number of distinct box labels
+    :param box_format: format of the box values, relative formats can only be decoded with the image size
+    """
+    rng = random.Random(seed)
+    box_format = BoundingBoxFormat(box_format)
+    names = box_format.get_value_names()
+    width, height = 1920, 1080
+    records = []
+    for i in range(image_count):
+        annotations = []
+        for _ in range(box_count):
+            box = (rng.randrange(1800), rng.randrange(1000), rng.uniform(1, 120), rng.uniform(1, 80))
+            values = transform_from_coco(box, box_format, img_wh=(width, height))
+            annotations.append({'label': 'label-{}'.format(rng.randrange(label_count)), 'instance': '',
+                                'additionalLabels': [], 'verified': False, 'autoCreated': False,
+                                'type': 'boundingBox', 'format': box_format.value, **dict(zip(names, values))})
+        records.append({'filename': '{}.png'.format(i), 'label': '', 'instance': '', 'additionalLabels': [],
+                        'verified': False, 'autoCreated': False, 'width': width, 'height': height,
+                        'annotations': annotations})
+    # a JSON round trip creates separate string objects like the loader does
+    return json.loads(json.dumps(records))
+
+
+def write_standard_json(records: list[dict], path: Path) -> None:
+    with open(file=path, mode='w') as f:
+        json.dump({'images': records}, f)
+
+
+def write_kvasir_seg(records: list[dict], root_folder: Path) -> None:
+    """Writes the bounding boxes in the layout of the Kvasir-SEG dataset, see 'loader.kvasir_seg'."""
+    from image import Image
+    boxes_json = {}
+    for record in records:
+        image = Image(**record)
+        boxes = []
+        for bb in image.annotations:
+            x_min, y_min, x_max, y_max = transform_from_coco(bb.box_values, BoundingBoxFormat.VOC)
+            boxes.append({'label': bb.label, 'xmin': x_min, 'ymin': y_min, 'xmax': x_max, 'ymax': y_max})
+        boxes_json[image.filename.rsplit('.', 1)[0]] = {'height': image.height, 'width': image.width, 'bbox': boxes}
+    Path(root_folder).mkdir(parents=True, exist_ok=True)
+    with open(file=Path(root_folder, 'kavsir_bboxes.json'), mode='w') as f:
+        json.dump(boxes_json, f)
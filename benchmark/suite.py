@@ -0,0 +1,256 @@
+"""Times and memory-profiles every load, transform and write path on a synthetic dataset.
+
+Every case is run 'repeats' times for the wall time and once more with tracemalloc for the peak memory and the
+memory that is still referenced by the result (e.g. the loaded images). The startup cost is tracked with the
+cumulative import time of the entry points, measured with 'python -X importtime' in fresh interpreters.
+"""
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from annotation.bounding_box import BoundingBoxFormat, transform_from_coco, transform_to_coco
+from benchmark.dataset import synthetic_records, write_kvasir_seg, write_standard_json
+from config import load_config
+from image import Image
+
+REPO_FOLDER = Path(__file__).resolve().parent.parent
+IMPORT_MODULES = ['main', 'dsv', 'config', 'loader.base_json_loader', 'writer.delimiter_separated_values']
+
+
+class Context:
+    def __init__(self, folder: Path, image_count: int, box_count: int, label_count: int, box_format: str):
+        """Synthetic dataset in all input formats and the configs of the cases."""
+        self.folder = folder
+        self.parameters = {'images': image_count, 'boxes': box_count, 'labels': label_count, 'format': box_format}
+        self.records = synthetic_records(image_count, box_count, label_count, box_format)
+        self.box_count = image_count * box_count
+        self.json_path = folder / 'std.json'
+        write_standard_json(self.records, self.json_path)
+        self.kvasir_folder = folder / 'kvasir'
+        write_kvasir_seg(self.records, self.kvasir_folder)
+        self.images = [Image(**record) for record in self.records]
+        self.coco_boxes = [(bb.box_values, (image.width, image.height))
+                           for image in self.images for bb in image.annotations]
+        self.dsv_config = {**load_config(), 'outputFile': str(folder / 'all.txt')}
+        self.yolo_config = {**load_config('yolo'), 'outputFolder': str(folder / 'yolo')}
+        self.json_config = {**load_config('json'), 'outputFile': str(folder / 'out.json')}
+        from writer.delimiter_separated_values import dsv_writer
+        dsv_writer(self.images, path='', **self.dsv_config)
+        dsv_writer(self.images, path='', **self.yolo_config)
+
+
+def decoded(images) -> list[Image]:
+    """Decodes the lazy annotations, so the loaders are compared with the same amount of work."""
+    images = list(images)
+    for image in images:
+        _ = image.annotations
+    return images
+
+
+def load_base_json(context: Context):
+    from loader.base_json_loader import BaseJsonLoaderV1
+    return decoded(BaseJsonLoaderV1(str(context.json_path)).images), len(context.images)
+
+
+def load_base_json_streaming(context: Context):
+    from loader.base_json_loader import BaseJsonLoaderV1
+    return decoded(BaseJsonLoaderV1(str(context.json_path), streaming=True).images), len(context.images)
+
+
+def load_kvasir_seg(context: Context):
+    from loader.kvasir_seg import KvasirSegLoader
+    return KvasirSegLoader(str(context.kvasir_folder)).convert_to_base_format(), len(context.images)
+
+
+def load_dsv_file(context: Context):
+    from loader.dsv_reader import load_images
+    return load_images(Path(context.dsv_config['outputFile']), **context.dsv_config), context.box_count
+
+
+def load_dsv_folder(context: Context):
+    from loader.dsv_reader import load_images
+    return load_images(Path(context.yolo_config['outputFolder']), **context.yolo_config), context.box_count
+
+
+def transform_from_coco_all(context: Context):
+    boxes = [transform_from_coco(box, box_format, img_wh=img_wh)
+             for box_format in BoundingBoxFormat for box, img_wh in context.coco_boxes]
+    return boxes, len(boxes)
+
+
+def transform_to_coco_all(context: Context):
+    count = 0
+    for box_format in BoundingBoxFormat:
+        for box, (width, height) in context.coco_boxes:
+            transform_to_coco(transform_from_coco(box, box_format, img_wh=(width, height)), box_format,
+                              img_width=width, img_height=height)
+            count += 1
+    return None, count
+
+
+def write_dsv_file(context: Context):
+    from writer.delimiter_separated_values import dsv_writer
+    return dsv_writer(context.images, path='', **context.dsv_config), len(context.images)
+
+
+def write_dsv_folder(context: Context):
+    from writer.delimiter_separated_values import dsv_writer
+    return dsv_writer(context.images, path='', **context.yolo_config), len(context.images)
+
+
+def write_base_json(context: Context):
+    from writer.base_json_writer import write
+    return write(context.images, **context.json_config), len(context.images)
+
+
+def write_base_json_compact(context: Context):
+    from writer.base_json_writer import write
+    return write(context.images, **{**context.json_config, 'indent': None}), len(context.images)
+
+
+def write_json_dump(context: Context):
+    """The former implementation of the base JSON writer, which builds the whole document first."""
+    from writer.base_json_writer import image_json
+    with open(file=context.json_config['outputFile'], mode='w') as file:
+        json_images = [image_json(image, **context.json_config) for image in context.images]
+        json.dump(obj={'images': json_images}, fp=file, indent=2)
+    return None, len(context.images)
+
+
+CASES: dict[str, Callable[[Context], tuple]] = {
+    'load.base_json': load_base_json,
+    'load.base_json_streaming': load_base_json_streaming,
+    'load.kvasir_seg': load_kvasir_seg,
+    'load.dsv_file': load_dsv_file,
+    'load.dsv_folder': load_dsv_folder,
+    'transform.from_coco': transform_from_coco_all,
+    'transform.to_coco': transform_to_coco_all,
+    'write.dsv_file': write_dsv_file,
+    'write.dsv_folder': write_dsv_folder,
+    'write.base_json': write_base_json,
+    'write.base_json_compact': write_base_json_compact,
+    'write.json_dump': write_json_dump,
+}
+
+
+def measure(case: Callable[[Context], tuple], context: Context, repeats: int) -> dict:
+    """Runs a case and returns its best and mean wall time, peak and retained memory and throughput."""
+    seconds = []
+    items = 0
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result, items = case(context)
+        seconds.append(time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result, _ = case(context)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    best = min(seconds)
+    return {'seconds': best, 'meanSeconds': sum(seconds) / len(seconds), 'items': items,
+            'itemsPerSecond': items / best if best > 0 else None,
+            'peakMiB': peak / 2 ** 20, 'retainedMiB': retained / 2 ** 20,
+            'retainedBytesPerBox': retained / context.box_count if context.box_count else None}
+
+
+def parse_import_time(output: str, module: str) -> Optional[float]:
+    """Gets the cumulative import time of a module in seconds from the output of 'python -X importtime'."""
+    for line in output.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def import_times(modules: list[str] = None, repeats: int = 3) -> dict:
+    """Measures the cumulative import time of every module in a fresh interpreter, the best of the repeats."""
+    times = {}
+    for module in modules or IMPORT_MODULES:
+        seconds = []
+        for _ in range(repeats):
+            process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                                     cwd=REPO_FOLDER, capture_output=True, text=True, check=True)
+            seconds.append(parse_import_time(process.stderr, module))
+        times[module] = {'seconds': min(seconds)}
+    return times
+
+
+def run(image_count: int = 10000, box_count: int = 5, label_count: int = 20, box_format: str = 'coco',
+        repeats: int = 3, cases: Optional[list[str]] = None, imports: bool = True, log=print) -> dict:
+    """Runs the benchmark cases on a synthetic dataset.
+
+    :param cases: names or name prefixes of the cases to run, all cases if None
+    :param imports: if true, the import times of the entry points are measured as well
+    :return: results by case name, import times by module and metadata of the run
+    """
+    selected = [name for name in CASES if cases is None or any(name.startswith(case) for case in cases)]
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        context = Context(Path(folder), image_count, box_count, label_count, box_format)
+        for name in selected:
+            results[name] = measure(CASES[name], context, repeats)
+            log('{:<26} {:>9.3f} s {:>10.1f} MiB peak'.format(name, results[name]['seconds'],
+                                                              results[name]['peakMiB']))
+        parameters = {**context.parameters, 'repeats': repeats}
+    times = import_times(repeats=repeats) if imports else {}
+    for module, result in times.items():
+        log('{:<26} {:>9.3f} s import'.format(module, result['seconds']))
+    import numpy
+    return {'meta': {'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                     'python': platform.python_version(), 'numpy': numpy.__version__,
+                     'platform': platform.platform(), 'parameters': parameters},
+            'results': results, 'imports': times}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1, memory_floor: float = 1.0,
+            import_floor: float = 0.005) -> list[str]:
+    """Compares two runs and returns the regressions.
+
+    :param threshold: relative increase of the time or the peak memory that is a regression
+    :param memory_floor: memory increases below this number of MiB are ignored
+    :param import_floor: import time increases below this number of seconds are ignored
+    :return: descriptions of the regressions
+    """
+    regressions = []
+    if baseline['meta'].get('parameters') != current['meta'].get('parameters'):
+        regressions.append('parameters differ: {} != {}'.format(baseline['meta'].get('parameters'),
+                                                                current['meta'].get('parameters')))
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + threshold):
+            regressions.append('{}: {:.3f} s -> {:.3f} s ({:+.0%})'.format(
+                name, base['seconds'], result['seconds'], result['seconds'] / base['seconds'] - 1))
+        increase = result['peakMiB'] - base['peakMiB']
+        if increase > memory_floor and result['peakMiB'] > base['peakMiB'] * (1 + threshold):
+            regressions.append('{}: {:.1f} MiB -> {:.1f} MiB peak'.format(name, base['peakMiB'], result['peakMiB']))
+    for module, result in current.get('imports', {}).items():
+        base = baseline.get('imports', {}).get(module)
+        if base is None:
+            continue
+        increase = result['seconds'] - base['seconds']
+        if increase > import_floor and result['seconds'] > base['seconds'] * (1 + threshold):
+            regressions.append('import {}: {:.3f} s -> {:.3f} s'.format(module, base['seconds'], result['seconds']))
+    return regressions
+
+
+def read_results(path: str) -> dict:
+    with open(file=path, mode='r') as f:
+        return json.load(f)
+
+
+def write_results(results: dict, path: str) -> None:
+    with open(file=path, mode='w') as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,28 @@
+from unittest import TestCase
+from benchmark.suite import compare, parse_import_time
+
+
+def results(seconds: float, peak: float) -> dict:
+    return {'meta': {'parameters': {'images': 10}}, 'results': {'write.dsv_file': {'seconds': seconds, 'peakMiB': peak}}}
+
+
+class TestCompare(TestCase):
+
+    def test_regressions(self):
+        self.assertEqual(compare(results(1.0, 10), results(1.05, 10.5)), [])
+        self.assertEqual(len(compare(results(1.0, 10), results(1.2, 10))), 1)
+        self.assertEqual(len(compare(results(1.0, 10), results(1.0, 20))), 1)
+        # small absolute memory changes are noise
+        self.assertEqual(compare(results(1.0, 0.1), results(1.0, 0.5)), [])
+
+    def test_import_regressions(self):
+        baseline = {**results(1.0, 10), 'imports': {'main': {'seconds': 0.02}}}
+        self.assertEqual(compare(baseline, {**results(1.0, 10), 'imports': {'main': {'seconds': 0.022}}}), [])
+        self.assertEqual(len(compare(baseline, {**results(1.0, 10), 'imports': {'main': {'seconds': 0.1}}})), 1)
+
+    def test_parse_import_time(self):
+        output = ('import time: self [us] | cumulative | imported package\n'
+                  'import time:       150 |        150 |   config\n'
+                  'import time:       320 |      12345 | main\n')
+        self.assertEqual(parse_import_time(output, 'main'), 0.012345)
+        self.assertIsNone(parse_import_time(output, 'dsv'))
@@ -0,0 +1,168 @@
+"""Opens plain, gzip, bz2 and xz compressed files transparently.
+
+Inputs are detected by their magic bytes, outputs by their file extension. Compression and decompression run in
+a background thread, so they overlap with parsing and formatting (zlib, bz2 and lzma release the GIL).
+"""
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+from typing import Optional
+
+MAGIC_BYTES = {b'\x1f\x8b': 'gzip', b'BZh': 'bz2', b'\xfd7zXZ\x00': 'xz'}
+EXTENSIONS = {'.gz': 'gzip', '.gzip': 'gzip', '.tgz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+CHUNK_SIZE = 1 << 16
+
+
+def compression_from_extension(path: str) -> Optional[str]:
+    for extension, compression in EXTENSIONS.items():
+        if str(path).endswith(extension):
+            return compression
+    return None
+
+
+def is_archive(path: str) -> bool:
+    """Checks if the path is a (compressed) tar archive by its extension."""
+    return str(path).endswith(ARCHIVE_EXTENSIONS)
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Gets the compression of an existing file from its magic bytes, or None if the file is not compressed."""
+    with open(file=path, mode='rb') as f:
+        head = f.read(6)
+    for magic, compression in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+class _ThreadedReader(io.RawIOBase):
+    """Decompresses a file in a background thread and hands the chunks over with a bounded queue."""
+
+    def __init__(self, file, max_chunks: int = 8):
+        self.source = file
+        self.file = file
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        self.pending = b''
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='decompress', daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self.stopped.is_set():
+                chunk = self.source.read(CHUNK_SIZE)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:  # raised again in the reading thread
+            self._put(e)
+
+    def _put(self, item) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pending:
+            if self.file is None:
+                return 0
+            item = self.chunks.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                self.file = None  # end of file
+                return 0
+            self.pending = item
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.stopped.set()
+            self.thread.join()
+            self.source.close()
+        super().close()
+
+
+class _ThreadedWriter(io.RawIOBase):
+    """Hands written data over to a background thread that compresses and writes it."""
+
+    def __init__(self, file, max_chunks: int = 8):
+        self.file = file
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='compress', daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                break
+            if self.error is None:
+                try:
+                    self.file.write(chunk)
+                except Exception as e:  # raised again in the writing thread
+                    self.error = e
+        try:
+            self.file.close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.error is not None:
+            raise self.error
+        self.chunks.put(bytes(data))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.chunks.put(None)
+            self.thread.join()
+            super().close()
+            if self.error is not None:
+                raise self.error
+
+
+def open_input(path: str, mode: str = 'r', encoding: str = None, newline: str = None):
+    """Opens a file for reading, compressed files are decompressed in a background thread.
+
+    :param path: path to a plain or compressed file
+    :param mode: 'r' for text or 'rb' for binary
+    """
+    compression = detect_compression(path)
+    if compression is None:
+        return open(file=path, mode=mode, encoding=encoding, newline=newline)
+    binary = io.BufferedReader(_ThreadedReader(OPENERS[compression](path, mode='rb')), buffer_size=CHUNK_SIZE)
+    return binary if 'b' in mode else io.TextIOWrapper(binary, encoding=encoding, newline=newline)
+
+
+def open_output(path: str, mode: str = 'w', buffer_size: int = None, encoding: str = None):
+    """Opens a file for writing, it is compressed in a background thread if its extension is '.gz', '.bz2' or '.xz'.
+
+    :param path: path to the output file
+    :param mode: 'w' for text or 'wb' for binary
+    :param buffer_size: size of the write buffer in bytes, the system default is used if None
+    """
+    compression = compression_from_extension(path)
+    if compression is None:
+        return open(file=path, mode=mode, buffering=buffer_size or -1, encoding=encoding)
+    raw = _ThreadedWriter(OPENERS[compression](path, mode='wb'))
+    binary = io.BufferedWriter(raw, buffer_size=buffer_size or CHUNK_SIZE)
+    return binary if 'b' in mode else io.TextIOWrapper(binary, encoding=encoding)
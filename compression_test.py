@@ -0,0 +1,31 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from compression import detect_compression, open_input, open_output
+
+
+class TestCompression(TestCase):
+
+    def test_round_trip(self):
+        text = ''.join('{},Cät,{}\n'.format(i, i / 7) for i in range(20000))
+        with tempfile.TemporaryDirectory() as folder:
+            for name, compression in (('a.txt', None), ('a.txt.gz', 'gzip'), ('a.bz2', 'bz2'), ('a.xz', 'xz')):
+                path = str(Path(folder, name))
+                with open_output(path, mode='w', encoding='UTF-8') as f:
+                    for start in range(0, len(text), 1000):
+                        f.write(text[start:start + 1000])
+                self.assertEqual(detect_compression(path), compression)
+                # the input is detected by its magic bytes, not by its extension
+                renamed = str(Path(folder, 'renamed'))
+                Path(path).rename(renamed)
+                with open_input(renamed, mode='r', encoding='UTF-8') as f:
+                    self.assertEqual(f.readline(), '0,Cät,0.0\n')
+                    self.assertEqual(f.readline() + f.read(), text[text.index('\n') + 1:])
+
+    def test_closing_before_the_end(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = str(Path(folder, 'a.gz'))
+            with open_output(path, mode='wb') as f:
+                f.write(bytes(1 << 22))
+            with open_input(path, mode='rb') as f:
+                self.assertEqual(f.read(10), bytes(10))
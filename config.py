@@ -0,0 +1,126 @@
+"""Loads writer and loader configs from YAML files and merges them with the default config.
+
+Merged and validated configs are cached with 'marshal', which loads much faster than YAML and keeps the types of
+keys and values (e.g. integer keys of class mappings). A cached config is used as long as the size and modification
+time of its YAML files did not change. The cache file is 'CVDF_CONFIG_CACHE' if the environment variable is set (an
+empty value disables the cache), otherwise '~/.cache/cvdf-converter/configs.marshal'.
+"""
+import copy
+import marshal
+import os
+from typing import Optional
+
+DEFAULT_DSV_CONFIG = 'configs/config_dsv_default.yaml'
+DEFAULT_BASE_JSON_CONFIG = 'configs/config_default_base_json.yaml'
+# configs that can be selected by name instead of a path
+PREDEFINED_CONFIGS = {
+    'yolo': 'configs/config_dsv_yolo.yaml',
+    'json': DEFAULT_BASE_JSON_CONFIG,
+}
+WRITERS = ('dsv', 'json')
+CONFIG_CACHE_FILE = os.environ.get('CVDF_CONFIG_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'cvdf-converter', 'configs.marshal'))
+
+_cache = None  # cached configs by config path, read from the cache file on first use
+
+
+def read_yaml(filepath: str) -> dict:
+    import yaml
+    with open(file=filepath, mode='r') as file:
+        # the C loader of libyaml is much faster, it is missing if PyYAML was built without it
+        return yaml.load(file, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+
+
+def validate_config(config_params: dict) -> dict:
+    """Checks the values that every writer and loader needs and raises a ValueError if one is invalid."""
+    writer = config_params.get('writer', 'dsv')
+    if writer not in WRITERS:
+        raise ValueError("Writer '{}' is not supported".format(writer))
+    if config_params.get('boundingBox') is not None:
+        from annotation.bounding_box import BoundingBoxFormat
+        BoundingBoxFormat(config_params['boundingBox'])
+    return config_params
+
+
+def file_signature(path: str) -> list:
+    """Gets the absolute path, size and modification time of a config file."""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def read_cache() -> dict:
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if CONFIG_CACHE_FILE:
+            try:
+                with open(file=CONFIG_CACHE_FILE, mode='rb') as f:
+                    _cache = marshal.load(f)
+            except (OSError, EOFError, TypeError, ValueError):  # missing or broken, it is written again
+                pass
+    return _cache
+
+
+def write_cache(key: str, sources: list[str], config_params: dict) -> None:
+    """Adds a config to the cache file, configs with values that cannot be marshalled (e.g. dates) and write errors
+    are ignored."""
+    cache = read_cache()
+    cache[key] = {'sources': [file_signature(path) for path in sources], 'config': config_params}
+    if not CONFIG_CACHE_FILE:
+        return
+    temp_file = '{}.{}.tmp'.format(CONFIG_CACHE_FILE, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(CONFIG_CACHE_FILE) or '.', exist_ok=True)
+        with open(file=temp_file, mode='wb') as f:
+            marshal.dump(cache, f)
+        os.replace(temp_file, CONFIG_CACHE_FILE)
+    except (OSError, TypeError, ValueError):
+        cache.pop(key)
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def cached_config(key: str) -> Optional[dict]:
+    """Gets a copy of a cached config or None if it is missing or one of its files changed."""
+    entry = read_cache().get(key)
+    if entry is None:
+        return None
+    try:
+        if any(file_signature(signature[0]) != signature for signature in entry['sources']):
+            return None
+    except OSError:
+        return None
+    return copy.deepcopy(entry['config'])
+
+
+def load_config(config: Optional[str] = None) -> dict:
+    """Loads a config and merges it with the default config of its writer.
+
+    The writer is defined by the 'writer' key, which is 'dsv' if it is missing.
+
+    :param config: path to a YAML file, a pre-defined config name or None for the default DSV config
+    :return: merged config
+    """
+    path = None if config is None else PREDEFINED_CONFIGS.get(str(config), config)
+    # the default configs are relative to the working directory
+    key = '{}|{}'.format('' if path is None else os.path.abspath(path), os.getcwd())
+    config_params = cached_config(key)
+    if config_params is not None:
+        return config_params
+    config_params = {} if path is None else read_yaml(path)
+    default_path = DEFAULT_BASE_JSON_CONFIG if config_params.get('writer') == 'json' else DEFAULT_DSV_CONFIG
+    # Merge default config with user config
+    config_params = validate_config({**read_yaml(default_path), **config_params})
+    write_cache(key, [default_path] if path is None else [default_path, path], config_params)
+    return copy.deepcopy(config_params)
+
+
+def set_output(config_params: dict, output: str) -> dict:
+    """Sets the output path of a config, which is a folder or a tar archive if 'filePerImage' is true, otherwise
+    it is a file."""
+    from compression import is_archive
+    if config_params.get('filePerImage') and is_archive(output):
+        return {**config_params, 'archiveFile': output}
+    if config_params.get('filePerImage'):
+        return {**config_params, 'outputFolder': output}
+    return {**config_params, 'outputFile': output}
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+import config
+
+
+class TestConfigCache(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache_file, self.cache = config.CONFIG_CACHE_FILE, config._cache
+        config.CONFIG_CACHE_FILE = os.path.join(self.folder.name, 'configs.marshal')
+        config._cache = None
+
+    def tearDown(self):
+        config.CONFIG_CACHE_FILE, config._cache = self.cache_file, self.cache
+        self.folder.cleanup()
+
+    def test_cached_config_is_updated_when_file_changes(self):
+        path = os.path.join(self.folder.name, 'config.yaml')
+        with open(file=path, mode='w') as f:
+            f.write('delimiter: ";"\n')
+        self.assertEqual(config.load_config(path)['delimiter'], ';')
+        self.assertTrue(os.path.isfile(config.CONFIG_CACHE_FILE))
+        # a new process reads the config from the cache file
+        config._cache = None
+        loaded = config.load_config(path)
+        self.assertEqual((loaded['delimiter'], loaded['writer']), (';', 'dsv'))
+        loaded['delimiter'] = ','
+        self.assertEqual(config.load_config(path)['delimiter'], ';')
+        with open(file=path, mode='w') as f:
+            f.write('delimiter: "|"\n')
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        self.assertEqual(config.load_config(path)['delimiter'], '|')
+
+    def test_key_types_are_kept(self):
+        path = os.path.join(self.folder.name, 'config.yaml')
+        with open(file=path, mode='w') as f:
+            f.write('classMapping: {1: 0, Cat: 2}\n')
+        self.assertEqual(config.load_config(path)['classMapping'], {1: 0, 'Cat': 2})
+        config._cache = None
+        self.assertEqual(config.load_config(path)['classMapping'], {1: 0, 'Cat': 2})
+
+    def test_invalid_config(self):
+        path = os.path.join(self.folder.name, 'config.yaml')
+        with open(file=path, mode='w') as f:
+            f.write('boundingBox: square\n')
+        with self.assertRaises(ValueError):
+            config.load_config(path)
@@ -1,27 +1,38 @@
-from annotation.base_annotation import AnnotationFormat, read_annotations
+import profiling
+from annotation.base_annotation import Annotation, AnnotationFormat, read_annotations
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class BaseImage(ABC):
+    __slots__ = ('_label', '_instance', '_additional_labels', 'verified', 'auto_created')
+
     def __init__(self, **kwargs):
         self.label = '' if kwargs.get('label') is None else kwargs.get('label')
         self.instance = '' if kwargs.get('instance') is None else kwargs.get('instance')
-        self.additional_labels = [] if kwargs.get('additionalLabels') is None else kwargs.get('additionalLabels')
+        self.additional_labels = kwargs.get('additionalLabels')
         self.verified = False if kwargs.get('verified') is None else kwargs.get('verified')
         self.auto_created = False if kwargs.get('autoCreated') is None else kwargs.get('autoCreated')
 
+    # labels are stored like the ones of annotations
+    label = Annotation.label
+    instance = Annotation.instance
+    additional_labels = Annotation.additional_labels
+
     @abstractmethod
     def to_dict(self, annotation_format: AnnotationFormat = None):
         return {
             'label': self.label,
             "instance": self.instance,
-            "additionalLabels": self.additional_labels,
+            "additionalLabels": [] if self._additional_labels is None else self._additional_labels,
             "verified": self.verified,
             "autoCreated": self.auto_created,
         }
 
 
 class Image(BaseImage):
+    __slots__ = ('filename', 'width', 'height', '_annotations', '_raw_annotations', 'path')
+
     def __init__(self, filename: str = None, width: int = None, height: int = None, **kwargs):
         super().__init__(**kwargs)
         self.filename = kwargs.get('filename') if filename is None else filename
@@ -33,9 +44,38 @@ class Image(BaseImage):
         self.height = kwargs.get('height') if height is None else height
         if self.height is None:
             raise ValueError('Image filename is required')
-        self.annotations = read_annotations(kwargs.get('annotations'))
+        # annotations are decoded on first access
+        self._annotations = None
+        self._raw_annotations = kwargs.get('annotations')
+        if self._raw_annotations is None:
+            self._annotations = []
         self.path = kwargs.get('path')
 
+    @property
+    def annotations(self) -> list:
+        if self._annotations is None:
+            with profiling.active.stage('decode annotations'):
+                self._annotations = read_annotations(self._raw_annotations)
+            self._raw_annotations = None
+        return self._annotations
+
+    @annotations.setter
+    def annotations(self, annotations: list):
+        self._annotations = annotations
+        self._raw_annotations = None
+
+    @property
+    def raw_annotations(self) -> Optional[list[dict]]:
+        """Gets the annotation dicts as they were passed to the constructor, None if they were already decoded."""
+        return self._raw_annotations
+
+    @property
+    def annotation_count(self) -> int:
+        """Gets the number of annotations without decoding them, undecoded records of any type are counted."""
+        if self._annotations is None:
+            return len(self._raw_annotations)
+        return len(self._annotations)
+
     def __repr__(self):
         return 'Image[{},{},{}]'.format(self.filename, self.width, self.height)
 
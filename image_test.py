@@ -0,0 +1,23 @@
+import json
+from unittest import TestCase
+from image import Image
+
+
+class TestImage(TestCase):
+
+    def test_slots_and_interned_labels(self):
+        text = json.dumps({'filename': '1.png', 'width': 10, 'height': 20, 'label': 'Day', 'annotations': [
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 1, 'y': 2, 'width': 3, 'height': 4}]})
+        first, second = Image(**json.loads(text)), Image(**json.loads(text))
+        # separately decoded labels share one string object
+        self.assertIs(first.label, second.label)
+        self.assertIs(first.annotations[0].label, second.annotations[0].label)
+        for value in (first, first.annotations[0]):
+            self.assertFalse(hasattr(value, '__dict__'))
+            with self.assertRaises(AttributeError):
+                value.unknown = 1
+        # missing additional labels are written as empty lists and can be extended
+        self.assertEqual(first.to_dict()['additionalLabels'], [])
+        first.additional_labels.append('Sunny')
+        self.assertEqual(first.to_dict()['additionalLabels'], ['Sunny'])
+        self.assertEqual(first.annotations[0].to_std_dict()['additionalLabels'], [])
@@ -1,13 +1,141 @@
 import json
+from compression import open_input
 from image import Image
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
 
 
 def read_json(filepath: str) -> dict:
-    with open(file=filepath, mode='r') as f:
+    with open_input(filepath, mode='r') as f:
         return json.load(f)
 
 
+class JsonArrayStream:
+    """Incremental reader for an array that is stored under a key of the top-level JSON object.
+
+    Only the current item and a small read buffer are held in memory, so the file size does not
+    influence the peak memory usage.
+    """
+    WHITESPACE = ' \t\n\r'
+
+    def __init__(self, file, chunk_size: int = 1 << 16):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.offset = 0  # position of the buffer start in the file
+        self.eof = False
+
+    def tell(self) -> int:
+        """Position of the next unread character in the file."""
+        return self.offset + self.pos
+
+    def fill(self) -> bool:
+        """Reads the next chunk into the buffer. The chunk grows with the pending data to keep retries cheap.
+
+        :return: False if the end of the file was reached before
+        """
+        if self.eof:
+            return False
+        if self.pos > 0:  # drop consumed data
+            self.offset += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def next_char(self) -> str:
+        """Skips whitespaces and consumes the next character, which is an empty string at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                char = self.buffer[self.pos]
+                self.pos += 1
+                return char
+            if not self.fill():
+                return ''
+
+    def peek_char(self) -> str:
+        char = self.next_char()
+        if char != '':
+            self.pos -= 1
+        return char
+
+    def expect(self, expected: str) -> None:
+        char = self.next_char()
+        if char != expected:
+            raise ValueError("Expected '{}' but found '{}' in JSON stream".format(expected, char))
+
+    def decode_value(self):
+        """Decodes the next JSON value and reads more data as long as the value is incomplete."""
+        self.peek_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the buffer might be continued in the next chunk
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self, key: str, spans: bool = False) -> Iterator:
+        """Yields all items of the array which is stored in the top-level object under the given key.
+
+        :param key: key of the array
+        :param spans: if true, tuples of item, start and end position of the item in the file are yielded
+        """
+        self.expect('{')
+        if self.peek_char() == '}':
+            raise KeyError(key)
+        while True:
+            name = self.decode_value()
+            self.expect(':')
+            if name == key:
+                self.expect('[')
+                if self.peek_char() == ']':
+                    return
+                while True:
+                    if spans:
+                        self.peek_char()
+                        start = self.tell()
+                        value = self.decode_value()
+                        yield value, start, self.tell()
+                    else:
+                        yield self.decode_value()
+                    char = self.next_char()
+                    if char == ']':
+                        return
+                    if char != ',':
+                        raise ValueError("Expected ',' or ']' but found '{}' in JSON stream".format(char))
+            self.decode_value()  # skip values of other keys
+            char = self.next_char()
+            if char == '}':
+                raise KeyError(key)
+            if char != ',':
+                raise ValueError("Expected ',' or '}}' but found '{}' in JSON stream".format(char))
+
+
+def iter_json_array(filepath: str, key: str = 'images', chunk_size: int = 1 << 16) -> Iterator:
+    """Streams the items of a top-level array from a JSON file one at a time.
+
+    :param filepath: path to the JSON file
+    :param key: key of the array in the top-level object
+    :param chunk_size: number of characters that are read at once
+    """
+    with open_input(filepath, mode='r') as f:
+        yield from JsonArrayStream(f, chunk_size=chunk_size).iter_array(key)
+
+
 class BaseLoader(ABC):
     @abstractmethod
     def convert_to_base_format(self) -> list[Image]:
@@ -17,12 +145,58 @@ class BaseLoader(ABC):
         """
         raise NotImplementedError
 
+    def iter_images(self) -> Iterator[Image]:
+        """Yields the images of the dataset, loaders that can create them one by one override this."""
+        yield from self.convert_to_base_format()
+
 
 class BaseJsonLoaderV1(BaseLoader):
-    def __init__(self ,filepath: str):
-        self.json_root = read_json(filepath)
-        self.images = self.convert_to_base_format()
+    def __init__(self, filepath: str, streaming: bool = False):
+        """Loader for the standard JSON format.
+
+        :param filepath: path to the standard JSON file
+        :param streaming: if true, 'images' is an iterator that creates the images while the file is parsed
+        """
+        self.filepath = filepath
+        self._index = None
+        if streaming:
+            self.json_root = None
+            self.images = self.iter_images()
+        else:
+            self.json_root = read_json(filepath)
+            self.images = self.convert_to_base_format()
 
     def convert_to_base_format(self) -> list[Image]:
         images_json = self.json_root['images']
         return [Image(**image) for image in images_json]
+
+    def iter_records(self) -> Iterator[dict]:
+        """Yields the undecoded image dicts while the 'images' array is parsed."""
+        return iter_json_array(self.filepath, 'images')
+
+    def iter_images(self) -> Iterator[Image]:
+        """Yields one image after the other while the 'images' array is parsed."""
+        for image in self.iter_records():
+            yield Image(**image)
+
+    @property
+    def index(self):
+        """Sidecar index of the image records, it is built on first access if it is missing or outdated."""
+        if self._index is None:
+            from loader.json_index import JsonIndex
+            self._index = JsonIndex(self.filepath)
+        return self._index
+
+    def get(self, filename: str) -> Image:
+        """Reads and decodes only the image with the given filename.
+
+        :raises KeyError: if there is no image with the filename
+        """
+        return self.select([filename])[0]
+
+    def select(self, filenames: Iterable[str]) -> list[Image]:
+        """Reads and decodes only the images with the given filenames, in the given order.
+
+        :raises KeyError: if there is no image with one of the filenames
+        """
+        return [Image(**record) for record in self.index.read_records(filenames)]
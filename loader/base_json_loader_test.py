@@ -0,0 +1,47 @@
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from loader.base_json_loader import BaseJsonLoaderV1, JsonArrayStream
+
+
+class TestJsonArrayStream(TestCase):
+
+    def test_iter_array(self):
+        images = [{'filename': 'a [1], {x}.png', 'width': 1024, 'height': 768, 'annotations': []},
+                  {'filename': 'bä\\"c.png', 'width': 12345678, 'height': 1.5e3, 'annotations': [
+                      {'type': 'boundingBox', 'format': 'coco', 'x': 1, 'y': 2, 'width': 3, 'height': 4}]}]
+        document = {'version': 1, 'meta': {'images': [1, 2]}, 'images': images, 'after': True}
+        for indent in (None, 2):
+            text = json.dumps(document, indent=indent, ensure_ascii=False)
+            # small chunks split keys, strings and numbers between reads
+            for chunk_size in (1, 3, 7, 1 << 16):
+                stream = JsonArrayStream(io.StringIO(text), chunk_size=chunk_size)
+                self.assertEqual(list(stream.iter_array('images')), images)
+
+    def test_empty_and_missing_array(self):
+        self.assertEqual(list(JsonArrayStream(io.StringIO('{"images": [ ]}'), 2).iter_array('images')), [])
+        with self.assertRaises(KeyError):
+            list(JsonArrayStream(io.StringIO('{"other": []}'), 2).iter_array('images'))
+        with self.assertRaises(ValueError):
+            list(JsonArrayStream(io.StringIO('{"images": [{"a": 1} {"b": 2}]}'), 2).iter_array('images'))
+
+
+class TestBaseJsonLoaderV1(TestCase):
+
+    def test_get_and_select(self):
+        images = [{'filename': 'ä.png', 'width': 1, 'height': 2, 'annotations': []},
+                  {'filename': 'b.png', 'width': 3, 'height': 4, 'annotations': []}]
+        with tempfile.TemporaryDirectory() as folder:
+            json_path = str(Path(folder, 'std.json'))
+            for ensure_ascii in (True, False):
+                Path(json_path).write_text(json.dumps({'images': images}, ensure_ascii=ensure_ascii, indent=2),
+                                           encoding='UTF-8')
+                os.utime(json_path, ns=(0, int(ensure_ascii)))  # the index is built again
+                loader = BaseJsonLoaderV1(json_path, streaming=True)
+                self.assertEqual([image.width for image in loader.select(['b.png', 'ä.png'])], [3, 1])
+                self.assertEqual(BaseJsonLoaderV1(json_path, streaming=True).get('ä.png').height, 2)
+                with self.assertRaises(KeyError):
+                    loader.get('c.png')
@@ -0,0 +1,135 @@
+"""Loader for the binary cache that is written by 'writer.binary_cache_writer'.
+
+The cache file is memory-mapped, opening it only reads the header and every image is decoded on access.
+"""
+import json
+import mmap
+import os
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat
+from image import Image
+from loader.base_json_loader import BaseLoader, BaseJsonLoaderV1
+from writer.binary_cache_writer import BOX_FORMATS, BOX_META_DTYPE, FLAG_AUTO_CREATED, FLAG_VERIFIED, HEADER, IMAGE_DTYPE, \
+    MAGIC, NO_STRING, VERSION, source_signature, write
+
+
+class BinaryCacheLoader(BaseLoader):
+    def __init__(self, filepath: str):
+        """Opens a binary cache file.
+
+        :param filepath: path to the cache file
+        """
+        self.filepath = filepath
+        with open(file=filepath, mode='rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self._mmap, 0)
+        magic, version, _, source_size, source_mtime, image_count, box_count, string_count = header[:8]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("'{}' is not a binary cache of version {}".format(filepath, VERSION))
+        self.source_signature = (source_size, source_mtime)
+        images_offset, boxes_offset, meta_offset, string_offsets_offset, string_data_offset = header[8:]
+        buffer = memoryview(self._mmap)
+        # views into the mapped file, pages are only read when they are accessed
+        self.image_records = np.frombuffer(buffer, dtype=IMAGE_DTYPE, count=image_count, offset=images_offset)
+        self.boxes = np.frombuffer(buffer, dtype='<f8', count=box_count * 4, offset=boxes_offset).reshape(-1, 4)
+        self.box_meta = np.frombuffer(buffer, dtype=BOX_META_DTYPE, count=box_count, offset=meta_offset)
+        self.string_offsets = np.frombuffer(buffer, dtype='<u8', count=string_count + 1,
+                                            offset=string_offsets_offset)
+        self._string_data_offset = string_data_offset
+        self._strings = {}
+        if string_data_offset + int(self.string_offsets[-1]) > len(self._mmap):
+            raise ValueError("'{}' is truncated".format(filepath))
+
+    def __len__(self):
+        return len(self.image_records)
+
+    def __getitem__(self, index: int) -> Image:
+        return self.image(index)
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id == NO_STRING:
+            return None
+        value = self._strings.get(string_id)
+        if value is None:
+            start = self._string_data_offset + int(self.string_offsets[string_id])
+            end = self._string_data_offset + int(self.string_offsets[string_id + 1])
+            value = self._strings[string_id] = self._mmap[start:end].decode('UTF-8')
+        return value
+
+    def _labels(self, string_id: int) -> list:
+        return [] if string_id == NO_STRING else json.loads(self.string(string_id))
+
+    def image(self, index: int) -> Image:
+        """Decodes a single image with its bounding boxes."""
+        record = self.image_records[index]
+        width, height = float(record['width']), float(record['height'])
+        flags = int(record['flags'])
+        img = Image(filename=self.string(int(record['filename'])),
+                    width=int(width) if width.is_integer() else width,
+                    height=int(height) if height.is_integer() else height,
+                    label=self.string(int(record['label'])), instance=self.string(int(record['instance'])),
+                    additionalLabels=self._labels(int(record['additional_labels'])),
+                    verified=bool(flags & FLAG_VERIFIED), autoCreated=bool(flags & FLAG_AUTO_CREATED),
+                    path=self.string(int(record['path'])))
+        start = int(record['box_start'])
+        end = start + int(record['box_count'])
+        annotations = []
+        for values, meta in zip(self.boxes[start:end].tolist(), self.box_meta[start:end].tolist()):
+            label, instance, additional_labels, box_flags, box_format = meta
+            # integral values are written as int again, like they were read from the JSON
+            values = tuple(int(v) if v.is_integer() else v for v in values)
+            bb = BoundingBox(box_values=values, box_format=BoundingBoxFormat.COCO,
+                             label=self.string(label), instance=self.string(instance),
+                             additionalLabels=self._labels(additional_labels), verified=bool(box_flags & FLAG_VERIFIED),
+                             autoCreated=bool(box_flags & FLAG_AUTO_CREATED))
+            bb.format = BOX_FORMATS[box_format]  # values are already in coco format
+            annotations.append(bb)
+        img.annotations = annotations
+        return img
+
+    def iter_images(self) -> Iterator[Image]:
+        for index in range(len(self)):
+            yield self.image(index)
+
+    def convert_to_base_format(self) -> list[Image]:
+        return list(self.iter_images())
+
+    def to_box_array(self):
+        """Creates a BoundingBoxArray with copies of the box values and image sizes, so it stays valid after
+        'close()'."""
+        from annotation.bounding_box_array import BoundingBoxArray
+        label_ids, label_codes = np.unique(self.box_meta['label'], return_inverse=True)
+        counts = self.image_records['box_count'].astype(np.int64)
+        return BoundingBoxArray(boxes=self.boxes.copy(), image_index=np.repeat(np.arange(len(self)), counts),
+                                label_codes=label_codes.ravel(),
+                                labels=[self.string(int(i)) or '' for i in label_ids.tolist()],
+                                filenames=[self.string(int(i)) for i in self.image_records['filename'].tolist()],
+                                widths=self.image_records['width'].copy(), heights=self.image_records['height'].copy(),
+                                paths=[self.string(int(i)) for i in self.image_records['path'].tolist()])
+
+    def close(self) -> None:
+        self.image_records = self.boxes = self.box_meta = self.string_offsets = None
+        self._mmap.close()
+
+
+def load_cached(json_path: str, cache_path: str = None) -> BinaryCacheLoader:
+    """Opens the binary cache of a standard JSON and regenerates it if it is missing or the JSON changed.
+
+    :param json_path: path to the standard JSON
+    :param cache_path: path to the cache file (default: JSON path with the suffix '.cvdfbin')
+    """
+    cache_path = json_path + '.cvdfbin' if cache_path is None else cache_path
+    if os.path.isfile(cache_path):
+        try:
+            loader = BinaryCacheLoader(cache_path)
+            if loader.source_signature == source_signature(json_path):
+                return loader
+            loader.close()
+        except (ValueError, struct.error, OSError, IndexError):
+            pass  # unknown cache version or a truncated or unreadable file, it is written again
+    write(BaseJsonLoaderV1(json_path, streaming=True).images, cache_path, source_file=json_path)
+    return BinaryCacheLoader(cache_path)
@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from loader.binary_cache_loader import load_cached
+
+
+class TestBinaryCache(TestCase):
+
+    def test_round_trip_and_regeneration(self):
+        images = [{'filename': 'a.png', 'width': 640, 'height': 480, 'label': 'Day', 'annotations': [
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'instance': '1', 'x': 1, 'y': 2, 'width': 3,
+             'height': 4, 'verified': True, 'additionalLabels': ['Small']},
+            {'type': 'boundingBox', 'format': 'voc', 'label': 'Dög', 'xMin': 10, 'yMin': 20, 'xMax': 30, 'yMax': 40}]},
+                  {'filename': 'b.png', 'width': 1.5, 'height': 2, 'path': 'sub', 'annotations': []}]
+        with tempfile.TemporaryDirectory() as folder:
+            json_path = str(Path(folder, 'std.json'))
+            Path(json_path).write_text(json.dumps({'images': images}), encoding='UTF-8')
+            loader = load_cached(json_path)
+            self.assertEqual(len(loader), 2)
+            first, second = loader.iter_images()
+            self.assertEqual((first.filename, first.label, second.width, second.path), ('a.png', 'Day', 1.5, 'sub'))
+            self.assertEqual([bb.label for bb in first.annotations], ['Cat', 'Dög'])
+            self.assertEqual(first.annotations[0].additional_labels, ['Small'])
+            self.assertTrue(first.annotations[0].verified)
+            self.assertEqual(first.annotations[1].box_values, (10, 20, 20, 20))
+            self.assertEqual(first.annotations[1].to_std_dict()['xMax'], 30)
+            loader.close()
+
+            Path(json_path).write_text(json.dumps({'images': images[1:]}), encoding='UTF-8')
+            os.utime(json_path, ns=(0, 0))
+            loader = load_cached(json_path)
+            self.assertEqual([image.filename for image in loader.iter_images()], ['b.png'])
+            loader.close()
+
+    def test_box_array_outlives_the_loader(self):
+        images = [{'filename': 'a.png', 'width': 640, 'height': 480, 'annotations': [
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 1, 'y': 2, 'width': 3, 'height': 4}]}]
+        with tempfile.TemporaryDirectory() as folder:
+            json_path = str(Path(folder, 'std.json'))
+            Path(json_path).write_text(json.dumps({'images': images}), encoding='UTF-8')
+            loader = load_cached(json_path)
+            boxes = loader.to_box_array()
+            loader.close()
+            self.assertEqual(boxes.boxes.tolist(), [[1, 2, 3, 4]])
+            self.assertEqual((boxes.widths.tolist(), boxes.heights.tolist()), ([640], [480]))
+
+    def test_truncated_cache_is_regenerated(self):
+        images = [{'filename': 'a.png', 'width': 640, 'height': 480, 'annotations': [
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 1, 'y': 2, 'width': 3, 'height': 4}]}]
+        with tempfile.TemporaryDirectory() as folder:
+            json_path = str(Path(folder, 'std.json'))
+            Path(json_path).write_text(json.dumps({'images': images}), encoding='UTF-8')
+            load_cached(json_path).close()
+            cache_path = json_path + '.cvdfbin'
+            size = os.path.getsize(cache_path)
+            # an empty file, a cut header and cut string data
+            for length in (0, 10, size - 1):
+                with open(file=cache_path, mode='r+b') as f:
+                    f.truncate(length)
+                loader = load_cached(json_path)
+                self.assertEqual([bb.label for bb in loader.image(0).annotations], ['Cat'])
+                loader.close()
+                self.assertEqual(os.path.getsize(cache_path), size)
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from dsv import read_line
+from loader.dsv_line_parser import DsvLineParser, MIN_BLOCK_LINES
+
+
+class TestDsvLineParser(TestCase):
+    base_config = {'delimiter': ',', 'annotationPerLine': True, 'annotationDelimiter': ' ', 'withPath': True,
+                   'pathAtEnd': False, 'classAtEnd': True, 'classMapping': None, 'boundingBox': 'coco'}
+
+    def test_same_as_read_line(self):
+        configs_lines = [
+            ({}, ['img/1.png,12,216,201.5,35,Cat\r\n', 'img/2.png,1,2,3,4,unk\n']),
+            ({'classMapping': {0: 'Cat', 1: 'Dog'}}, ['a.png,1,2,3,4,0\n', 'a.png,1,2,3,4,1.0\n', 'a.png,1,2,3,4,7']),
+            ({'withPath': False, 'delimiter': ' ', 'classAtEnd': False, 'classMapping': {0: 'Cat'}},
+             ['0 0.5 0.25 0.125 1\n', '1 1 2 3 4\r\n']),
+            ({'annotationPerLine': False}, ['img/1.png 1,2,3,4,Cat 5,6,7,8,Dog\n']),
+            ({'annotationPerLine': False, 'withPath': False, 'classAtEnd': False}, ['Cat,1,2,3,4 Dog,5,6,7,8\n']),
+        ]
+        for config, lines in configs_lines:
+            config = {**self.base_config, **config}
+            parser = DsvLineParser(**config)
+            self.assertEqual(parser.parse_lines(lines), [read_line(line, **config) for line in lines])
+
+    def test_number_classes_match_parse_lines(self):
+        config = {**self.base_config, 'delimiter': ' ', 'withPath': False, 'boundingBox': 'relativeCenter'}
+        lines = ['0.5 0.5 0.25 0.25 1.0\n', '0.1 0.2 0.3 0.4 1\n'] * MIN_BLOCK_LINES
+        for class_mapping in (None, {1: 'Cat'}):
+            parser = DsvLineParser(**{**config, 'classMapping': class_mapping})
+            annotations = parser.parse_annotations(lines)
+            self.assertEqual(annotations, [annotation for line_values in parser.parse_lines(lines)
+                                           for annotation in line_values])
+            self.assertEqual([type(annotation[-1]) for annotation in annotations[:2]],
+                             [float, int] if class_mapping is None else [str, str])
+
+    def test_parse_annotations(self):
+        config = {**self.base_config, 'delimiter': ' ', 'withPath': False, 'boundingBox': 'relativeCenter'}
+        lines = ['0.5 0.5 0.25 0.25 0\n', '\n', '0.1 0.2 0.3 0.4 Cat\r\n'] * MIN_BLOCK_LINES
+        for class_at_end in (True, False):
+            parser = DsvLineParser(**{**config, 'classAtEnd': class_at_end})
+            self.assertTrue(parser.parse_blocks)
+            expected = [annotation for line_values in parser.parse_lines(lines) for annotation in line_values]
+            self.assertEqual(parser.parse_annotations(lines), expected)
+        # values that are no numbers are parsed line by line
+        lines = ['0.5 0.5 0.25 x 0\n'] * MIN_BLOCK_LINES
+        self.assertEqual(DsvLineParser(**config).parse_annotations(lines)[0], (0.5, 0.5, 0.25, 'x', 0))
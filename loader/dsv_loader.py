@@ -0,0 +1,89 @@
+"""Loader for delimiter separated values that are written by 'writer.delimiter_separated_values'."""
+from pathlib import Path
+from typing import Iterator, Optional
+
+import profiling
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat
+from image import Image
+from loader.base_json_loader import BaseLoader
+from loader.dsv_reader import LoadStatistics, image_sort_key, iter_folder_shards, load_images
+from loader.image_size import ImageSizeCache
+
+
+class DsvLoader(BaseLoader):
+    def __init__(self, path: str, workers: int = None, image_folder: str = None, statistics=None, **kwargs):
+        """Reads the annotation values of a DSV file or a folder with a file per image.
+
+        The values of a single file or an archive are read when the loader is created. A folder with a file per
+        image is read in shards of files while the images are iterated, so only the values of the pending shards
+        are in memory. With 'withPath' the files of a folder can contain lines of any image, so the folder is read
+        completely when the loader is created. The image objects are only created while they are iterated.
+
+        :param path: file, folder or tar archive, depending on 'filePerImage'
+        :param workers: number of processes that read the files of a folder
+        :param image_folder: folder with the image files, their sizes are read from the image headers
+            (default: 'imageFolder' of the config). 'imageWidth' and 'imageHeight' are used if a size is unknown.
+        :param statistics: LoadStatistics that are filled with the number of read files and lines
+        :param kwargs: DSV config
+        """
+        self.config = kwargs
+        self.path = Path(path)
+        self.workers = workers
+        self.statistics = LoadStatistics() if statistics is None else statistics
+        image_folder = image_folder if image_folder is not None else kwargs.get('imageFolder')
+        self.image_folder = image_folder
+        self.size_cache = None
+        if image_folder is not None:
+            self.size_cache = ImageSizeCache(kwargs.get('imageSizeCache'), kwargs.get('probeWorkers') or 8)
+        # shards are cut by file, lines of the same image in several files would create an image per shard
+        self.streaming = bool(kwargs.get('filePerImage')) and self.path.is_dir() and not kwargs.get('withPath')
+        self.values = {}
+        self.image_sizes = {}
+        if self.streaming:
+            return
+        with profiling.active.stage('read dsv'):
+            self.values = load_images(self.path, workers=workers, statistics=self.statistics, **kwargs)
+        self.image_sizes = self._read_sizes(sorted(self.values, key=image_sort_key))
+
+    def _read_sizes(self, keys: list[str]) -> dict[str, Optional[tuple]]:
+        if self.size_cache is None:
+            return {}
+        with profiling.active.stage('image sizes', len(keys)):
+            sizes = self.size_cache.get_sizes(str(Path(self.image_folder, k)) for k in keys)
+            self.size_cache.save()
+        return dict(zip(keys, sizes.values()))
+
+    def image(self, image_path: str) -> Image:
+        return self._create_image(image_path, self.values[image_path], self.image_sizes.get(image_path))
+
+    def _create_image(self, image_path: str, values: list[tuple], size: Optional[tuple]) -> Image:
+        class_at_end = self.config.get('classAtEnd')
+        box_format = BoundingBoxFormat(self.config.get('boundingBox'))
+        width, height = size or (self.config.get('imageWidth'), self.config.get('imageHeight'))
+        if width is None or height is None:
+            raise ValueError("Size of image '{}' is unknown".format(image_path))
+        img = Image(filename=image_path, width=width, height=height)
+        annotations = []
+        for annotation in values:
+            label = annotation[4] if class_at_end else annotation[0]
+            box_values = annotation[0:4] if class_at_end else annotation[1:5]
+            a = BoundingBox(box_values=box_values, box_format=box_format, img_wh=(width, height))
+            a.label = label
+            annotations.append(a)
+        img.annotations = annotations
+        return img
+
+    def iter_images(self) -> Iterator[Image]:
+        if not self.streaming:
+            for image_path in sorted(self.values, key=image_sort_key):
+                yield self.image(image_path)
+            return
+        shards = iter_folder_shards(self.path, self.workers, self.statistics, **self.config)
+        for shard_values in profiling.active.wrap('read dsv', shards):
+            # files are sorted by their image path, so the shards are in the order of the images
+            sizes = self._read_sizes(list(shard_values))
+            for image_path, values in shard_values.items():
+                yield self._create_image(image_path, values, sizes.get(image_path))
+
+    def convert_to_base_format(self) -> list[Image]:
+        return list(self.iter_images())
@@ -0,0 +1,37 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from config import load_config
+from loader.dsv_reader import LoadStatistics
+from loader.dsv_loader import DsvLoader
+
+
+class TestDsvLoader(TestCase):
+
+    def test_folder_is_streamed_in_image_order(self):
+        config = {**load_config('yolo'), 'classMapping': None, 'imageWidth': 100, 'imageHeight': 50}
+        with tempfile.TemporaryDirectory() as folder:
+            for i in (10, 2, 1, 3):
+                Path(folder, '{}.txt'.format(i)).write_text('0.5 0.5 0.2 0.4 {}\n'.format(i), encoding='UTF-8')
+            Path(folder, 'empty.txt').write_text('', encoding='UTF-8')
+            Path(folder, 'a.txt').write_text('0.5 0.5 0.2 0.4 0\n0.5 0.5 0.2 0.4 1\n', encoding='UTF-8')
+            for workers in (None, 2):
+                statistics = LoadStatistics()
+                loader = DsvLoader(folder, workers=workers, statistics=statistics, **config)
+                self.assertEqual(statistics.files, 0)  # nothing is read before the images are iterated
+                images = list(loader.iter_images())
+                self.assertEqual([image.filename for image in images], ['1', '2', '3', '10', 'a'])
+                self.assertEqual([len(image.annotations) for image in images], [1, 1, 1, 1, 2])
+                self.assertEqual(images[3].annotations[0].label, 10)
+                self.assertEqual(statistics.files, 6)
+
+    def test_folder_with_paths_creates_an_image_once(self):
+        config = {**load_config('yolo'), 'classMapping': None, 'imageWidth': 100, 'imageHeight': 50,
+                  'withPath': True}
+        with tempfile.TemporaryDirectory() as folder:
+            # more files than a shard holds, every file has a line of the same image
+            for i in range(300):
+                Path(folder, '{}.txt'.format(i)).write_text('a.png 0.5 0.5 0.2 0.4 {}\n'.format(i), encoding='UTF-8')
+            images = list(DsvLoader(folder, **config).iter_images())
+        self.assertEqual([image.filename for image in images], ['a.png'])
+        self.assertEqual(len(images[0].annotations), 300)
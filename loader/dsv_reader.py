@@ -0,0 +1,249 @@
+"""Reads the annotation values of DSV files, folders with a file per image and tar archives.
+
+Values are parsed by 'DsvLineParser' in blocks of lines, folders can be read in shards by several processes.
+"""
+import time
+from itertools import groupby, islice
+from pathlib import Path
+from typing import Iterator
+
+import profiling
+from compression import open_input
+from loader.dsv_line_parser import DsvLineParser
+
+
+def image_sort_key(image_path: str):
+    """Sorts numbered images by their number and all others by name after them."""
+    name = image_path.split('.')[0]
+    return (0, int(name), '') if name.isdigit() else (1, 0, image_path)
+
+
+class LoadStatistics:
+    def __init__(self, files: int = 0, lines: int = 0, seconds: float = 0.0):
+        """Counts the read files and lines of a DSV loading run."""
+        self.files = files
+        self.lines = lines
+        self.seconds = seconds
+
+    def merge(self, other: 'LoadStatistics') -> None:
+        """Adds the counts of another run, e.g. of a shard that was read by another process."""
+        self.files += other.files
+        self.lines += other.lines
+
+    def __str__(self):
+        seconds = self.seconds if self.seconds > 0 else float('nan')
+        return '{} files, {} lines in {:.2f}s ({:.0f} files/s, {:.0f} lines/s)'.format(
+            self.files, self.lines, self.seconds, self.files / seconds, self.lines / seconds)
+
+
+def read_lines(f, file_image_path: str, images: dict[str, list], statistics: LoadStatistics,
+               parser: DsvLineParser, block_size: int = 1 << 14, **kwargs) -> None:
+    """Reads all lines of an opened annotation file in blocks and appends their values to the images."""
+    with_path = kwargs.get('withPath')
+    while True:
+        lines = list(islice(f, block_size))
+        if not lines:
+            break
+        statistics.lines += len(lines)
+        with profiling.active.stage('parse lines', len(lines)):
+            if not with_path:
+                annotations = parser.parse_annotations(lines)
+                if annotations:
+                    images.setdefault(file_image_path, []).extend(annotations)
+                continue
+            for line_values in parser.parse_lines(lines):
+                image_path = line_values.pop(0)
+                # extend the list in place, so many lines of the same image stay linear
+                images.setdefault(image_path, []).extend(line_values)
+    statistics.files += 1
+
+
+class FileBatch:
+    def __init__(self, images: dict[str, list], statistics: LoadStatistics, parser: DsvLineParser,
+                 block_size: int = 1 << 14):
+        """Collects the lines of small files without paths, so they are parsed together like a single block.
+
+        Files with a few lines each (e.g. a YOLO file per image) never reach 'MIN_BLOCK_LINES' on their own.
+        Only usable if 'parser.parse_blocks' is true, i.e. every non-empty line holds exactly one annotation.
+
+        :param images: annotation values by image path, filled when the batch is flushed
+        :param statistics: counts the added files and lines
+        :param parser: compiled line parser
+        :param block_size: number of non-empty lines that are parsed at once
+        """
+        self.images = images
+        self.statistics = statistics
+        self.parser = parser
+        self.block_size = block_size
+        self.pending = []
+        self.line_count = 0
+
+    def add(self, file_image_path: str, lines: list[str]) -> None:
+        """Adds all lines of a file, the batch is parsed as soon as it holds 'block_size' lines."""
+        self.statistics.files += 1
+        self.statistics.lines += len(lines)
+        lines = [line for line in (line.strip('\r\n') for line in lines) if line]
+        if lines:
+            self.pending.append((file_image_path, lines))
+            self.line_count += len(lines)
+        if self.line_count >= self.block_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Parses the pending lines and appends the annotations to the images of their files."""
+        if not self.pending:
+            return
+        with profiling.active.stage('parse lines', self.line_count):
+            annotations = self.parser.parse_annotations([line for _, lines in self.pending for line in lines])
+        start = 0
+        for file_image_path, lines in self.pending:
+            self.images.setdefault(file_image_path, []).extend(annotations[start:start + len(lines)])
+            start += len(lines)
+        self.pending = []
+        self.line_count = 0
+
+
+def image_name(annotation_filename: str, **kwargs) -> str:
+    """Gets the image filename of an annotation file in 'filePerImage' mode."""
+    image_extension = '.' + kwargs.get('imageExtension') if kwargs.get('imageExtension') is not None else ''
+    return annotation_filename.split('.')[0] + image_extension
+
+
+def read_file(annotation_file: Path, images: dict[str, list], statistics: LoadStatistics,
+              parser: DsvLineParser = None, block_size: int = 1 << 14, **kwargs) -> None:
+    """Reads all lines of a plain or compressed annotation file and appends their values to the images."""
+    parser = DsvLineParser(**kwargs) if parser is None else parser
+    with open_input(annotation_file, mode='r') as f:
+        read_lines(f, image_name(annotation_file.name, **kwargs), images, statistics, parser, block_size, **kwargs)
+
+
+def read_shard(annotation_files: list[Path], images: dict[str, list], statistics: LoadStatistics,
+               parser: DsvLineParser, **kwargs) -> None:
+    """Reads the files of a folder shard, files without paths are parsed together in a 'FileBatch'."""
+    if not parser.parse_blocks:
+        for annotation_file in annotation_files:
+            read_file(annotation_file=annotation_file, images=images, statistics=statistics, parser=parser, **kwargs)
+        return
+    batch = FileBatch(images, statistics, parser)
+    for annotation_file in annotation_files:
+        with open_input(annotation_file, mode='r') as f:
+            batch.add(image_name(annotation_file.name, **kwargs), f.readlines())
+    batch.flush()
+
+
+def read_archive(archive_file: Path, images: dict[str, list], statistics: LoadStatistics,
+                 parser: DsvLineParser = None, **kwargs) -> None:
+    """Reads all annotation files of a (compressed) tar archive, which is read sequentially."""
+    import io
+    import tarfile
+    parser = DsvLineParser(**kwargs) if parser is None else parser
+    batch = FileBatch(images, statistics, parser) if parser.parse_blocks else None
+    with tarfile.open(archive_file, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile():
+                # members of a stream are not seekable, the small files are read at once
+                text = archive.extractfile(member).read().decode('UTF-8')
+                file_image_path = image_name(member.name.rsplit('/', 1)[-1], **kwargs)
+                if batch is not None:
+                    batch.add(file_image_path, io.StringIO(text, newline=None).readlines())
+                else:
+                    read_lines(io.StringIO(text, newline=None), file_image_path, images, statistics, parser,
+                               **kwargs)
+    if batch is not None:
+        batch.flush()
+
+
+def read_files(annotation_files: list[Path], **kwargs) -> tuple[dict[str, list], LoadStatistics]:
+    """Reads a shard of annotation files, used by the worker processes."""
+    images = {}
+    statistics = LoadStatistics()
+    read_shard(annotation_files, images, statistics, DsvLineParser(**kwargs), **kwargs)
+    return images, statistics
+
+
+def iter_folder_shards(path: Path, workers: int = None, statistics: LoadStatistics = None, shard_size: int = 256,
+                       **kwargs) -> Iterator[dict[str, list[tuple]]]:
+    """Reads the files of a folder with a file per image in shards, sorted by their image path.
+
+    Only the values of the pending shards are in memory, at most two shards per worker. The image path of a file
+    is only known without 'withPath', with it the lines of an image can be spread over several shards.
+
+    :param path: folder with a file per image
+    :param workers: number of processes that read the shards, one process if None
+    :param statistics: filled with the number of files and lines that were read and the time this process spent
+        reading or waiting for them
+    :param shard_size: number of files per shard
+    :return: annotation values by image path of every shard, images without annotations are removed
+    """
+    statistics = LoadStatistics() if statistics is None else statistics
+    image_files = sorted(((image_name(image_file.name, **kwargs), image_file) for image_file in path.iterdir()
+                          if image_file.is_file()), key=lambda item: image_sort_key(item[0]))
+    # files of the same image (e.g. '1.txt' and '1.txt.gz') stay in the same shard
+    shards = [[]]
+    for _, files in groupby(image_files, key=lambda item: item[0]):
+        if len(shards[-1]) >= shard_size:
+            shards.append([])
+        shards[-1].extend(image_file for _, image_file in files)
+
+    def finish(shard_images: dict[str, list], start: float) -> dict[str, list]:
+        statistics.seconds += time.perf_counter() - start
+        return {image_path: values for image_path, values in shard_images.items() if len(values) > 0}
+
+    if workers is None or workers <= 1:
+        parser = DsvLineParser(**kwargs)  # compile the config only once
+        for shard in shards:
+            start = time.perf_counter()
+            shard_images = {}
+            read_shard(shard, shard_images, statistics, parser, **kwargs)
+            yield finish(shard_images, start)
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    def collect(future) -> dict[str, list]:
+        start = time.perf_counter()
+        shard_images, shard_statistics = future.result()
+        statistics.merge(shard_statistics)
+        return finish(shard_images, start)
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard in shards:
+            pending.append(executor.submit(read_files, shard, **kwargs))
+            if len(pending) >= workers * 2:
+                yield collect(pending.popleft())
+        while pending:
+            yield collect(pending.popleft())
+
+
+def load_images(path: Path, workers: int = None, statistics: LoadStatistics = None,
+                **kwargs) -> dict[str, list[tuple]]:
+    """Loads the annotation values of all images from a DSV file or a folder with a file per image.
+
+    :param path: file or folder, depending on 'filePerImage', or a tar archive with a file per image
+    :param workers: number of processes that read the files of a folder in shards, one process if None
+    :param statistics: filled with the number of files and lines that were read
+    :return: annotation values by image path, images without annotations are removed
+    """
+    file_per_image = bool(kwargs.get('filePerImage'))
+    statistics = LoadStatistics() if statistics is None else statistics
+
+    images = {}
+    if file_per_image and path.is_dir():
+        for shard_images in iter_folder_shards(path, workers, statistics, **kwargs):
+            for image_path, annotation_values in shard_images.items():
+                images.setdefault(image_path, []).extend(annotation_values)
+        return images
+
+    start = time.perf_counter()
+    parser = DsvLineParser(**kwargs)  # compile the config only once
+    if not file_per_image:
+        if path.is_file():
+            read_file(annotation_file=path, images=images, statistics=statistics, parser=parser, **kwargs)
+    elif path.is_file():
+        read_archive(archive_file=path, images=images, statistics=statistics, parser=parser, **kwargs)
+
+    statistics.seconds += time.perf_counter() - start
+    # delete empty entries
+    return {image_path: values for image_path, values in images.items() if len(values) > 0}
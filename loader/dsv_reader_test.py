@@ -0,0 +1,53 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from loader.dsv_line_parser import DsvLineParser
+from loader.dsv_reader import LoadStatistics, load_images
+
+
+class TestLoadImages(TestCase):
+    config = {'delimiter': ',', 'annotationPerLine': True, 'annotationDelimiter': ' ', 'withPath': True,
+              'pathAtEnd': False, 'classAtEnd': True, 'classMapping': None, 'boundingBox': 'coco',
+              'filePerImage': False}
+
+    def test_lines_of_an_image_are_merged(self):
+        lines = ['a.png,1,2,3,4,Cat', 'b.png,5,6,7,8,Dog', 'a.png,9,10,11,12,Dog']
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder, 'all.txt')
+            path.write_text('\r\n'.join(lines), encoding='UTF-8')
+            statistics = LoadStatistics()
+            images = load_images(path, statistics=statistics, **self.config)
+        self.assertEqual(images, {'a.png': [(1, 2, 3, 4, 'Cat'), (9, 10, 11, 12, 'Dog')],
+                                  'b.png': [(5, 6, 7, 8, 'Dog')]})
+        self.assertEqual((statistics.files, statistics.lines), (1, 3))
+
+    def test_folder_shards_equal_single_process(self):
+        config = {**self.config, 'delimiter': ' ', 'withPath': False, 'boundingBox': 'relativeCenter',
+                  'filePerImage': True, 'imageExtension': 'png'}
+        with tempfile.TemporaryDirectory() as folder:
+            for i in range(30):
+                lines = ['0.5 0.5 0.{} 0.1 {}'.format(j + 1, j) for j in range(i % 4)]
+                Path(folder, '{}.txt'.format(i)).write_text('\n'.join(lines), encoding='UTF-8')
+            single = load_images(Path(folder), **config)
+            statistics = LoadStatistics()
+            sharded = load_images(Path(folder), workers=2, statistics=statistics, **config)
+        self.assertEqual(sharded, single)
+        self.assertEqual(len(single), 30 - 8)  # files without lines have no annotations
+        self.assertEqual(single['3.png'][2], (0.5, 0.5, 0.3, 0.1, 2))
+        self.assertEqual((statistics.files, statistics.lines), (30, 43))
+
+    def test_small_files_are_parsed_together(self):
+        config = {**self.config, 'delimiter': ' ', 'withPath': False, 'boundingBox': 'relativeCenter',
+                  'filePerImage': True, 'imageExtension': None}
+        parser = DsvLineParser(**config)
+        expected = {}
+        with tempfile.TemporaryDirectory() as folder:
+            # the files only reach the size of an array block together
+            for i in range(150):
+                lines = ['0.5 0.5 0.{} 0.1 {}\n'.format(i % 9 + 1, i % 3), '\n', '0.1 0.2 0.3 0.4 1.0\n']
+                Path(folder, '{}.txt'.format(i)).write_text(''.join(lines), encoding='UTF-8')
+                expected[str(i)] = [annotation for line_values in parser.parse_lines(lines)
+                                    for annotation in line_values]
+            statistics = LoadStatistics()
+            self.assertEqual(load_images(Path(folder), statistics=statistics, **config), expected)
+        self.assertEqual((statistics.files, statistics.lines), (150, 450))
@@ -0,0 +1,143 @@
+"""Reads the width and height of PNG, JPEG, GIF and BMP images from their headers without decoding any pixels.
+
+Sizes are stored in a persistent cache that is keyed by the image path, file size and modification time,
+so repeated runs over the same images only need a 'stat' call per image.
+"""
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional, Tuple
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SOI = b'\xff\xd8'
+BMP_SIGNATURE = b'BM'
+GIF_SIGNATURES = (b'GIF87a', b'GIF89a')
+# start of frame markers that contain the image dimensions (without DHT, JPG and DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+
+def _png_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    header = f.read(24)
+    if len(header) < 24 or header[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', header[16:24])
+
+
+def _bmp_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    header = f.read(26)
+    if len(header) < 26:
+        return None
+    dib_header_size = struct.unpack('<I', header[14:18])[0]
+    if dib_header_size == 12:  # BITMAPCOREHEADER
+        return struct.unpack('<HH', header[18:22])
+    width, height = struct.unpack('<ii', header[18:26])
+    return abs(width), abs(height)  # negative height means the rows are stored top-down
+
+
+def _gif_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    header = f.read(10)
+    if len(header) < 10:
+        return None
+    return struct.unpack('<HH', header[6:10])
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':  # skip garbage between segments
+            byte = f.read(1)
+        while byte == b'\xff':  # skip fill bytes
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9:  # end of image
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """Reads the width and height of an image from its header.
+
+    :param path: path to a PNG, JPEG, GIF or BMP file
+    :return: width and height or None if the format is not supported or the header is broken
+    """
+    try:
+        with open(file=path, mode='rb') as f:
+            signature = f.read(8)
+            f.seek(0)
+            if signature.startswith(PNG_SIGNATURE):
+                return _png_size(f)
+            if signature.startswith(JPEG_SOI):
+                return _jpeg_size(f)
+            if signature.startswith(GIF_SIGNATURES):
+                return _gif_size(f)
+            if signature.startswith(BMP_SIGNATURE):
+                return _bmp_size(f)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+class ImageSizeCache:
+    def __init__(self, cache_file: Optional[str] = None, workers: int = 8):
+        """Probes image sizes with a thread pool and keeps them in a JSON file.
+
+        :param cache_file: path of the cache file, nothing is stored if it is None
+        :param workers: number of threads that stat and probe the images
+        """
+        self.cache_file = cache_file
+        self.workers = max(1, workers)
+        self.entries = {}  # path -> [file size, modification time in ns, width, height]
+        self.changed = False
+        if cache_file is not None and Path(cache_file).is_file():
+            with open(file=cache_file, mode='r') as f:
+                self.entries = json.load(f)
+
+    def _size(self, path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2], entry[3]
+        size = read_image_size(path)
+        if size is not None:
+            self.entries[path] = [stat.st_size, stat.st_mtime_ns, size[0], size[1]]
+            self.changed = True
+        return size
+
+    def get_sizes(self, paths: Iterable[str]) -> dict[str, Optional[Tuple[int, int]]]:
+        """Gets the width and height of every image, None for images that could not be read."""
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(paths, executor.map(self._size, paths)))
+
+    def save(self) -> None:
+        """Writes the cache file if any entry was added or updated."""
+        if self.cache_file is None or not self.changed:
+            return
+        Path(self.cache_file).parent.mkdir(parents=True, exist_ok=True)
+        temp_file = str(self.cache_file) + '.tmp'
+        with open(file=temp_file, mode='w') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(temp_file, self.cache_file)  # never leave a partially written cache
+        self.changed = False
@@ -0,0 +1,45 @@
+import os
+import struct
+import tempfile
+from unittest import TestCase
+from loader.image_size import ImageSizeCache, read_image_size
+
+PNG = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 640, 480) + b'\x08\x02\x00\x00\x00'
+# APP0 segment before the baseline frame, which stores the height before the width
+JPEG = b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9) + \
+       b'\xff\xc0' + struct.pack('>HBHH', 17, 8, 480, 640) + b'\x03' + bytes(9)
+GIF = b'GIF89a' + struct.pack('<HH', 640, 480) + b'\x00\x00\x00'
+BMP = b'BM' + bytes(12) + struct.pack('<Iii', 40, 640, -480) + bytes(28)
+
+
+class TestImageSize(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.folder.name, name)
+        with open(file=path, mode='wb') as f:
+            f.write(data)
+        return path
+
+    def test_headers(self):
+        for name, data in (('a.png', PNG), ('a.jpg', JPEG), ('a.gif', GIF), ('a.bmp', BMP)):
+            self.assertEqual(read_image_size(self.write(name, data)), (640, 480), name)
+
+    def test_truncated_and_unknown(self):
+        for name, data in (('a.png', PNG[:20]), ('a.jpg', JPEG[:26]), ('a.gif', GIF[:8]), ('a.bmp', BMP[:20]),
+                           ('a.txt', b'not an image'), ('empty.png', b'')):
+            self.assertIsNone(read_image_size(self.write(name, data)), name)
+        self.assertIsNone(read_image_size(os.path.join(self.folder.name, 'missing.png')))
+
+    def test_cache(self):
+        cache_file = os.path.join(self.folder.name, 'sizes.json')
+        path = self.write('a.png', PNG)
+        cache = ImageSizeCache(cache_file, workers=2)
+        self.assertEqual(cache.get_sizes([path]), {path: (640, 480)})
+        cache.save()
+        self.assertEqual(ImageSizeCache(cache_file).entries[path][2:], [640, 480])
@@ -0,0 +1,126 @@
+"""Sidecar index that maps the filename of every image to the position of its record in a standard JSON.
+
+The index is a compact JSON next to the standard JSON, e.g. 'dataset.json.idx':
+
+    {"version": 2, "source": [size, mtime], "images": {"a.png": [offset, length], ...}, "duplicates": [...]}
+
+'duplicates' holds the offset and length of the records whose filename occurred before, so all records can be
+read in file order.
+"""
+import itertools
+import json
+import os
+from typing import Iterable, Iterator, Tuple
+
+from compression import detect_compression
+from loader.base_json_loader import JsonArrayStream
+from writer.binary_cache_writer import source_signature
+
+INDEX_VERSION = 2
+
+
+def iter_record_spans(filepath: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, int, int]]:
+    """Streams the 'images' array and yields filename, byte offset and byte length of every image record.
+
+    :param filepath: path to the standard JSON
+    :param chunk_size: number of bytes that are read at once
+    """
+    if detect_compression(filepath) is not None:
+        raise ValueError("Random access to '{}' requires an uncompressed file".format(filepath))
+    # latin-1 maps every byte to one character, so positions in the stream are byte offsets
+    with open(file=filepath, mode='r', encoding='latin-1', newline='') as f:
+        stream = JsonArrayStream(f, chunk_size=chunk_size)
+        for record, start, end in stream.iter_array('images', spans=True):
+            filename = record['filename']
+            if not filename.isascii():
+                # non-ASCII filenames were decoded byte by byte and have to be decoded as UTF-8 again
+                f_pos = f.tell()
+                f.seek(start)
+                filename = json.loads(f.read(end - start).encode('latin-1').decode('UTF-8'))['filename']
+                f.seek(f_pos)
+            yield filename, start, end - start
+
+
+def build_index(filepath: str) -> tuple[dict, list]:
+    """Builds the index in one streaming pass. If a filename occurs more than once, its first record is indexed.
+
+    :return: dict of filename to offset and length of the record, and the offsets and lengths of later records
+             with the same filename
+    """
+    index = {}
+    duplicates = []
+    for filename, offset, length in iter_record_spans(filepath):
+        if filename in index:
+            duplicates.append((offset, length))
+        else:
+            index[filename] = (offset, length)
+    return index, duplicates
+
+
+def read_spans(filepath: str, spans: list) -> list[dict]:
+    """Reads and decodes the records at the given offsets and lengths, in the given order.
+
+    :param filepath: path to the standard JSON
+    :param spans: offset and length of every record
+    """
+    records = [None] * len(spans)
+    with open(file=filepath, mode='rb') as f:
+        # read in file order to keep seeks short
+        for i in sorted(range(len(spans)), key=lambda i: spans[i][0]):
+            offset, length = spans[i]
+            f.seek(offset)
+            records[i] = json.loads(f.read(length))
+    return records
+
+
+class JsonIndex:
+    def __init__(self, json_path: str, index_path: str = None):
+        """Reads the index of a standard JSON, it is built and saved if it is missing or the JSON changed.
+
+        :param json_path: path to the standard JSON
+        :param index_path: path to the index file (default: JSON path with the suffix '.idx')
+        """
+        self.json_path = json_path
+        self.index_path = json_path + '.idx' if index_path is None else index_path
+        root = self.read()
+        if root is not None:
+            self.spans, self.duplicates = root['images'], root['duplicates']
+        else:
+            self.spans, self.duplicates = build_index(json_path)
+            self.save()
+
+    def read(self):
+        """Reads the saved index root and returns None if it does not exist or is outdated."""
+        try:
+            with open(file=self.index_path, mode='r', encoding='UTF-8') as f:
+                root = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if root.get('version') != INDEX_VERSION or tuple(root.get('source', ())) != source_signature(self.json_path):
+            return None
+        return root
+
+    def save(self) -> None:
+        temp_path = self.index_path + '.tmp'
+        root = {'version': INDEX_VERSION, 'source': source_signature(self.json_path), 'images': self.spans,
+                'duplicates': self.duplicates}
+        with open(file=temp_path, mode='w', encoding='UTF-8') as f:
+            json.dump(root, f, separators=(',', ':'))
+        os.replace(temp_path, self.index_path)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __contains__(self, filename: str):
+        return filename in self.spans
+
+    def read_records(self, filenames: Iterable[str]) -> list[dict]:
+        """Reads and decodes only the records of the given filenames, in the given order.
+
+        :raises KeyError: if a filename is not in the index
+        """
+        return read_spans(self.json_path, [self.spans[filename] for filename in filenames])
+
+    def record_spans(self) -> list[tuple[int, int]]:
+        """Offset and length of all records in file order, including the records with duplicate filenames."""
+        return sorted(tuple(span) for span in itertools.chain(self.spans.values(), self.duplicates))
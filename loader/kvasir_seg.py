@@ -13,6 +13,7 @@ Dataset dictionary structure is as follows:
 
 import json
 from pathlib import Path
+from typing import Iterator
 from image import Image
 from loader.base_json_loader import BaseLoader
 from annotation.bounding_box import BoundingBox, BoundingBoxFormat
@@ -33,6 +34,10 @@ class KvasirSegLoader(BaseLoader):
             self.boxes_json = json.load(f)
 
     def convert_to_base_format(self) -> list[Image]:
+        return list(self.iter_images())
+
+    def iter_images(self) -> Iterator[Image]:
+        """Yields one image after the other, the annotations of an image are created when it is reached."""
         def load_bounding_boxes(boxes: list) -> list[Annotation]:
             annotations = []
             for box in boxes:
@@ -42,14 +47,12 @@ class KvasirSegLoader(BaseLoader):
                 annotations.append(bbox)
             return annotations
 
-        images = []
         for image_name in self.boxes_json:
             image_filename = image_name + '.jpg'
             img_json = self.boxes_json[image_name]
             img = Image(filename=image_filename, width=img_json['width'], height=img_json['height'])
             img.annotations = load_bounding_boxes(img_json['bbox'])
-            images.append(img)
-        return images
+            yield img
 
 
 if __name__ == '__main__':
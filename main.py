@@ -1,40 +1,130 @@
 import argparse
-import yaml
-from loader.base_json_loader import BaseJsonLoaderV1
-from writer.delimiter_separated_values import dsv_writer
+import sys
+import profiling
 
+# Loaders, writers, numpy and PyYAML are imported by the converters that need them, so a call does not pay for the
+# imports of the others. The values are the ones of 'annotation.validation.ValidationMode'.
+VALIDATION_MODES = ('off', 'report', 'clip', 'drop')
 
-def call_std2dsv(args: argparse.Namespace):
-    # Load standard JSON
-    loader = BaseJsonLoaderV1(filepath=args.input)
-
-    # Load default configs
-    with open(file='configs/config_dsv_default.yaml', mode='r') as file:
-        default_config = yaml.load(file, Loader=yaml.FullLoader)
-
-    # Look for user-specific config YAML file
-    if args.config is None:
-        yaml_file = 'configs/config_dsv_default.yaml'
-    elif args.config == 'yolo':
-        yaml_file = 'configs/config_dsv_yolo.yaml'
-    else:
-        yaml_file = args.config
 
-    # Load YAML file
-    with open(file=yaml_file, mode='r') as file:
-        config_params = yaml.load(file, Loader=yaml.SafeLoader)
+def image_pipeline(images, args: argparse.Namespace, validation, report, keep_undecoded: bool = False):
+    """Chains the transform stages that are selected by the arguments between the loader and the writers.
 
-    # Merge default config with user config
-    config_params = {**default_config, **config_params}
+    :param keep_undecoded: if true, validation does not decode annotations it does not repair
+    """
+    import pipeline
+    from annotation.validation import validate_images
+    stages = []
+    if args.labels:
+        stages.append(pipeline.filter_labels(args.labels))
 
-    # Output is a folder if 'filePerImage' is True, otherwise it is a file
-    if config_params['filePerImage']:
-        config_params['outputFolder'] = args.output
-    else:
-        config_params['outputFile'] = args.output
+    def validate(images):
+        return profiling.active.wrap('validate', validate_images(images, validation, report,
+                                                                 keep_undecoded=keep_undecoded))
 
-    # Write DSV file(s)
-    dsv_writer(images=loader.images, path='', **config_params)
+    stages.append(validate)
+    if args.drop_empty:
+        stages.append(pipeline.drop_empty())
+    if args.prefetch > 0:
+        stages.append(pipeline.threaded(args.prefetch))
+    return pipeline.chain(images, *stages)
+
+
+def call_std2dsv(args: argparse.Namespace):
+    from annotation.validation import ValidationMode, ValidationReport
+    from config import load_config, set_output
+    from image import Image
+    from loader.base_json_loader import BaseJsonLoaderV1
+    from writer.writer import fan_out
+
+    # Stream standard JSON, image records are read while the file is parsed
+    loader = BaseJsonLoaderV1(filepath=args.input, streaming=True)
+
+    # Every output target has its own config, the positional output uses '--config'
+    targets = [] if args.output is None else [(args.config, args.output)]
+    targets += [tuple(target) for target in args.target or []]
+    if not targets:
+        sys.exit('No output defined')
+    configs = [set_output(load_config(config), output) for config, output in targets]
+
+    # Only write files of changed images if the conversion is incremental
+    manifest = None
+    records = profiling.active.wrap('parse json', loader.iter_records())
+    if args.incremental:
+        from writer.incremental import Manifest
+        if len(configs) != 1 or configs[0].get('writer') != 'dsv' or not configs[0]['filePerImage'] \
+                or configs[0].get('archiveFile'):
+            sys.exit("Incremental conversion requires a single DSV output with 'filePerImage' and no archive")
+        options = {'labels': sorted(args.labels) if args.labels else None, 'dropEmpty': args.drop_empty,
+                   'validation': args.validation}
+        manifest = Manifest(configs[0]['outputFolder'], options, **configs[0])
+        records = profiling.active.wrap('manifest', manifest.changed_records(records))
+
+    # Validate the boxes of all images before they are written, undecoded annotations are kept for pass-through
+    validation = ValidationMode(args.validation)
+    report = ValidationReport()
+    keep_undecoded = any(config.get('passThroughAnnotations') for config in configs)
+
+    if args.workers is not None and args.workers > 1:
+        # Convert shards of images in worker processes
+        from compression import detect_compression
+        from writer.delimiter_separated_values import dsv_writer_sharded
+        if len(configs) != 1 or configs[0].get('writer') != 'dsv':
+            sys.exit('Conversion with workers requires a single DSV output')
+        if args.labels or args.drop_empty or args.prefetch:
+            sys.exit("Conversion with workers does not support '--labels', '--drop-empty' and '--prefetch'")
+        json_path = None
+        if manifest is None and detect_compression(args.input) is None:
+            # workers read and decode the records at the offsets of the index, the manifest needs the records
+            records, json_path = loader.index.record_spans(), args.input
+        errors = dsv_writer_sharded(records, args.workers, args.shard_size, path='', validation=validation.value,
+                                    validation_report=report, json_path=json_path, **configs[0])
+    elif args.cache:
+        # Read images from the memory-mapped binary cache, it is written again if the input changed
+        from loader.binary_cache_loader import load_cached
+        if manifest is not None:
+            sys.exit('Incremental conversion cannot read from the binary cache')
+        cache = load_cached(args.input)
+        images = profiling.active.wrap('read cache', cache.iter_images())
+        errors = fan_out(image_pipeline(images, args, validation, report, keep_undecoded), configs, path='')
+        cache.close()
+    else:
+        # Write all outputs in a single pass
+        images = profiling.active.wrap('create images', (Image(**record) for record in records))
+        images = image_pipeline(images, args, validation, report, keep_undecoded)
+        if manifest is not None:
+            images = manifest.track_written(images)
+        errors = fan_out(images, configs, path='')
+    if report.issue_count:
+        print(report, file=sys.stderr)
+    for file_path, error in errors.items():
+        print("Could not write '{}': {}".format(file_path, error), file=sys.stderr)
+    if manifest is not None:
+        manifest.finish(errors)
+        print(manifest, file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+def call_merge(args: argparse.Namespace):
+    from merge import ConflictPolicy, merge, read_path_list
+    filepaths = read_path_list(args.list)
+    count = merge(filepaths, args.output, policy=ConflictPolicy(args.policy), workers=args.workers,
+                  run_size=args.run_size, indent=args.indent, json_lines=args.json_lines)
+    print('Merged {} files into {} images'.format(len(filepaths), count), file=sys.stderr)
+
+
+def call_stats(args: argparse.Namespace):
+    from loader.base_json_loader import BaseJsonLoaderV1
+    from metadata import collect_statistics
+    loader = BaseJsonLoaderV1(filepath=args.input, streaming=True)
+    statistics = collect_statistics(loader.iter_records(), workers=args.workers, shard_size=args.shard_size)
+    if args.json:
+        import json
+        json.dump(statistics.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        print(statistics)
 
 
 if __name__ == '__main__':
@@ -44,25 +134,86 @@ if __name__ == '__main__':
     # different converters
     converters = parser.add_subparsers(dest='converters', help='list of available converters')
 
+    # profiling parameters of every converter
+    profile_parser = argparse.ArgumentParser(add_help=False)
+    profile_parser.add_argument('--profile', action='store_true',
+                                help='print wall time, CPU time, items and peak memory of every stage')
+    profile_parser.add_argument('--profile-output', type=str, metavar='FILE',
+                                help='write trace events (.json) or cProfile statistics (other extensions)')
+
     # std2dsv converter parameters
-    std2dsv = converters.add_parser('std2dsv', help='Converting standard JSON to a specific DSV format')
+    std2dsv = converters.add_parser('std2dsv', help='Converting standard JSON to a specific DSV format',
+                                    parents=[profile_parser])
     std2dsv.add_argument('input', type=str, metavar='INPUT-PATH',
                          help='path to input file with standard JSON format')
-    std2dsv.add_argument('output', type=str, metavar='OUTPUT-PATH',
+    std2dsv.add_argument('output', type=str, metavar='OUTPUT-PATH', nargs='?',
                          help='file or folder depending on \'filePerImage\' parameter')
-    std2dsv.add_argument('--config', type=str, metavar='{CONFIG-PATH, yolo}',
+    std2dsv.add_argument('--config', type=str, metavar='{CONFIG-PATH, yolo, json}',
                          help='path to config file or a pre-defined config')
+    std2dsv.add_argument('--target', type=str, nargs=2, action='append', metavar=('CONFIG', 'OUTPUT-PATH'),
+                         help='additional output with its own config, all outputs are written in a single pass')
+    std2dsv.add_argument('--workers', type=int, default=None,
+                         help='number of processes converting shards of images (single DSV output only)')
+    std2dsv.add_argument('--shard-size', type=int, default=1000, help='number of images per shard of a worker')
+    std2dsv.add_argument('--incremental', action='store_true',
+                         help='only write files of images that changed since the last run (requires \'filePerImage\')')
+    std2dsv.add_argument('--validation', type=str, choices=VALIDATION_MODES, default='report',
+                         help='check that boxes are finite, have a positive size and are inside the image, and '
+                              'report, clip or drop the invalid boxes')
+    std2dsv.add_argument('--cache', action='store_true',
+                         help='read images from a binary cache next to the input, created if missing or outdated')
+    std2dsv.add_argument('--labels', type=str, nargs='+', metavar='LABEL',
+                         help='only write annotations with one of these labels')
+    std2dsv.add_argument('--drop-empty', action='store_true', help='do not write images without annotations')
+    std2dsv.add_argument('--prefetch', type=int, default=0, metavar='N',
+                         help='read and decode up to N images ahead in a background thread')
     # TODO: optional arguments for config parameters
 
-    merge = converters.add_parser('merge', help='Merges a list of standard JSONs into one JSON')
+    merge = converters.add_parser('merge', help='Merges a list of standard JSONs into one JSON',
+                                  parents=[profile_parser])
     merge.add_argument('list', type=str, metavar='FILE-PATH', help='path to file with standard JSON paths')
     merge.add_argument('output', type=str, metavar='OUTPUT-PATH', help='path of merged file')
+    merge.add_argument('--policy', type=str, choices=['union', 'first', 'last'], default='union',
+                       help='how images with the same filename are merged')
+    merge.add_argument('--workers', type=int, default=4, help='number of processes reading the inputs')
+    merge.add_argument('--run-size', type=int, default=10000,
+                       help='number of images a reader sorts in memory before spilling them to disk')
+    merge.add_argument('--indent', type=int, default=None, help='indentation of the output, compact if not set')
+    merge.add_argument('--json-lines', action='store_true', help='write one image per line (JSON Lines)')
+
+    stats = converters.add_parser('stats', help='Counts images, annotations and labels of a standard JSON',
+                                  parents=[profile_parser])
+    stats.add_argument('input', type=str, metavar='INPUT-PATH', help='path to input file with standard JSON format')
+    stats.add_argument('--workers', type=int, default=None, help='number of processes counting shards of images')
+    stats.add_argument('--shard-size', type=int, default=1000, help='number of images per shard of a worker')
+    stats.add_argument('--json', action='store_true', help='print the statistics as JSON')
+
+    serve = converters.add_parser('serve', help='Runs a server that converts standard JSON to DSV on request')
+    serve.add_argument('--host', type=str, default='127.0.0.1', help='host of the HTTP server')
+    serve.add_argument('--port', type=int, default=8080, help='port of the HTTP server')
+    serve.add_argument('--socket', type=str, metavar='SOCKET-PATH', help='listen on a Unix socket instead of a port')
+    serve.add_argument('--workers', type=int, default=None, help='number of processes converting the requests')
+    serve.add_argument('--config', type=str, nargs='+', metavar='{CONFIG-PATH, yolo, json}',
+                       help='configs that are compiled at startup and can be selected by requests, the default DSV '
+                            'config if not set')
+    serve.add_argument('--allow-paths', action='store_true',
+                       help='accept input and output paths of requests, they must be inside the root folder')
+    serve.add_argument('--root', type=str, metavar='FOLDER',
+                       help='root folder of the input and output paths, the working directory if not set')
 
     # parse arguments
     args = parser.parse_args()
 
     # Look which converter should be called
-    if args.converters == 'std2dsv':
-        call_std2dsv(args)
+    with profiling.profile_session(getattr(args, 'profile', False), getattr(args, 'profile_output', None)):
+        if args.converters == 'std2dsv':
+            call_std2dsv(args)
+        elif args.converters == 'merge':
+            call_merge(args)
+        elif args.converters == 'stats':
+            call_stats(args)
+        elif args.converters == 'serve':
+            from server import serve
+            serve(args.host, args.port, args.socket, args.workers, args.config, args.allow_paths, args.root)
 
     # TODO: just use argparse? each schript its own argparser to call
@@ -0,0 +1,178 @@
+"""Merges standard JSON files into one file with a streaming k-way merge.
+
+Every input is streamed and spilled into sorted runs of image records in a temporary folder. All runs are
+merged with a k-way merge by filename, so only one record per run and the records of the current filename
+are held in memory. The merged images are sorted by filename.
+
+At most 'MAX_FAN_IN' runs are open at the same time. If there are more runs, groups of runs are merged into
+longer runs in several passes first, so the number of inputs is not limited by the open file limit.
+"""
+import heapq
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum, unique
+from functools import partial
+from itertools import groupby
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from loader.base_json_loader import iter_json_array
+from writer.base_json_writer import write_json_images
+
+MAX_FAN_IN = 64
+
+
+@unique
+class ConflictPolicy(Enum):
+    """Defines how images with the same filename are merged."""
+    UNION = 'union'
+    FIRST = 'first'
+    LAST = 'last'
+
+    def __str__(self):
+        return self.value
+
+
+def read_path_list(list_file: str) -> list[str]:
+    """Reads the paths of the standard JSON files, one path per line. Empty lines and comments are skipped."""
+    with open(file=list_file, mode='r') as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line != '' and not line.startswith('#')]
+
+
+def spill_runs(filepath: str, source: int, run_size: int, temp_folder: str) -> list[str]:
+    """Streams the images of a standard JSON and writes them as runs sorted by filename.
+
+    :param filepath: path to the standard JSON
+    :param source: index of the file in the input list, it decides which image is first
+    :param run_size: number of images per run, which bounds the memory of a reader
+    :param temp_folder: folder for the run files
+    :return: paths of the run files
+    """
+    run_paths = []
+
+    def write_run(run: list) -> None:
+        run.sort(key=lambda item: (item[0], item[2]))
+        run_path = str(Path(temp_folder, '{}-{}.jsonl'.format(source, len(run_paths))))
+        write_run_items(run, run_path)
+        run_paths.append(run_path)
+
+    run = []
+    for sequence, image in enumerate(iter_json_array(filepath, 'images')):
+        filename = image.get('filename')
+        if filename is None:
+            raise ValueError("Image {} in '{}' has no filename".format(sequence, filepath))
+        run.append((filename, source, sequence, image))
+        if len(run) >= run_size:
+            write_run(run)
+            run = []
+    if run:
+        write_run(run)
+    return run_paths
+
+
+def write_run_items(items: Iterable[list], run_path: str) -> None:
+    with open(file=run_path, mode='w') as f:
+        for item in items:
+            f.write(json.dumps(item))
+            f.write('\n')
+
+
+def iter_run(run_path: str) -> Iterator[list]:
+    with open(file=run_path, mode='r') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def merge_items(run_paths: Iterable[str]) -> Iterator[list]:
+    """Merges the items of sorted runs, all runs are open at the same time."""
+    runs = [iter_run(run_path) for run_path in run_paths]
+    # items are [filename, source, sequence, image], so the input order decides between equal filenames
+    return heapq.merge(*runs, key=lambda item: (item[0], item[1], item[2]))
+
+
+def reduce_runs(run_paths: list[str], temp_folder: str, fan_in: int = MAX_FAN_IN) -> list[str]:
+    """Merges groups of runs into longer runs until at most 'fan_in' runs are left.
+
+    :param run_paths: paths of the sorted runs, they are deleted after they were merged
+    :param temp_folder: folder for the merged runs
+    :param fan_in: maximum number of runs that are open at the same time
+    :return: paths of the remaining runs
+    """
+    fan_in = max(2, fan_in)
+    merge_pass = 0
+    while len(run_paths) > fan_in:
+        merged_paths = []
+        for start in range(0, len(run_paths), fan_in):
+            group = run_paths[start:start + fan_in]
+            if len(group) == 1:
+                merged_paths.append(group[0])
+                continue
+            merged_path = str(Path(temp_folder, 'pass-{}-{}.jsonl'.format(merge_pass, len(merged_paths))))
+            write_run_items(merge_items(group), merged_path)
+            for run_path in group:
+                Path(run_path).unlink()
+            merged_paths.append(merged_path)
+        run_paths = merged_paths
+        merge_pass += 1
+    return run_paths
+
+
+def merge_images(items: list[list], policy: ConflictPolicy) -> dict:
+    """Merges the run items of the same image, which are ordered like the input files.
+
+    The union keeps the fields of the first image and adds the annotations of every input that no earlier input
+    contains. Equal annotations within one input are kept, because they are not duplicates of another source.
+
+    :param items: [filename, source, sequence, image] of every record of the image
+    """
+    if policy is ConflictPolicy.FIRST:
+        return items[0][3]
+    if policy is ConflictPolicy.LAST:
+        return items[-1][3]
+    merged = dict(items[0][3])
+    annotations = []
+    seen = set()  # annotations of the previous inputs
+    for _, source_items in groupby(items, key=lambda item: item[1]):
+        added = set()
+        for item in source_items:
+            for annotation in item[3].get('annotations') or []:
+                key = json.dumps(annotation, sort_keys=True)
+                if key not in seen:
+                    added.add(key)
+                    annotations.append(annotation)
+        seen.update(added)
+    merged['annotations'] = annotations
+    return merged
+
+
+def merge_runs(run_paths: Iterable[str], policy: ConflictPolicy) -> Iterator[dict]:
+    """Yields the merged images of all runs ordered by filename."""
+    for _, group in groupby(merge_items(run_paths), key=lambda item: item[0]):
+        yield merge_images(list(group), policy)
+
+
+def merge(filepaths: list[str], output_file: str, policy: ConflictPolicy = ConflictPolicy.UNION,
+          workers: int = 4, run_size: int = 10000, indent: int = None, json_lines: bool = False,
+          fan_in: int = MAX_FAN_IN) -> int:
+    """Merges standard JSON files into one file and deduplicates images by filename.
+
+    :param filepaths: paths of the standard JSON files, earlier files are first for the conflict policy
+    :param output_file: path of the merged file
+    :param policy: how images with the same filename are merged, the union only drops annotations that an
+        earlier file contains
+    :param workers: number of processes that read the inputs in parallel
+    :param run_size: number of images that a reader sorts in memory
+    :param indent: indentation of the output, compact output if it is None
+    :param json_lines: if the output has one image per line
+    :param fan_in: maximum number of runs that are merged at the same time
+    :return: number of merged images
+    """
+    with tempfile.TemporaryDirectory(prefix='cvdfc-merge-') as temp_folder:
+        spill = partial(spill_runs, run_size=run_size, temp_folder=temp_folder)
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            run_lists = list(executor.map(spill, filepaths, range(len(filepaths))))
+        run_paths = reduce_runs([run_path for run_list in run_lists for run_path in run_list], temp_folder, fan_in)
+        return write_json_images(merge_runs(run_paths, policy), outputFile=output_file, indent=indent,
+                                 jsonLines=json_lines)
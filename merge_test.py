@@ -0,0 +1,73 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+import merge as merge_module
+from merge import ConflictPolicy, merge
+
+
+def record(filename: str, *labels: str, width: int = 100) -> dict:
+    return {'filename': filename, 'width': width, 'height': 100, 'annotations': [
+        {'type': 'boundingBox', 'format': 'coco', 'label': label, 'x': 1, 'y': 2, 'width': 3, 'height': 4}
+        for label in labels]}
+
+
+class TestMerge(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def merge(self, inputs: list[list[dict]], policy: ConflictPolicy, **kwargs) -> list[dict]:
+        paths = []
+        for i, images in enumerate(inputs):
+            path = Path(self.folder.name, '{}.json'.format(i))
+            path.write_text(json.dumps({'images': images}), encoding='UTF-8')
+            paths.append(str(path))
+        output = Path(self.folder.name, 'merged.json')
+        # small runs spill every input into several sorted runs
+        count = merge(paths, str(output), policy, **{'workers': 1, 'run_size': 2, **kwargs})
+        images = json.loads(output.read_text(encoding='UTF-8'))['images']
+        self.assertEqual(count, len(images))
+        return images
+
+    def test_policies(self):
+        inputs = [[record('c.png', 'Cat'), record('a.png', 'Cat', width=1), record('b.png')],
+                  [record('a.png', 'Dog', width=2), record('d.png', 'Dog')],
+                  [record('a.png', 'Cat', 'Bird', width=3)]]
+        first = self.merge(inputs, ConflictPolicy.FIRST)
+        self.assertEqual([image['filename'] for image in first], ['a.png', 'b.png', 'c.png', 'd.png'])
+        self.assertEqual(first[0]['width'], 1)
+        self.assertEqual(self.merge(inputs, ConflictPolicy.LAST)[0]['width'], 3)
+        union = self.merge(inputs, ConflictPolicy.UNION)[0]
+        self.assertEqual(union['width'], 1)
+        self.assertEqual([annotation['label'] for annotation in union['annotations']], ['Cat', 'Dog', 'Bird'])
+
+    def test_union_only_drops_duplicates_of_other_inputs(self):
+        inputs = [[record('a.png', 'Cat', 'Cat', 'Dog')], [record('a.png', 'Dog', 'Bird', 'Bird')]]
+        union = self.merge(inputs, ConflictPolicy.UNION)[0]
+        self.assertEqual([annotation['label'] for annotation in union['annotations']],
+                         ['Cat', 'Cat', 'Dog', 'Bird', 'Bird'])
+
+    def test_bounded_fan_in(self):
+        inputs = [[record('{}.png'.format((i + j) % 7), str(i), width=i) for j in range(3)] for i in range(20)]
+        expected = self.merge(inputs, ConflictPolicy.UNION, run_size=1)
+        open_runs = {'current': 0, 'max': 0}
+        iter_run = merge_module.iter_run
+
+        def counting_iter_run(run_path: str):
+            open_runs['current'] += 1
+            open_runs['max'] = max(open_runs['max'], open_runs['current'])
+            try:
+                yield from iter_run(run_path)
+            finally:
+                open_runs['current'] -= 1
+
+        # 60 runs of one image are merged in several passes of at most 4 runs
+        with patch.object(merge_module, 'iter_run', counting_iter_run):
+            self.assertEqual(self.merge(inputs, ConflictPolicy.UNION, run_size=1, fan_in=4), expected)
+        self.assertEqual(open_runs['max'], 4)
+        self.assertEqual([image['filename'] for image in expected], ['{}.png'.format(i) for i in range(7)])
@@ -1,3 +1,10 @@
+import math
+from collections import Counter
+from typing import Iterable, Optional
+
+from image import Image
+
+
 class Metadata():
     def __init__(self):
         self.version = None
@@ -11,4 +18,154 @@ class Metadata():
         self.imageSecondaryLabels = None
         self.annotationPrimaryLabels = None
         self.annotationInstances = None
-        self.annotationSecondaryLabels = None
\ No newline at end of file
+        self.annotationSecondaryLabels = None
+
+    def to_dict(self) -> dict:
+        return {key: sorted(value) if isinstance(value, set) else value for key, value in vars(self).items()}
+
+
+INVALID_BIN = -1
+
+
+def size_bin(value: float) -> int:
+    """Histogram bin of a box side length, bin i counts lengths in [2^i, 2^(i+1)) and bin 0 also all below 1.
+    Infinite and NaN lengths are counted in 'INVALID_BIN'."""
+    if not math.isfinite(value):
+        return INVALID_BIN
+    return max(0, int(math.log2(value))) if value > 0 else 0
+
+
+def bin_name(index: int) -> str:
+    if index == INVALID_BIN:
+        return 'invalid'
+    return '{}-{}'.format(0 if index == 0 else 2 ** index, 2 ** (index + 1))
+
+
+class Statistics:
+    def __init__(self):
+        """Counts of a dataset that are collected in a single pass. Partial results of shards can be merged."""
+        self.image_count = 0
+        self.images_with_annotations = 0
+        self.annotation_count = 0
+        self.image_labels = Counter()
+        self.image_instances = set()
+        self.image_additional_labels = Counter()
+        self.annotation_labels = Counter()
+        self.annotation_instances = set()
+        self.annotation_additional_labels = Counter()
+        self.width_histogram = Counter()
+        self.height_histogram = Counter()
+
+    def add(self, image: Image) -> None:
+        self.image_count += 1
+        if image.label:  # empty if the image has no label
+            self.image_labels[image.label] += 1
+        if image.instance:
+            self.image_instances.add(image.instance)
+        self.image_additional_labels.update(image.additional_labels)
+        annotations = image.annotations
+        if annotations:
+            self.images_with_annotations += 1
+        self.annotation_count += len(annotations)
+        for annotation in annotations:
+            if annotation.label:
+                self.annotation_labels[annotation.label] += 1
+            if annotation.instance:
+                self.annotation_instances.add(annotation.instance)
+            self.annotation_additional_labels.update(annotation.additional_labels)
+            box_values = getattr(annotation, 'box_values', None)
+            if box_values is not None:  # box values are in coco format
+                self.width_histogram[size_bin(box_values[2])] += 1
+                self.height_histogram[size_bin(box_values[3])] += 1
+
+    def add_all(self, images: Iterable[Image]) -> 'Statistics':
+        for image in images:
+            self.add(image)
+        return self
+
+    def merge(self, other: 'Statistics') -> 'Statistics':
+        for key, value in vars(other).items():
+            if isinstance(value, set):
+                getattr(self, key).update(value)
+            elif isinstance(value, Counter):
+                getattr(self, key).update(value)
+            else:
+                setattr(self, key, getattr(self, key) + value)
+        return self
+
+    def to_metadata(self, metadata: Optional[Metadata] = None) -> Metadata:
+        """Populates the counts and label sets of the metadata."""
+        metadata = Metadata() if metadata is None else metadata
+        metadata.totalImageCount = self.image_count
+        metadata.imageCountWithAnnotations = self.images_with_annotations
+        metadata.annotationCount = self.annotation_count
+        metadata.imagePrimaryLabels = set(self.image_labels)
+        metadata.imageInstances = set(self.image_instances)
+        metadata.imageSecondaryLabels = set(self.image_additional_labels)
+        metadata.annotationPrimaryLabels = set(self.annotation_labels)
+        metadata.annotationInstances = set(self.annotation_instances)
+        metadata.annotationSecondaryLabels = set(self.annotation_additional_labels)
+        return metadata
+
+    def to_dict(self) -> dict:
+        def histogram(counter: Counter) -> dict:
+            return {bin_name(index): counter[index] for index in sorted(counter)}
+
+        return {'metadata': self.to_metadata().to_dict(),
+                'imageLabelCounts': dict(self.image_labels.most_common()),
+                'imageSecondaryLabelCounts': dict(self.image_additional_labels.most_common()),
+                'annotationLabelCounts': dict(self.annotation_labels.most_common()),
+                'annotationSecondaryLabelCounts': dict(self.annotation_additional_labels.most_common()),
+                'boxWidthHistogram': histogram(self.width_histogram),
+                'boxHeightHistogram': histogram(self.height_histogram)}
+
+    def __str__(self):
+        lines = ['Images: {} ({} with annotations)'.format(self.image_count, self.images_with_annotations),
+                 'Annotations: {}'.format(self.annotation_count)]
+        for title, counter in (('Image labels', self.image_labels), ('Annotation labels', self.annotation_labels)):
+            if counter:
+                lines.append(title + ':')
+                lines += ['  {}: {}'.format(label, count) for label, count in counter.most_common()]
+        for title, counter in (('Box widths', self.width_histogram), ('Box heights', self.height_histogram)):
+            if counter:
+                lines.append(title + ':')
+                lines += ['  {}: {}'.format(bin_name(index), counter[index]) for index in sorted(counter)]
+        return '\n'.join(lines)
+
+
+def shard_statistics(records: list[dict]) -> Statistics:
+    """Collects the statistics of a shard of image records, used by the worker processes of 'collect_statistics'."""
+    return Statistics().add_all(Image(**record) for record in records)
+
+
+def collect_statistics(records: Iterable[dict], workers: int = None, shard_size: int = 1000) -> Statistics:
+    """Collects the statistics of image records in a single streaming pass.
+
+    With more than one worker, shards of records are counted by a process pool and the partial results are merged.
+    At most two shards per worker are pending, so the memory does not depend on the number of images.
+
+    :param records: image dicts of the standard JSON
+    :param workers: number of worker processes, the records are counted in this process if None or 1
+    :param shard_size: number of images per shard
+    """
+    if workers is None or workers <= 1:
+        return Statistics().add_all(Image(**record) for record in records)
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import islice
+
+    statistics = Statistics()
+    records = iter(records)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            shard = list(islice(records, shard_size))
+            if not shard:
+                break
+            pending.append(executor.submit(shard_statistics, shard))
+            if len(pending) >= workers * 2:
+                statistics.merge(pending.popleft().result())
+        while pending:
+            statistics.merge(pending.popleft().result())
+    return statistics
@@ -0,0 +1,32 @@
+from unittest import TestCase
+from metadata import Statistics, collect_statistics
+
+
+class TestStatistics(TestCase):
+
+    def test_merge_of_shards_equals_single_pass(self):
+        records = [{'filename': '{}.png'.format(i), 'width': 100, 'height': 100, 'label': 'Day' if i % 2 else '',
+                    'annotations': [{'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'instance': str(j),
+                                     'x': 0, 'y': 0, 'width': j + 0.5, 'height': 10 * j + 1,
+                                     'additionalLabels': ['Small']} for j in range(i % 3)]}
+                   for i in range(10)]
+        total = collect_statistics(records)
+        merged = collect_statistics(records[:4]).merge(collect_statistics(records[4:]))
+        self.assertEqual(merged.to_dict(), total.to_dict())
+        self.assertEqual(vars(total.to_metadata()), vars(Statistics().merge(total).to_metadata()))
+
+        metadata = total.to_metadata()
+        self.assertEqual((metadata.totalImageCount, metadata.imageCountWithAnnotations, metadata.annotationCount),
+                         (10, 6, 9))
+        self.assertEqual(metadata.imagePrimaryLabels, {'Day'})
+        self.assertEqual(metadata.annotationInstances, {'0', '1'})
+        self.assertEqual(total.annotation_additional_labels['Small'], 9)
+        self.assertEqual(total.to_dict()['boxWidthHistogram'], {'0-2': 9})
+        self.assertEqual(total.to_dict()['boxHeightHistogram'], {'0-2': 6, '8-16': 3})
+
+    def test_non_finite_box_sizes(self):
+        records = [{'filename': '1.png', 'width': 100, 'height': 100, 'annotations': [
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 0, 'y': 0, 'width': width,
+             'height': 4} for width in (float('inf'), float('nan'), 3)]}]
+        histogram = collect_statistics(records).to_dict()['boxWidthHistogram']
+        self.assertEqual(histogram, {'invalid': 2, '2-4': 1})
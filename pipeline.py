@@ -0,0 +1,142 @@
+"""Chained generator stages between a loader and a writer.
+
+A pipeline starts with the images of a loader ('iter_images()'), passes them through transform stages and ends in a
+writer that consumes the stream (e.g. 'writer.writer.fan_out'). Every stage is a generator that takes and yields
+images, so only the images that are in flight are held in memory:
+
+    images = loader.iter_images()
+    images = pipeline.chain(images, pipeline.filter_labels({'cat', 'dog'}), pipeline.drop_empty(),
+                            pipeline.threaded(buffer_size=64))
+    errors = fan_out(images, configs)
+
+Stages are created with their parameters and called with the images of the previous stage. 'threaded' runs the
+previous stages in a background thread, so reading and decoding overlap with formatting and writing.
+"""
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+from annotation.bounding_box import BoundingBox
+from image import Image
+
+Stage = Callable[[Iterable[Image]], Iterator[Image]]
+
+_END = object()
+
+
+def chain(images: Iterable[Image], *stages: Stage) -> Iterator[Image]:
+    """Passes the images through the stages in the given order."""
+    for stage in stages:
+        images = stage(images)
+    return iter(images)
+
+
+def filter_images(predicate: Callable[[Image], bool]) -> Stage:
+    """Keeps the images for which the predicate is true."""
+    def stage(images: Iterable[Image]) -> Iterator[Image]:
+        for image in images:
+            if predicate(image):
+                yield image
+    return stage
+
+
+def filter_labels(labels: Iterable[str]) -> Stage:
+    """Keeps the annotations whose label is one of the labels, images are kept even if they have none left."""
+    labels = set(labels)
+
+    def stage(images: Iterable[Image]) -> Iterator[Image]:
+        for image in images:
+            image.annotations = [annotation for annotation in image.annotations if annotation.label in labels]
+            yield image
+    return stage
+
+
+def drop_empty() -> Stage:
+    """Removes images without annotations, the annotations are not decoded to count them."""
+    return filter_images(lambda image: image.annotation_count > 0)
+
+
+def remap_labels(mapping: dict[str, str]) -> Stage:
+    """Renames the annotation labels, labels that are not in the mapping are kept."""
+    def stage(images: Iterable[Image]) -> Iterator[Image]:
+        for image in images:
+            for annotation in image.annotations:
+                annotation.label = mapping.get(annotation.label, annotation.label)
+            yield image
+    return stage
+
+
+def rescale(width: int = None, height: int = None, factor: float = None) -> Stage:
+    """Resizes the images and their bounding boxes.
+
+    :param width: new image width, the aspect ratio is kept if the height is None
+    :param height: new image height, the aspect ratio is kept if the width is None
+    :param factor: scale factor of both sides, if width and height are None
+    """
+    if width is None and height is None and factor is None:
+        raise ValueError('Rescaling requires a width, a height or a factor')
+
+    def stage(images: Iterable[Image]) -> Iterator[Image]:
+        for image in images:
+            if width is None and height is None:
+                scale_x = scale_y = factor
+            else:
+                scale_x = width / image.width if width is not None else height / image.height
+                scale_y = height / image.height if height is not None else scale_x
+            for annotation in image.annotations:
+                if isinstance(annotation, BoundingBox):
+                    x, y, w, h = annotation.box_values
+                    annotation.box_values = (x * scale_x, y * scale_y, w * scale_x, h * scale_y)
+            image.width = width if width is not None else round(image.width * scale_x)
+            image.height = height if height is not None else round(image.height * scale_y)
+            yield image
+    return stage
+
+
+def threaded(buffer_size: int = 64) -> Stage:
+    """Produces the images of the previous stages in a background thread.
+
+    The thread stops when 'buffer_size' images are waiting, so a slow consumer holds back the producer and the
+    memory stays bounded. Exceptions of the producer are raised in the consuming thread, and the producer is
+    stopped if the consumer closes the stream early.
+    """
+    if buffer_size < 1:
+        raise ValueError('The buffer size must be at least one')
+
+    def stage(images: Iterable[Image]) -> Iterator[Image]:
+        items = queue.Queue(maxsize=buffer_size)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            try:
+                for image in images:
+                    if not put(image):
+                        return
+            except BaseException as e:  # raised again in the consuming thread
+                put(e)
+                return
+            put(_END)
+
+        thread = threading.Thread(target=produce, name='pipeline', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            thread.join()
+    return stage
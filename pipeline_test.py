@@ -0,0 +1,54 @@
+import threading
+from unittest import TestCase
+import pipeline
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat
+from image import Image
+
+
+def create_image(filename: str, labels: list[str]) -> Image:
+    image = Image(filename=filename, width=100, height=50)
+    annotations = []
+    for label in labels:
+        box = BoundingBox(box_values=(10, 10, 20, 10), box_format=BoundingBoxFormat.COCO)
+        box.label = label
+        annotations.append(box)
+    image.annotations = annotations
+    return image
+
+
+class TestPipeline(TestCase):
+
+    def test_transforms(self):
+        images = [create_image('1.jpg', ['cat', 'dog']), create_image('2.jpg', ['bird']), create_image('3.jpg', [])]
+        result = list(pipeline.chain(images, pipeline.filter_labels({'cat', 'dog'}), pipeline.drop_empty(),
+                                     pipeline.remap_labels({'dog': 'puppy'}), pipeline.rescale(width=200)))
+        self.assertEqual([image.filename for image in result], ['1.jpg'])
+        self.assertEqual((result[0].width, result[0].height), (200, 100))
+        self.assertEqual([bb.label for bb in result[0].annotations], ['cat', 'puppy'])
+        self.assertEqual(result[0].annotations[0].box_values, (20, 20, 40, 20))
+
+    def test_threaded_backpressure(self):
+        produced = []
+
+        def produce():
+            for i in range(100):
+                produced.append(i)
+                yield create_image('{}.jpg'.format(i), [])
+
+        images = pipeline.threaded(buffer_size=4)(produce())
+        self.assertEqual(next(images).filename, '0.jpg')
+        # the producer waits while the buffer is full
+        threading.Event().wait(0.2)
+        self.assertLessEqual(len(produced), 7)
+        images.close()
+        self.assertLess(len(produced), 100)
+
+    def test_threaded_raises_producer_errors(self):
+        def produce():
+            yield create_image('1.jpg', [])
+            raise ValueError('broken record')
+
+        images = pipeline.threaded(buffer_size=2)(produce())
+        self.assertEqual(next(images).filename, '1.jpg')
+        with self.assertRaises(ValueError):
+            next(images)
@@ -0,0 +1,175 @@
+"""Opt-in timing of the pipeline stages.
+
+Code marks its stages with 'profiling.active.stage(name)' or wraps iterators with 'profiling.active.wrap(name, it)'.
+Without a profile session 'active' is a profiler that does nothing, so the marks cost close to nothing.
+Stage times are exclusive: the time of a stage that runs inside another stage (e.g. a wrapped iterator that pulls
+from another wrapped iterator) is only counted for the inner stage.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+MAX_TRACE_EVENTS = 1_000_000
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident memory of the process in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # kilobytes on Linux
+
+
+class Stage:
+    __slots__ = ('name', 'calls', 'items', 'wall', 'cpu', 'peak_rss')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.items = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss = None
+
+
+class NullProfiler:
+    """Profiler that is active if no profile session runs, all methods do nothing."""
+    _null_context = contextlib.nullcontext()
+
+    def stage(self, name: str, items: int = 1):
+        return self._null_context
+
+    def wrap(self, name: str, iterable: Iterable) -> Iterable:
+        return iterable
+
+
+class Profiler(NullProfiler):
+    def __init__(self, trace: bool = False):
+        """Collects wall time, CPU time, calls, items and the peak memory of every stage.
+
+        :param trace: if true, every stage call is also recorded as trace event
+        """
+        self.stages = {}
+        self.trace_events = [] if trace else None
+        self.start = time.perf_counter()
+        self._stack = []  # time of inner stages per running stage
+        self._thread = threading.get_ident()
+
+    def _get(self, name: str) -> Stage:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        return stage
+
+    def _enter(self) -> tuple[float, float]:
+        self._stack.append([0.0, 0.0])
+        return time.perf_counter(), time.process_time()
+
+    def _exit(self, stage: Stage, start: tuple[float, float], items: int) -> None:
+        wall = time.perf_counter() - start[0]
+        cpu = time.process_time() - start[1]
+        inner_wall, inner_cpu = self._stack.pop()
+        if self._stack:
+            self._stack[-1][0] += wall
+            self._stack[-1][1] += cpu
+        stage.calls += 1
+        stage.items += items
+        stage.wall += wall - inner_wall
+        stage.cpu += cpu - inner_cpu
+        stage.peak_rss = peak_rss()
+        if self.trace_events is not None and len(self.trace_events) < MAX_TRACE_EVENTS:
+            self.trace_events.append({'name': stage.name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                                      'ts': (start[0] - self.start) * 1e6, 'dur': wall * 1e6})
+
+    @contextlib.contextmanager
+    def stage(self, name: str, items: int = 1):
+        """Measures the code in the 'with' block as one call of the stage."""
+        if threading.get_ident() != self._thread:  # stages of other threads are not measured
+            yield
+            return
+        stage = self._get(name)
+        start = self._enter()
+        try:
+            yield
+        finally:
+            self._exit(stage, start, items)
+
+    def wrap(self, name: str, iterable: Iterable) -> Iterator:
+        """Measures the time that is spent to produce every item of the iterable."""
+        iterator = iter(iterable)
+        if threading.get_ident() != self._thread:  # iterated by a pipeline thread, not measured
+            yield from iterator
+            return
+        stage = self._get(name)
+        while True:
+            start = self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._exit(stage, start, 0)
+                return
+            except BaseException:
+                self._exit(stage, start, 0)
+                raise
+            self._exit(stage, start, 1)
+            yield item
+
+    def summary(self) -> str:
+        lines = ['{:<20} {:>8} {:>10} {:>10} {:>10} {:>12} {:>10}'.format(
+            'stage', 'calls', 'items', 'wall s', 'cpu s', 'items/s', 'peak MiB')]
+        for stage in self.stages.values():
+            lines.append('{:<20} {:>8} {:>10} {:>10.3f} {:>10.3f} {:>12.0f} {:>10}'.format(
+                stage.name, stage.calls, stage.items, stage.wall, stage.cpu,
+                stage.items / stage.wall if stage.wall > 0 else 0,
+                '-' if stage.peak_rss is None else '{:.1f}'.format(stage.peak_rss / 2 ** 20)))
+        total = time.perf_counter() - self.start
+        lines.append('{:<20} {:>8} {:>10} {:>10.3f}'.format('total', '', '', total))
+        return '\n'.join(lines)
+
+    def write_trace(self, path: str) -> None:
+        """Writes the trace events in the Chrome trace event format (chrome://tracing, Perfetto)."""
+        with open(file=path, mode='w') as f:
+            json.dump({'traceEvents': self.trace_events or [], 'displayTimeUnit': 'ms'}, f)
+
+
+active = NullProfiler()
+
+
+@contextlib.contextmanager
+def profile_session(enabled: bool, output: str = None):
+    """Activates a profiler and prints the stage summary to the standard error at the end.
+
+    :param enabled: if false, nothing is measured
+    :param output: optional output file, trace events if it ends with '.json', cProfile statistics otherwise
+    """
+    global active
+    if not enabled and output is None:
+        yield None
+        return
+    trace = output is not None and output.endswith('.json')
+    profiler = Profiler(trace=trace)
+    c_profile = None
+    if output is not None and not trace:
+        import cProfile
+        c_profile = cProfile.Profile()
+        c_profile.enable()
+    active = profiler
+    try:
+        yield profiler
+    finally:
+        active = NullProfiler()
+        if c_profile is not None:
+            c_profile.disable()
+            c_profile.dump_stats(output)
+        elif trace:
+            profiler.write_trace(output)
+        print(profiler.summary(), file=sys.stderr)
@@ -0,0 +1,30 @@
+import time
+from unittest import TestCase
+import profiling
+from profiling import Profiler
+
+
+class TestProfiler(TestCase):
+
+    def test_stage_times_are_exclusive(self):
+        profiler = Profiler()
+
+        def produce():
+            for i in range(3):
+                time.sleep(0.01)
+                yield i
+
+        for _ in profiler.wrap('outer', profiler.wrap('inner', produce())):
+            with profiler.stage('work', items=2):
+                time.sleep(0.005)
+        inner, outer, work = (profiler.stages[name] for name in ('inner', 'outer', 'work'))
+        self.assertEqual((inner.items, outer.items, work.items, work.calls), (3, 3, 6, 3))
+        self.assertGreaterEqual(inner.wall, 0.03)
+        self.assertLess(outer.wall, 0.01)
+        self.assertGreaterEqual(work.wall, 0.015)
+
+    def test_session(self):
+        self.assertIsInstance(profiling.active, profiling.NullProfiler)
+        with profiling.profile_session(False) as profiler:
+            self.assertIsNone(profiler)
+        self.assertNotIsInstance(profiling.active, Profiler)
@@ -0,0 +1,240 @@
+"""Conversion daemon that keeps the interpreter, the configs and the compiled formatters warm.
+
+The server listens on localhost HTTP or a Unix socket and converts standard JSON to DSV in a pool of worker
+processes, so interpreter startup, imports and config parsing are paid once instead of once per conversion.
+
+    POST /std2dsv?config=CONFIG&validation=MODE     body: standard JSON, responds with the DSV text
+    POST /std2dsv?config=CONFIG&output=PATH         body: standard JSON, writes the output like 'main std2dsv'
+    POST /std2dsv?config=CONFIG&input=PATH&output=PATH    converts a file, the body is empty
+    GET /health
+
+'config' is one of the configs the server was started with (the first one if missing) and 'validation' is
+one of 'annotation.validation.ValidationMode' (default 'report'). Responses without DSV text are JSON objects with
+the number of images, the number of validation issues and the files that could not be written. Invalid requests
+are answered with 400 and the error message.
+
+Every conversion request must send the server token in the 'X-CVDF-Token' header, otherwise it is answered with
+403. The token is 'CVDF_SERVER_TOKEN' if the environment variable is set, otherwise a random token that is printed
+at startup. Browsers cannot send this header cross-site without a CORS preflight, which the server does not
+allow. 'input' and 'output' paths are only accepted if the server was started with 'allow_paths', they are
+relative to its root folder and must not leave it.
+"""
+import hmac
+import json
+import os
+import secrets
+import socketserver
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+TOKEN_HEADER = 'X-CVDF-Token'
+
+_formatters = {}  # compiled formatters of a worker process by config, with the config they were compiled from
+
+
+def compiled_formatter(config: Optional[str], config_params: dict):
+    """Gets the DSV formatter of a config, it is compiled again if the config file changed."""
+    from writer.delimiter_separated_values import DsvFormatter
+    cached = _formatters.get(config)
+    if cached is None or cached[0] != config_params:
+        cached = _formatters[config] = (config_params, DsvFormatter(path='', **config_params))
+    return cached[1]
+
+
+def warm_up(configs: list[Optional[str]]) -> None:
+    """Imports the converter modules and compiles the formatters of the configs in a worker process."""
+    from config import load_config
+    for config in configs:
+        config_params = load_config(config)
+        if config_params.get('writer') == 'dsv':
+            compiled_formatter(config, config_params)
+
+
+def convert(config: Optional[str] = None, validation: str = 'report', payload: bytes = None, input_path: str = None,
+            output: str = None) -> tuple[Optional[str], dict]:
+    """Converts the images of a standard JSON payload or file, runs in a worker process.
+
+    :param config: config path or pre-defined config name, the default DSV config if None
+    :param validation: validation mode of the boxes
+    :param payload: standard JSON document, 'input_path' is read if None
+    :param input_path: path to a standard JSON file
+    :param output: output path, the DSV text is returned if None
+    :return: the DSV text or None if an output was written, and the result counts
+    """
+    from annotation.validation import ValidationMode, ValidationReport, validate_images
+    from config import load_config, set_output
+    from image import Image
+    from loader.base_json_loader import iter_json_array
+
+    config_params = load_config(config)
+    if payload is not None:
+        document = json.loads(payload)
+        if not isinstance(document, dict):
+            raise ValueError('The body is not a standard JSON document')
+        records = document.get('images', [])
+    elif input_path is not None:
+        records = iter_json_array(input_path, 'images')
+    else:
+        raise ValueError("A standard JSON body or an 'input' path is required")
+    counts = {'images': 0}
+
+    def create_images():
+        for record in records:
+            counts['images'] += 1
+            yield Image(**record)
+
+    report = ValidationReport()
+    images = validate_images(create_images(), ValidationMode(validation), report,
+                             keep_undecoded=bool(config_params.get('passThroughAnnotations')))
+    if output is None:
+        if config_params.get('writer') != 'dsv' or config_params.get('filePerImage'):
+            raise ValueError("An 'output' path is required for JSON configs and configs with 'filePerImage'")
+        formatter = compiled_formatter(config, config_params)
+        text = config_params['lineTerminator'].join(formatter.format_image(image) for image in images)
+        return text, {**counts, 'validationIssues': report.issue_count}
+    from writer.writer import fan_out
+    errors = fan_out(images, [set_output(config_params, output)], path='')
+    return None, {**counts, 'validationIssues': report.issue_count,
+                  'errors': {file_path: str(error) for file_path, error in errors.items()}}
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    server_version = 'cvdf-converter'
+
+    def address_string(self) -> str:
+        # clients of a Unix socket have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_text(self, status: int, text: str) -> None:
+        self.send_body(status, bytes(text, 'UTF-8'), 'text/plain; charset=utf-8')
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/health':
+            self.send_text(200, 'ok')
+        else:
+            self.send_text(404, 'Not found')
+
+    def resolve_path(self, path: Optional[str]) -> Optional[str]:
+        """Resolves a path of a request against the root folder, paths that leave it raise a PermissionError."""
+        if path is None:
+            return None
+        if not self.server.allow_paths:
+            raise PermissionError('The server does not accept input and output paths')
+        root = self.server.root
+        resolved = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, resolved]) != root:
+            raise PermissionError("Path '{}' is outside of the root folder".format(path))
+        return resolved
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/std2dsv':
+            self.send_text(404, 'Not found')
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = self.rfile.read(length) if length > 0 else None
+        token = self.headers.get(TOKEN_HEADER) or ''
+        if not hmac.compare_digest(token.encode('UTF-8'), self.server.token.encode('UTF-8')):
+            self.send_text(403, "Missing or invalid '{}' header".format(TOKEN_HEADER))
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            config = query.get('config', self.server.configs[0])
+            if config not in self.server.configs:
+                raise PermissionError("Config '{}' was not loaded at startup".format(config))
+            input_path = self.resolve_path(query.get('input'))
+            output = self.resolve_path(query.get('output'))
+        except PermissionError as e:
+            self.send_text(403, str(e))
+            return
+        try:
+            future = self.server.executor.submit(convert, config, query.get('validation', 'report'),
+                                                 payload, input_path, output)
+            text, result = future.result()
+        except (ValueError, OSError) as e:
+            self.send_text(400, str(e))
+            return
+        except Exception as e:
+            self.send_text(500, '{}: {}'.format(type(e).__name__, e))
+            return
+        if text is not None:
+            headers = {'X-Images': str(result['images']), 'X-Validation-Issues': str(result['validationIssues'])}
+            self.send_body(200, bytes(text, 'UTF-8'), 'text/plain; charset=utf-8', headers)
+        else:
+            self.send_body(200 if not result['errors'] else 500, bytes(json.dumps(result), 'UTF-8'),
+                           'application/json')
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(host: str = '127.0.0.1', port: int = 8080, socket_path: str = None, workers: int = None,
+                  configs: list[Optional[str]] = None, token: str = None, allow_paths: bool = False,
+                  root: str = None):
+    """Creates the HTTP server and its worker pool, requests are handled after 'serve_forever()' is called.
+
+    :param host: host of the HTTP server, only used without a socket path
+    :param port: port of the HTTP server, 0 selects a free port
+    :param socket_path: path of a Unix socket to listen on instead of a TCP port
+    :param workers: number of worker processes (default: number of CPUs)
+    :param configs: configs that are loaded and compiled by every worker at startup, the default DSV config if None.
+        Requests can only select these configs.
+    :param token: token that requests must send, 'CVDF_SERVER_TOKEN' or a random token if None
+    :param allow_paths: if true, requests can read and write files by path inside the root folder
+    :param root: root folder of the paths of requests (default: working directory)
+    """
+    from config import load_config
+    configs = [None] if configs is None else configs
+    for config in configs:  # invalid configs fail before the server starts
+        load_config(config)
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, ConversionHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingHTTPServer((host, port), ConversionHandler)
+    server.configs = configs
+    server.token = token or os.environ.get('CVDF_SERVER_TOKEN') or secrets.token_urlsafe(32)
+    server.allow_paths = allow_paths
+    server.root = os.path.realpath(root or os.getcwd())
+    server.executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(configs,))
+    return server
+
+
+def close_server(server) -> None:
+    server.server_close()
+    server.executor.shutdown()
+    if isinstance(server, UnixHTTPServer) and os.path.exists(server.server_address):
+        os.remove(server.server_address)
+
+
+def serve(host: str = '127.0.0.1', port: int = 8080, socket_path: str = None, workers: int = None,
+          configs: list[Optional[str]] = None, allow_paths: bool = False, root: str = None) -> None:
+    """Runs the server until it is interrupted."""
+    server = create_server(host, port, socket_path, workers, configs, allow_paths=allow_paths, root=root)
+    address = socket_path if socket_path is not None else 'http://{}:{}'.format(*server.server_address[:2])
+    print('Serving on {}'.format(address), file=sys.stderr)
+    if allow_paths:
+        print('Paths are relative to {}'.format(server.root), file=sys.stderr)
+    if not os.environ.get('CVDF_SERVER_TOKEN'):
+        print('Token: {}'.format(server.token), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_server(server)
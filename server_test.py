@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from unittest import TestCase
+from config import load_config
+from image import Image
+from server import close_server, create_server
+from writer.delimiter_separated_values import DsvFormatter
+
+RECORDS = [{'filename': '1.jpg', 'width': 100, 'height': 50, 'annotations': [
+    {'type': 'boundingBox', 'format': 'coco', 'label': 'cat', 'x': 10, 'y': 5, 'width': 20, 'height': 10}]}]
+
+
+class TestServer(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.TemporaryDirectory()
+        cls.server = create_server(port=0, workers=1, token='secret', allow_paths=True, root=cls.folder.name)
+        cls.url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        close_server(cls.server)
+        cls.folder.cleanup()
+
+    def post(self, query: str, body: bytes, token: str = 'secret'):
+        request = urllib.request.Request(self.url + '/std2dsv' + query, data=body,
+                                         headers={} if token is None else {'X-CVDF-Token': token})
+        return urllib.request.urlopen(request)
+
+    def assert_status(self, status: int, query: str, body: bytes = b'{"images": []}', **kwargs):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.post(query, body, **kwargs)
+        self.assertEqual(context.exception.code, status)
+
+    def test_convert_payload(self):
+        response = self.post('', bytes(json.dumps({'images': RECORDS}), 'UTF-8'))
+        expected = DsvFormatter(path='', **load_config()).format_image(Image(**RECORDS[0]))
+        self.assertEqual(response.read().decode('UTF-8'), expected)
+        self.assertEqual(response.headers['X-Images'], '1')
+
+    def test_invalid_request(self):
+        self.assert_status(400, '?validation=unknown')
+
+    def test_token_is_required(self):
+        self.assert_status(403, '', token=None)
+        self.assert_status(403, '', token='guess')
+
+    def test_paths_inside_root(self):
+        with open(file=os.path.join(self.folder.name, 'in.json'), mode='w') as f:
+            json.dump({'images': RECORDS}, f)
+        result = json.loads(self.post('?input=in.json&output=out/all.txt', b'').read())
+        self.assertEqual(result['images'], 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.folder.name, 'out', 'all.txt')))
+        self.assert_status(403, '?input=../in.json&output=out.txt', b'')
+        self.assert_status(403, '?output=/tmp/out.txt')
+        self.assert_status(403, '?config=/etc/passwd')
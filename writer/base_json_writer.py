@@ -1,7 +1,11 @@
-import yaml
+import json
+from typing import Iterable, Iterator, Optional
+
+import profiling
+from compression import open_output
 from image import Image
 from annotation.base_annotation import Annotation, AnnotationType
-from annotation.bounding_box import BoundingBox, BoundingBoxFormat, transform_from_coco, box_values_to_dict
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat, TransformCache
 from pathlib import Path
 
 
@@ -9,65 +13,209 @@ from pathlib import Path
 #     default_config = yaml.load(file, Loader=yaml.FullLoader)
 
 
-def write_bounding_box(bounding_box: BoundingBox, annotation_format: BoundingBoxFormat) -> dict:
+def write_bounding_box(bounding_box: BoundingBox, annotation_format: BoundingBoxFormat,
+                       transform_cache: TransformCache = None) -> dict:
     if annotation_format is None:
         raise ValueError('Bounding box format is not defined')
-    transformed_box_values = transform_from_coco(box=bounding_box.box_values, box_format=annotation_format)
-    box_values_dict = box_values_to_dict(box=transformed_box_values, box_format=annotation_format)
-    json_annotation = {
-        'label': bounding_box.label,
-        "instance": bounding_box.instance,
-        "additionalLabels": bounding_box.additional_labels,
-        "verified": bounding_box.verified,
-        "autoCreated": bounding_box.auto_created,
-        'type': bounding_box.type,
-        'format': str(annotation_format),
-        **box_values_dict
-    }
-    return json_annotation
+    return bounding_box.to_std_dict(annotation_format, transform_cache)
 
 
-def write_annotation(annotation: Annotation, **kwargs) -> dict:
+def write_annotation(annotation: Annotation, transform_cache: TransformCache = None, **kwargs) -> dict:
     if isinstance(annotation, BoundingBox):
         box_output_format = kwargs.get(AnnotationType.BOUNDING_BOX.value)
-        return write_bounding_box(annotation, BoundingBoxFormat(box_output_format))
+        return write_bounding_box(annotation, BoundingBoxFormat(box_output_format), transform_cache)
     else:
         raise ValueError('Annotation {} is not supported'.format(annotation))
 
 
-def write(images: list[Image], **kwargs):
-    """Main function to write a JSON with the base format.
+def can_pass_through(raw_annotations: list[dict], **kwargs) -> bool:
+    """Checks if undecoded annotations already have the output format and can be written unchanged."""
+    box_output_format = kwargs.get(AnnotationType.BOUNDING_BOX.value)
+    return all(annotation.get('type') == AnnotationType.BOUNDING_BOX.value
+               and annotation.get('format') == box_output_format for annotation in raw_annotations)
 
-    :param images: list of image objects
-    :param annotation_format: desired annotation format
+
+def image_json(image: Image, transform_cache: TransformCache = None, raw_annotations: list[dict] = None,
+               **kwargs) -> dict:
+    """Converts an image and its annotations into a dict of the base format.
+
+    If 'passThroughAnnotations' is true, undecoded annotations that already have the output format are
+    written as they were read.
+
+    :param raw_annotations: undecoded annotations of the image, taken before another writer decoded them
     """
-    json_images = []
-    for image in images:
+    if raw_annotations is None:
+        raw_annotations = image.raw_annotations
+    if kwargs.get('passThroughAnnotations') and raw_annotations is not None \
+            and can_pass_through(raw_annotations, **kwargs):
+        json_annotations = raw_annotations
+    else:
         json_annotations = []
         for annotation in image.annotations:
-            json_annotation = write_annotation(annotation, **kwargs)
+            json_annotation = write_annotation(annotation, transform_cache, **kwargs)
             json_annotations.append(json_annotation)
-        json_image = {
-            'filename': image.filename,
-            'label': image.label,
-            "instance": image.instance,
-            "additionalLabels": image.additional_labels,
-            "verified": image.verified,
-            "autoCreated": image.auto_created,
-            'width': image.width,
-            'height': image.height,
+    return {
+        'filename': image.filename,
+        'label': image.label,
+        "instance": image.instance,
+        "additionalLabels": image.additional_labels,
+        "verified": image.verified,
+        "autoCreated": image.auto_created,
+        'width': image.width,
+        'height': image.height,
+        'annotations': json_annotations,
+    }
+
+
+def write(images: Iterable[Image], **kwargs):
+    """Main function to write a JSON with the base format.
+
+    The images are converted and written one after another, so any iterator of images can be passed.
+
+    :param images: image objects
+    :param annotation_format: desired annotation format
+    """
+    write_json_images(profiling.active.wrap('format', (image_json(image, **kwargs) for image in images)), **kwargs)
+
+
+class BaseJsonStreamWriter:
+    def __init__(self, output_file: str, indent: Optional[int] = 2, json_lines: bool = False):
+        """Writes the base format incrementally, one image record at a time.
+
+        With an indent the file is the same as 'json.dump' with this indent would create. Without an indent
+        the output is compact. JSON Lines writes one compact image record per line without the enclosing object.
+
+        :param output_file: path of the JSON file, compressed if its extension is '.gz', '.bz2' or '.xz'
+        :param indent: number of spaces per level or None for compact output
+        :param json_lines: if every image is written as a separate line
+        """
+        self.indent = indent
+        self.json_lines = json_lines
+        self.count = 0
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)  # create folder path if not existent
+        self.file = open_output(output_file, mode='w')
+        if json_lines:
+            self.encoder = json.JSONEncoder(separators=(',', ':'))
+        elif indent is None:
+            self.encoder = json.JSONEncoder(separators=(',', ':'))
+            self.file.write('{"images":[')
+        else:
+            self.encoder = json.JSONEncoder(indent=indent)
+            self.prefix = ' ' * (2 * indent)  # images are nested in the object and the array
+            self.file.write('{\n' + ' ' * indent + '"images": [')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_record(self, json_image: dict) -> None:
+        with profiling.active.stage('encode json'):
+            record = self.encoder.encode(json_image)
+        with profiling.active.stage('file output'):
+            if self.json_lines:
+                self.file.write(record + '\n')
+            elif self.indent is None:
+                self.file.write(record if self.count == 0 else ',' + record)
+            else:
+                self.file.write('\n' if self.count == 0 else ',\n')
+                self.file.write(self.prefix + record.replace('\n', '\n' + self.prefix))
+        self.count += 1
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        if self.json_lines:
+            pass
+        elif self.indent is None:
+            self.file.write(']}')
+        elif self.count == 0:
+            self.file.write(']\n}')
+        else:
+            self.file.write('\n' + ' ' * self.indent + ']\n}')
+        self.file.close()
+
+
+class BaseJsonImageWriter(BaseJsonStreamWriter):
+    def __init__(self, **kwargs):
+        """Writes image objects one at a time, configured like 'write_json_images'."""
+        super().__init__(kwargs.get('outputFile'), indent=kwargs.get('indent', 2),
+                         json_lines=bool(kwargs.get('jsonLines')))
+        self.config = kwargs
+
+    def write_image(self, image: Image, transform_cache: TransformCache = None,
+                    raw_annotations: list[dict] = None) -> None:
+        with profiling.active.stage('format'):
+            json_image = image_json(image, transform_cache, raw_annotations, **self.config)
+        self.write_record(json_image)
+
+    def close(self) -> dict:
+        super().close()
+        return {}
+
+
+def write_json_images(json_images: Iterable[dict], **kwargs) -> int:
+    """Writes image records incrementally.
+
+    - outputFile: path of the JSON file
+    - indent: spaces per indentation level, compact output if it is null
+    - jsonLines: one image record per line instead of a single JSON object
+
+    :return: number of written images
+    """
+    with BaseJsonStreamWriter(kwargs.get('outputFile'), indent=kwargs.get('indent', 2),
+                              json_lines=bool(kwargs.get('jsonLines'))) as writer:
+        for json_image in json_images:
+            writer.write_record(json_image)
+    return writer.count
+
+
+def box_array_json(box_array, **kwargs) -> Iterator[dict]:
+    """Converts a BoundingBoxArray into image dicts of the base format without creating any annotation objects.
+
+    Only the label is kept per box, the other annotation and image fields are written with their defaults.
+
+    :param box_array: column store of the bounding boxes
+    """
+    from annotation.bounding_box_array import iter_rows
+    annotation_format = BoundingBoxFormat(kwargs.get(AnnotationType.BOUNDING_BOX.value))
+    value_names = annotation_format.get_value_names()
+    label_codes = box_array.label_codes.tolist()
+    # keep integer dimensions as integers in the output
+    widths = [int(w) if w.is_integer() else w for w in box_array.widths.tolist()]
+    heights = [int(h) if h.is_integer() else h for h in box_array.heights.tolist()]
+    for index, rows in iter_rows(box_array, annotation_format):
+        start = int(box_array.image_offsets[index])
+        json_annotations = [{
+            'label': box_array.labels[label_codes[start + offset]],
+            "instance": '',
+            "additionalLabels": [],
+            "verified": False,
+            "autoCreated": False,
+            'type': AnnotationType.BOUNDING_BOX.value,
+            'format': str(annotation_format),
+            **dict(zip(value_names, values))
+        } for offset, values in enumerate(rows)]
+        yield {
+            'filename': box_array.filenames[index],
+            'label': '',
+            "instance": '',
+            "additionalLabels": [],
+            "verified": False,
+            "autoCreated": False,
+            'width': widths[index],
+            'height': heights[index],
             'annotations': json_annotations,
         }
-        json_images.append(json_image)
 
-    json_dict = {'images': json_images}
 
-    import json
-    from pathlib import Path  # create folder path if not existent
-    output_file = kwargs.get('outputFile')
-    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-    with open(file=output_file, mode='w') as file:
-        json.dump(obj=json_dict, fp=file, indent=2)
+def write_box_array(box_array, **kwargs):
+    """Writes a BoundingBoxArray as JSON with the base format, see 'box_array_json'.
+
+    Library function for scripts that hold their boxes in an array, the command line writes image objects.
+    """
+    write_json_images(box_array_json(box_array, **kwargs), **kwargs)
 
 
 if __name__ == '__main__':
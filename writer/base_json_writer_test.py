@@ -0,0 +1,30 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from writer.base_json_writer import write_json_images
+
+RECORDS = [{'filename': '{}.png'.format(i), 'width': 640, 'height': 480.5, 'annotations': [
+    {'label': 'Cät', 'x': i, 'additionalLabels': []} for _ in range(i)]} for i in range(3)]
+
+
+class TestWriteJsonImages(TestCase):
+
+    def write(self, records: list[dict], **kwargs) -> str:
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, 'out', 'std.json')
+            count = write_json_images(iter(records), outputFile=output, **kwargs)
+            self.assertEqual(count, len(records))
+            with open(file=output, mode='r') as f:
+                return f.read()
+
+    def test_indent_equals_json_dump(self):
+        for records in (RECORDS, []):
+            for indent in (2, 4):
+                self.assertEqual(self.write(records, indent=indent), json.dumps({'images': records}, indent=indent))
+
+    def test_compact_and_json_lines(self):
+        compact = self.write(RECORDS, indent=None)
+        self.assertEqual(compact, json.dumps({'images': RECORDS}, separators=(',', ':')))
+        lines = self.write(RECORDS, jsonLines=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], RECORDS)
@@ -0,0 +1,140 @@
+"""Writes images into a binary, memory-mappable cache file.
+
+Layout (little endian, every section starts at a multiple of 8 bytes):
+
+- header: magic, version, size and modification time of the source file, counts and section offsets
+- images: one IMAGE_DTYPE record per image with the range of its boxes
+- boxes: four float64 values per box in coco format
+- box meta: one BOX_META_DTYPE record per box with its labels and source format
+- string offsets: uint64 offsets into the string data, one more than strings
+- string data: UTF-8 encoded labels, instances, filenames and paths, every distinct string is stored once
+"""
+import json
+import os
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat
+from image import Image
+
+MAGIC = b'CVDFBIN1'
+VERSION = 1
+# magic, version, reserved, source size, source mtime, image count, box count, string count, five section offsets
+HEADER = struct.Struct('<8sIIqqQQQQQQQQ')
+IMAGE_DTYPE = np.dtype([('width', '<f8'), ('height', '<f8'), ('box_start', '<u8'), ('box_count', '<u4'),
+                        ('filename', '<i4'), ('path', '<i4'), ('label', '<i4'), ('instance', '<i4'),
+                        ('additional_labels', '<i4'), ('flags', '<u4'), ('reserved', '<u4')])
+BOX_META_DTYPE = np.dtype([('label', '<i4'), ('instance', '<i4'), ('additional_labels', '<i4'), ('flags', '<u2'),
+                           ('format', '<u2')])
+# the source format of a box is stored as index into this list, its values are always in coco format
+BOX_FORMATS = list(BoundingBoxFormat)
+FLAG_VERIFIED = 1
+FLAG_AUTO_CREATED = 2
+NO_STRING = -1
+
+
+def source_signature(source_file: Optional[str]) -> Tuple[int, int]:
+    """Gets size and modification time of the source file, which decide if a cache is outdated."""
+    if source_file is None:
+        return -1, -1
+    stat = os.stat(source_file)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _flags(item) -> int:
+    return (FLAG_VERIFIED if item.verified else 0) | (FLAG_AUTO_CREATED if item.auto_created else 0)
+
+
+def _align(file) -> None:
+    file.write(b'\0' * (-file.tell() % 8))
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+
+    def id(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.ids)
+        return string_id
+
+    def labels_id(self, labels: list) -> int:
+        """Additional labels are stored as JSON text, so the common empty list is a single string."""
+        return self.id(json.dumps(labels)) if labels else NO_STRING
+
+
+def write(images: Iterable[Image], output_file: str, source_file: str = None, chunk_size: int = 4096) -> int:
+    """Writes images and their bounding boxes into a binary cache, other annotation types are skipped.
+
+    The images are streamed, boxes and records are spilled into temporary section files in chunks.
+
+    :param images: images to store
+    :param output_file: path of the cache file
+    :param source_file: file the images were loaded from, its size and modification time are stored
+    :param chunk_size: number of images that are buffered before they are written
+    :return: number of written images
+    """
+    strings = _StringTable()
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    image_count = box_count = 0
+    with tempfile.TemporaryDirectory(dir=Path(output_file).parent) as temp_folder:
+        sections = {name: open(file=Path(temp_folder, name), mode='w+b') for name in ('images', 'boxes', 'meta')}
+        image_records, boxes, box_meta = [], [], []
+
+        def flush() -> None:
+            sections['images'].write(np.array(image_records, dtype=IMAGE_DTYPE).tobytes())
+            sections['boxes'].write(np.array(boxes, dtype='<f8').tobytes())
+            sections['meta'].write(np.array(box_meta, dtype=BOX_META_DTYPE).tobytes())
+            image_records.clear(), boxes.clear(), box_meta.clear()
+
+        for image in images:
+            box_start = box_count
+            for annotation in image.annotations:
+                if not isinstance(annotation, BoundingBox):
+                    continue
+                boxes.append(annotation.box_values)
+                box_meta.append((strings.id(annotation.label), strings.id(annotation.instance),
+                                 strings.labels_id(annotation.additional_labels), _flags(annotation),
+                                 BOX_FORMATS.index(annotation.format)))
+                box_count += 1
+            image_records.append((image.width, image.height, box_start, box_count - box_start,
+                                  strings.id(image.filename), strings.id(image.path), strings.id(image.label),
+                                  strings.id(image.instance), strings.labels_id(image.additional_labels),
+                                  _flags(image), 0))
+            image_count += 1
+            if len(image_records) >= chunk_size:
+                flush()
+        flush()
+
+        string_data = [value.encode('UTF-8') for value in strings.ids]
+        string_offsets = np.zeros(len(string_data) + 1, dtype='<u8')
+        np.cumsum([len(value) for value in string_data], out=string_offsets[1:])
+
+        temp_file = Path(temp_folder, 'cache')
+        with open(file=temp_file, mode='wb') as f:
+            f.write(b'\0' * HEADER.size)
+            offsets = []
+            for name in ('images', 'boxes', 'meta'):
+                _align(f)
+                offsets.append(f.tell())
+                sections[name].seek(0)
+                shutil.copyfileobj(sections[name], f)
+                sections[name].close()
+            _align(f)
+            offsets.append(f.tell())
+            f.write(string_offsets.tobytes())
+            offsets.append(f.tell())
+            f.write(b''.join(string_data))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, 0, *source_signature(source_file), image_count, box_count,
+                                len(string_data), *offsets))
+        os.replace(temp_file, output_file)  # readers never see a partially written cache
+    return image_count
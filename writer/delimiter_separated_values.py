@@ -15,15 +15,20 @@
 - filePerImage: if image annotations are saved in separate file
 - outputFolder: folder in which the files are saved if 'filePerImage' is true
 - fileExtension: file extensions of the saved files if 'filePerImage' is true
-- outputFile: file path for all images if 'filePerImage' is false
+- archiveFile: tar archive that contains the files if 'filePerImage' is true, instead of 'outputFolder'
+- writerWorkers: number of threads that write the files if 'filePerImage' is true
+- maxInFlight: maximum number of pending files if 'writerWorkers' is greater than one
+- outputFile: file path for all images if 'filePerImage' is false, '-' writes to the standard output,
+  compressed if the extension is '.gz', '.bz2' or '.xz'
+- bufferSize: size of the write buffer in bytes if 'filePerImage' is false
 - boundingBox: output annotation format for bounding boxes
+- floatPrecision: number of decimal places of float values, trailing zeros are removed (null: all digits)
 """
-from typing import Tuple
-
-import yaml
+from typing import Iterable, Iterator, Optional, Tuple
 
+import profiling
 from annotation.base_annotation import Annotation, AnnotationType
-from annotation.bounding_box import BoundingBox, BoundingBoxFormat, transform_from_coco
+from annotation.bounding_box import BoundingBox, BoundingBoxFormat, TransformCache, transform_from_coco
 from image import Image
 
 
@@ -41,33 +46,44 @@ def quote_if_necessary(value: str, **kwargs) -> str:
     return value
 
 
-def bounding_box_sv(annotation: BoundingBox, annotation_format: BoundingBoxFormat, img_wh: Tuple[int, int] = None,
-                    class_mapping: dict = None, **kwargs) -> tuple:
-    if img_wh is None or len(img_wh) != 2:
-        raise ValueError('No valid image dimension defined')
-
-    line = list(transform_from_coco(box=annotation.box_values, box_format=annotation_format, img_wh=img_wh))
+def box_class_value(label: str, class_mapping: dict = None, **kwargs) -> Optional[str]:
+    """Gets the class value of an annotation label or None if no class should be written."""
     # config: empty class
     ignore_empty_class = kwargs.get('ignoreEmptyClass')
     default_class = kwargs.get('defaultClass')
-    is_box_class_empty = annotation.label is None or annotation.label.strip() == ''
+    is_box_class_empty = label is None or label.strip() == ''
     if is_box_class_empty:
         box_class = None if ignore_empty_class else default_class
     else:
-        box_class = annotation.label.strip()
+        box_class = label.strip()
     # apply class mapping
     class_map = kwargs.get('classMapping', class_mapping)
     if class_map is not None and box_class is not None and box_class in class_map:
         box_class = str(class_map[box_class])
+    if box_class is not None:
+        box_class = quote_if_necessary(box_class)
+    return box_class
+
+
+def bounding_box_sv(annotation: BoundingBox, annotation_format: BoundingBoxFormat, img_wh: Tuple[int, int] = None,
+                    class_mapping: dict = None, transform_cache: TransformCache = None, **kwargs) -> tuple:
+    if img_wh is None or len(img_wh) != 2:
+        raise ValueError('No valid image dimension defined')
+
+    if transform_cache is None:
+        line = list(transform_from_coco(box=annotation.box_values, box_format=annotation_format, img_wh=img_wh))
+    else:
+        line = list(transform_cache.transform(annotation, annotation_format, img_wh))
+    box_class = box_class_value(annotation.label, class_mapping, **kwargs)
     # config: class position if class exists
     if box_class is not None:
         class_at_end = kwargs.get('classAtEnd')
-        box_class = quote_if_necessary(box_class)
         line.append(box_class) if class_at_end else line.insert(0, box_class)
     return tuple(line)
 
 
-def annotation_sv(annotation: Annotation, img_wh: Tuple[int, int] = None, class_mapping: dict = None, **kwargs) -> tuple:
+def annotation_sv(annotation: Annotation, img_wh: Tuple[int, int] = None, class_mapping: dict = None,
+                  transform_cache: TransformCache = None, **kwargs) -> tuple:
     if annotation is None:
         raise ValueError('Annotation must not be None')
     if img_wh is None or len(img_wh) != 2:
@@ -76,12 +92,23 @@ def annotation_sv(annotation: Annotation, img_wh: Tuple[int, int] = None, class_
     if isinstance(annotation, BoundingBox):
         box_output_format = kwargs.get(AnnotationType.BOUNDING_BOX.value)
         box_format = BoundingBoxFormat(box_output_format)
-        return bounding_box_sv(annotation=annotation, annotation_format=box_format, img_wh=img_wh, class_mapping=class_mapping, **kwargs)
+        return bounding_box_sv(annotation=annotation, annotation_format=box_format, img_wh=img_wh,
+                               class_mapping=class_mapping, transform_cache=transform_cache, **kwargs)
     else:
         raise ValueError('Annotation of type {} is not supported'.format(annotation))
 
 
-def image_sv(image: Image, path: str = None, class_mapping: dict = None, **kwargs) -> list[list[tuple]]:
+def image_path_value(folder_path: Optional[str], filename: str) -> Optional[str]:
+    """Gets the path value of an image or None if the image has no folder path."""
+    if folder_path is None:
+        return None
+    if folder_path != '' and not folder_path.endswith('/'):
+        folder_path += '/'
+    return quote_if_necessary(folder_path + filename)
+
+
+def image_sv(image: Image, path: str = None, class_mapping: dict = None, transform_cache: TransformCache = None,
+             **kwargs) -> list[list[tuple]]:
     if image is None:
         raise ValueError('Image must not be None')
 
@@ -90,19 +117,13 @@ def image_sv(image: Image, path: str = None, class_mapping: dict = None, **kwarg
     path_at_end = kwargs.get('pathAtEnd')
 
     # config: path + image name
-    folder_path = image.path if path is None else path
-    if folder_path is not None:
-        if folder_path != '' and not folder_path.endswith('/'):
-            folder_path += '/'
-        image_path = folder_path + image.filename
-        image_path = quote_if_necessary(image_path)
-    else:
-        image_path = None
+    image_path = image_path_value(image.path if path is None else path, image.filename)
 
     sv_annotations = []
     for annotation in image.annotations:
         # get annotation values as tuple
-        annotation_values = annotation_sv(annotation, (image.width, image.height), class_mapping, **kwargs)
+        annotation_values = annotation_sv(annotation, (image.width, image.height), class_mapping, transform_cache,
+                                          **kwargs)
         # add path when with_path and annotation_per_line is true
         if with_path and image_path is not None and annotation_per_line:
             annotation_values = annotation_values + tuple([image_path]) if path_at_end \
@@ -134,46 +155,338 @@ def dsv_image_str(image_lines: list[list[tuple]], **kwargs) -> str:
     return line_terminator.join(lines)
 
 
-def dsv_writer(images: list[Image], path: str = None, class_mapping: dict = None, **kwargs):
-    file_per_image = kwargs.get('filePerImage')
-    output_folder = kwargs.get('outputFolder')
-
-    # output folder for separate image annotation files
-    if file_per_image:
-        output_folder += '/' if not output_folder.endswith('/') else ''
-        from pathlib import Path  # create folder path if not existent
-        Path(output_folder).mkdir(parents=True, exist_ok=True)
-
-    annotation_file_lines = []
-    for image in images:
-        image_annotations_list = image_sv(image, path, class_mapping, **kwargs)
-        image_annotations = dsv_image_str(image_annotations_list, **kwargs)
-        # write annotation file for every image
-        if file_per_image:
-            # image annotation file name
-            file_extension = kwargs.get('fileExtension')
-            image_annotation_filename = image.filename[:image.filename.rindex('.')] + '.' + file_extension
-            # write file
-            image_annotation_file_path = output_folder + image_annotation_filename
-            with open(file=image_annotation_file_path, mode='wb') as file:
-                file.write(bytes(image_annotations, 'UTF-8'))
+def annotation_filename(image_filename: str, **kwargs) -> str:
+    """Gets the name of the annotation file of an image if 'filePerImage' is true."""
+    file_extension = kwargs.get('fileExtension')
+    return image_filename[:image_filename.rindex('.')] + '.' + file_extension
+
+
+def open_output_file(output_file: str, buffer_size: int = None):
+    """Opens the binary output file, '-' writes to the standard output so the result can be piped.
+    The file is compressed if its extension is '.gz', '.bz2' or '.xz'."""
+    if output_file == '-':
+        import sys
+        return open(sys.stdout.fileno(), mode='wb', buffering=buffer_size or -1, closefd=False)
+    from compression import open_output
+    from pathlib import Path  # create folder path if not existent
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    return open_output(output_file, mode='wb', buffer_size=buffer_size)
+
+
+def float_formatter(precision: Optional[int]):
+    """Creates the function that converts box values into strings.
+
+    :param precision: number of decimal places, trailing zeros are removed; None keeps all digits like str()
+    """
+    if precision is None:
+        return str
+    template = '{:.' + str(int(precision)) + 'f}'
+
+    def format_value(value) -> str:
+        if isinstance(value, int):
+            return str(value)
+        text = template.format(value)
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        return '0' if text == '-0' else text
+
+    return format_value
+
+
+class DsvFormatter:
+    def __init__(self, path: str = None, class_mapping: dict = None, **kwargs):
+        """Formats images into DSV strings, the config is only read once.
+
+        Produces the same output as 'image_sv' and 'dsv_image_str', but the column order is fixed when it is
+        created, the class values are computed once per label and all boxes of an image are formatted in a
+        single pass.
+
+        :param path: folder path written in front of the image filenames, the image path is used if None
+        :param class_mapping: maps labels to class values, if the config does not contain 'classMapping'
+        :param kwargs: DSV writer config
+        """
+        self.path = path
+        self.class_mapping = class_mapping
+        self.config = kwargs
+        self.delimiter = kwargs.get('delimiter')
+        self.annotation_delimiter = kwargs.get('annotationDelimiter')
+        self.line_terminator = kwargs.get('lineTerminator')
+        self.annotation_per_line = kwargs.get('annotationPerLine')
+        self.with_path = kwargs.get('withPath')
+        self.path_at_end = kwargs.get('pathAtEnd')
+        self.class_at_end = kwargs.get('classAtEnd')
+        self.box_format = BoundingBoxFormat(kwargs.get(AnnotationType.BOUNDING_BOX.value))
+        self.format_value = float_formatter(kwargs.get('floatPrecision'))
+        self.classes = {}
+
+    def class_value(self, label: str) -> Optional[str]:
+        try:
+            return self.classes[label]
+        except KeyError:
+            box_class = self.classes[label] = box_class_value(label, self.class_mapping, **self.config)
+            return box_class
+
+    def image_path(self, image_path: Optional[str], filename: str) -> Optional[str]:
+        """Gets the path value that is written, or None if no path is written."""
+        if not self.with_path:
+            return None
+        return image_path_value(image_path if self.path is None else self.path, filename)
+
+    def box_block(self, values, box_class: Optional[str], image_path: Optional[str]) -> str:
+        block = self.delimiter.join(map(self.format_value, values))
+        if box_class is not None:
+            block = block + self.delimiter + box_class if self.class_at_end else box_class + self.delimiter + block
+        if image_path is not None and self.annotation_per_line:
+            block = block + self.delimiter + image_path if self.path_at_end else image_path + self.delimiter + block
+        return block
+
+    def join_blocks(self, blocks: list[str], image_path: Optional[str]) -> str:
+        """Joins the formatted boxes of an image into lines or a single line with the image path."""
+        if self.annotation_per_line:
+            return self.line_terminator.join(blocks)
+        if image_path is not None:
+            blocks.append(image_path) if self.path_at_end else blocks.insert(0, image_path)
+        return self.annotation_delimiter.join(blocks)
+
+    def format_image(self, image: Image, transform_cache: TransformCache = None) -> str:
+        annotations = image.annotations
+        for annotation in annotations:
+            if not isinstance(annotation, BoundingBox):
+                raise ValueError('Annotation of type {} is not supported'.format(annotation))
+        img_wh = (image.width, image.height)
+        box_format = self.box_format
+        with profiling.active.stage('transform boxes', len(annotations)):
+            if transform_cache is None:
+                rows = [transform_from_coco(box=bb.box_values, box_format=box_format, img_wh=img_wh)
+                        for bb in annotations]
+            else:
+                rows = [transform_cache.transform(bb, box_format, img_wh) for bb in annotations]
+        image_path = self.image_path(image.path, image.filename)
+        class_value = self.class_value
+        blocks = [self.box_block(values, class_value(bb.label), image_path) for bb, values in zip(annotations, rows)]
+        return self.join_blocks(blocks, image_path)
+
+
+class DsvWriter:
+    def __init__(self, path: str = None, class_mapping: dict = None, **kwargs):
+        """Writes images one at a time into a single DSV file or a file per image.
+
+        In single file mode every image is written as soon as it is formatted, only 'bufferSize' bytes are buffered.
+        Files per image are written by 'writerWorkers' threads, errors are collected instead of stopping the writing.
+
+        :param path: folder path written in front of the image filenames, the image path is used if None
+        :param class_mapping: maps labels to class values, if the config does not contain 'classMapping'
+        :param kwargs: DSV writer config
+        """
+        self.formatter = DsvFormatter(path, class_mapping, **kwargs)
+        self.config = kwargs
+        self.file_per_image = kwargs.get('filePerImage')
+        if self.file_per_image and kwargs.get('archiveFile'):
+            # separate image annotation files in a tar archive
+            self.output_folder = ''
+            from writer.file_writer import TarFileWriter
+            self.file_writer = TarFileWriter(kwargs.get('archiveFile'))
+        elif self.file_per_image:
+            # output folder for separate image annotation files
+            output_folder = kwargs.get('outputFolder')
+            self.output_folder = output_folder + ('/' if not output_folder.endswith('/') else '')
+            from pathlib import Path  # create folder path if not existent
+            Path(self.output_folder).mkdir(parents=True, exist_ok=True)
+            from writer.file_writer import FileWriter
+            self.file_writer = FileWriter(kwargs.get('writerWorkers'), kwargs.get('maxInFlight'))
         else:
-            # append to list if all images should be in one file
-            annotation_file_lines.append(image_annotations)
-
-    # write annotation file if all images should be in one file
-    if not file_per_image:
-        line_terminator = kwargs.get('lineTerminator')
-        output_file = kwargs.get('outputFile')
-        with open(output_file, mode='wb') as file:
-            file.write(bytes(line_terminator.join(annotation_file_lines), 'UTF-8'))
-
-    return
+            # write all images into one file, separated by the line terminator
+            self.line_terminator = bytes(kwargs.get('lineTerminator'), 'UTF-8')
+            self.separator = b''
+            self.file = open_output_file(kwargs.get('outputFile'), kwargs.get('bufferSize'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_image(self, image: Image, transform_cache: TransformCache = None) -> None:
+        with profiling.active.stage('format'):
+            image_annotations = self.formatter.format_image(image, transform_cache)
+        self.write_image_str(image.filename, image_annotations)
+
+    def write_image_str(self, image_filename: str, image_annotations: str) -> None:
+        """Writes the already formatted annotations of an image."""
+        with profiling.active.stage('file output'):
+            self._write(image_filename, image_annotations)
+
+    def _write(self, image_filename: str, image_annotations: str) -> None:
+        if self.file_per_image:
+            # write annotation file for every image
+            image_annotation_file_path = self.output_folder + annotation_filename(image_filename, **self.config)
+            self.file_writer.submit(image_annotation_file_path, bytes(image_annotations, 'UTF-8'))
+        else:
+            self.file.write(self.separator)
+            self.file.write(bytes(image_annotations, 'UTF-8'))
+            self.separator = self.line_terminator
+
+    def close(self) -> dict[str, OSError]:
+        """Finishes writing.
+
+        :return: errors of all files that could not be written by path
+        """
+        if self.file_per_image:
+            return self.file_writer.close()
+        self.file.close()
+        return {}
+
+
+def write_image_strs(image_strs: Iterable[Tuple[str, str]], **kwargs) -> dict[str, OSError]:
+    """Writes already formatted image annotations into the file(s), see 'DsvWriter'.
+
+    :param image_strs: pairs of image filename and the DSV string of its annotations
+    :return: errors of all files that could not be written by path
+    """
+    writer = DsvWriter(**kwargs)
+    try:
+        for image_filename, image_annotations in image_strs:
+            writer.write_image_str(image_filename, image_annotations)
+    finally:
+        errors = writer.close()
+    return errors
+
+
+def dsv_writer(images: Iterable[Image], path: str = None, class_mapping: dict = None, **kwargs) -> dict[str, OSError]:
+    writer = DsvWriter(path, class_mapping, **kwargs)
+    try:
+        for image in images:
+            writer.write_image(image)
+    finally:
+        errors = writer.close()
+    return errors
+
+
+def dsv_shard(records: list, path: str = None, class_mapping: dict = None, validation: str = 'off',
+              json_path: str = None, **kwargs) -> tuple[list[Tuple[str, str]], dict[str, OSError], object]:
+    """Converts a shard of image records, used by the worker processes of 'dsv_writer_sharded'.
+
+    Files per image are written directly by the worker, otherwise the formatted images are returned.
+    Files of an archive are returned as well, because the archive is written by the main process.
+
+    :param records: image dicts of the standard JSON, or offsets and lengths of the records if 'json_path' is given
+    :param validation: validation mode of the bounding boxes, see 'annotation.validation'
+    :param json_path: path to the standard JSON whose records are read and decoded by the worker
+    :return: pairs of image filename and DSV string (empty if 'filePerImage' is true), the write errors
+             and the validation report
+    """
+    from annotation.validation import ValidationMode, ValidationReport, validate_images
+    if json_path is not None:
+        from loader.json_index import read_spans
+        records = read_spans(json_path, records)
+    report = ValidationReport()
+    formatter = DsvFormatter(path, class_mapping, **kwargs)
+    image_strs = []
+    for image in validate_images((Image(**record) for record in records), ValidationMode(validation), report):
+        image_strs.append((image.filename, formatter.format_image(image)))
+    if not kwargs.get('filePerImage') or kwargs.get('archiveFile'):  # the archive is written by a single process
+        return image_strs, {}, report
+    return [], write_image_strs(image_strs, **kwargs), report
+
+
+def dsv_writer_sharded(records: Iterable[dict], workers: int, shard_size: int = 1000, path: str = None,
+                       class_mapping: dict = None, validation: str = 'off', validation_report=None,
+                       json_path: str = None, **kwargs) -> dict[str, OSError]:
+    """Converts image records in shards with a process pool and writes them like 'dsv_writer'.
+
+    The single output file is written in the order of the records. At most two shards per worker are pending,
+    so the memory does not depend on the number of images. With 'json_path' only the offsets and lengths of the
+    records are sent to the workers, which read and decode the records themselves.
+
+    :param records: image dicts of the standard JSON, or offsets and lengths of the records if 'json_path' is given
+    :param workers: number of worker processes
+    :param shard_size: number of images per shard
+    :param validation: validation mode of the bounding boxes, see 'annotation.validation'
+    :param validation_report: collects the validation reports of all shards
+    :param json_path: path to the uncompressed standard JSON of the record spans, see 'loader.json_index'
+    :return: errors of all files that could not be written by path
+    """
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    from itertools import islice
+
+    convert = partial(dsv_shard, path=path, class_mapping=class_mapping, validation=validation, json_path=json_path,
+                      **kwargs)
+    single_writer = not kwargs.get('filePerImage') or kwargs.get('archiveFile')
+    writer = DsvWriter(path, class_mapping, **kwargs) if single_writer else None
+    if writer is None:
+        from pathlib import Path  # create folder path once instead of in every worker
+        Path(kwargs.get('outputFolder')).mkdir(parents=True, exist_ok=True)
+    errors = {}
+
+    def finish(future) -> None:
+        image_strs, shard_errors, report = future.result()
+        errors.update(shard_errors)
+        if validation_report is not None:
+            validation_report.merge(report)
+        if writer is not None:
+            for image_filename, image_annotations in image_strs:
+                writer.write_image_str(image_filename, image_annotations)
+
+    records = iter(records)
+    pending = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                shard = list(islice(records, shard_size))
+                if not shard:
+                    break
+                pending.append(executor.submit(convert, shard))
+                if len(pending) >= workers * 2:
+                    finish(pending.popleft())
+            while pending:
+                finish(pending.popleft())
+    finally:
+        if writer is not None:
+            errors.update(writer.close())
+    return errors
+
+
+def box_array_image_strs(box_array, path: str = None, class_mapping: dict = None,
+                         **kwargs) -> Iterator[Tuple[str, str]]:
+    """Formats the boxes of a BoundingBoxArray image by image without creating any annotation objects.
+    Integral values of absolute formats are written as integers like 'dsv_writer' writes integer box values,
+    relative values are always floats.
+
+    :param box_array: column store of the bounding boxes
+    :return: pairs of image filename and the DSV string of its annotations
+    """
+    from annotation.bounding_box_array import RELATIVE_FORMATS, iter_rows
+    formatter = DsvFormatter(path, class_mapping, **kwargs)
+
+    # class value of every label code is only computed once
+    classes = [formatter.class_value(label) for label in box_array.labels]
+    label_codes = box_array.label_codes.tolist()
+    absolute = formatter.box_format not in RELATIVE_FORMATS
+    for index, rows in iter_rows(box_array, formatter.box_format):
+        if absolute:
+            rows = [[int(value) if value.is_integer() else value for value in values] for values in rows]
+        filename = box_array.filenames[index]
+        image_path = formatter.image_path(box_array.paths[index], filename)
+        start = int(box_array.image_offsets[index])
+        blocks = [formatter.box_block(values, classes[label_codes[start + offset]], image_path)
+                  for offset, values in enumerate(rows)]
+        yield filename, formatter.join_blocks(blocks, image_path)
+
+
+def dsv_box_array_writer(box_array, path: str = None, class_mapping: dict = None, **kwargs) -> dict[str, OSError]:
+    """Writes a BoundingBoxArray into DSV file(s) with the same layout as 'dsv_writer'.
+
+    Library function for scripts that hold their boxes in an array, the command line writes image objects.
+    """
+    return write_image_strs(box_array_image_strs(box_array, path, class_mapping, **kwargs), **kwargs)
 
 
 # TODO: Make Base Json writer and remove dict in each class
 # TODO: class mapping inside yaml config or load separately
 if __name__ == '__main__':
+    import yaml
 
     with open(file='../config_dsv.yaml', mode='r') as config_file:
         args = yaml.load(config_file, Loader=yaml.SafeLoader)
@@ -0,0 +1,96 @@
+import itertools
+import json
+import os
+import tempfile
+from unittest import TestCase
+from config import load_config
+from image import Image
+from writer.delimiter_separated_values import DsvFormatter, dsv_image_str, dsv_writer, dsv_writer_sharded, \
+    float_formatter, image_sv
+
+
+class TestDsvFormatter(TestCase):
+    config = {'delimiter': ',', 'lineTerminator': '\r\n', 'defaultClass': 'unk', 'quoting': True, 'quoteChar': '"',
+              'annotationDelimiter': ' ', 'classMapping': {'Cat': 0}}
+    image = {'filename': '1.png', 'width': 960, 'height': 540, 'path': 'images', 'annotations': [
+        {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 128, 'y': 216, 'width': 201, 'height': 35},
+        {'type': 'boundingBox', 'format': 'voc', 'label': 'Dog', 'xMin': 1, 'yMin': 2, 'xMax': 5, 'yMax': 9},
+        {'type': 'boundingBox', 'format': 'center', 'xCenter': 10, 'yCenter': 20, 'width': 4, 'height': 6}]}
+
+    def test_matches_image_sv(self):
+        image = Image(**self.image)
+        for box_format, per_line, with_path, path_at_end, class_at_end, ignore_empty, path in itertools.product(
+                ('coco', 'relativeCenter'), *[(True, False)] * 5, (None, 'data')):
+            config = {**self.config, 'boundingBox': box_format, 'annotationPerLine': per_line,
+                      'withPath': with_path, 'pathAtEnd': path_at_end, 'classAtEnd': class_at_end,
+                      'ignoreEmptyClass': ignore_empty}
+            self.assertEqual(DsvFormatter(path, **config).format_image(image),
+                             dsv_image_str(image_sv(image, path, **config), **config))
+
+    def test_float_precision(self):
+        format_value = float_formatter(3)
+        self.assertEqual([format_value(v) for v in (12, 0.5, 1 / 3, 2.0, -0.0001, 1e-7)],
+                         ['12', '0.5', '0.333', '2', '0', '0'])
+        self.assertIs(float_formatter(None), str)
+
+
+class TestDsvWriter(TestCase):
+    config = {'delimiter': ',', 'lineTerminator': '\r\n', 'defaultClass': 'unk', 'quoting': True, 'quoteChar': '"',
+              'annotationDelimiter': ' ', 'classMapping': None, 'boundingBox': 'coco', 'annotationPerLine': True,
+              'withPath': True, 'pathAtEnd': False, 'classAtEnd': True, 'ignoreEmptyClass': False,
+              'filePerImage': False, 'bufferSize': 16}
+
+    def test_single_file_is_written_while_streaming(self):
+        images = [Image(filename='{}.png'.format(i), width=960, height=540, path='images', annotations=[
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 128, 'y': 216, 'width': 201, 'height': 35},
+            {'type': 'boundingBox', 'format': 'voc', 'label': 'Dog', 'xMin': 1, 'yMin': 2, 'xMax': 5, 'yMax': 9}])
+                  for i in range(3)]
+        image_strs = [dsv_image_str(image_sv(image, '', **self.config), **self.config) for image in images]
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, 'out', 'all.txt')
+            written = []
+
+            def produce():
+                for image in images:
+                    if written:
+                        # the previous image is larger than the buffer, so it is already in the file
+                        with open(file=output, mode='rb') as f:
+                            written.append(f.read())
+                    else:
+                        written.append(b'')
+                    yield image
+
+            dsv_writer(produce(), path='', **{**self.config, 'outputFile': output})
+            self.assertEqual(written[1], bytes(image_strs[0], 'UTF-8'))
+            with open(file=output, mode='rb') as f:
+                self.assertEqual(f.read(), bytes('\r\n'.join(image_strs), 'UTF-8'))
+
+
+class TestDsvWriterSharded(TestCase):
+
+    def test_sharded_output_equals_single_process(self):
+        from loader.json_index import JsonIndex
+        images = [{'filename': '{}.png'.format(i % 7), 'width': 100, 'height': 50, 'annotations': [
+            {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat' if j % 2 else 'Dog', 'x': i, 'y': j,
+             'width': 10, 'height': 5} for j in range(i % 3)]} for i in range(10)]
+        config = {**load_config('yolo'), 'classMapping': None}
+        with tempfile.TemporaryDirectory() as folder:
+            json_path = os.path.join(folder, 'std.json')
+            with open(file=json_path, mode='w', encoding='UTF-8') as f:
+                json.dump({'images': images}, f, indent=2)
+            outputs = {}
+            for mode in ('single', 'records', 'spans'):
+                output = os.path.join(folder, mode + '.txt')
+                options = {**config, 'filePerImage': False, 'outputFile': output}
+                if mode == 'single':
+                    errors = dsv_writer((Image(**image) for image in images), path='', **options)
+                elif mode == 'records':
+                    errors = dsv_writer_sharded(images, workers=2, shard_size=3, path='', **options)
+                else:
+                    errors = dsv_writer_sharded(JsonIndex(json_path).record_spans(), workers=2, shard_size=3,
+                                                path='', json_path=json_path, **options)
+                self.assertEqual(errors, {})
+                with open(file=output, mode='rb') as f:
+                    outputs[mode] = f.read()
+            self.assertEqual(outputs['records'], outputs['single'])
+            self.assertEqual(outputs['spans'], outputs['single'])
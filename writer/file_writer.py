@@ -0,0 +1,123 @@
+"""Writes many small files, optionally with a thread pool to hide the open/close latency of slow file systems,
+or into a single tar archive."""
+import io
+import tarfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+
+def write_file(path: str, data: bytes) -> Optional[OSError]:
+    """Writes the data into a file and returns the error instead of raising it."""
+    try:
+        with open(file=path, mode='wb') as file:
+            file.write(data)
+    except OSError as e:
+        return e
+    return None
+
+
+class FileWriter:
+    def __init__(self, workers: int = 1, max_in_flight: int = None):
+        """Writes files serially or concurrently and collects the errors per file.
+
+        OSErrors are collected per file. Other exceptions of the writer threads are collected as well and the first
+        one is raised by 'close()', like it is raised by 'submit()' if the files are written on the calling thread.
+
+        :param workers: number of writer threads, the files are written on the calling thread if it is 1 or less
+        :param max_in_flight: maximum number of files that are queued or written at the same time,
+            which bounds the memory of pending file contents (default: four times the number of workers)
+        """
+        self.errors = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+        if workers is None or workers <= 1:
+            self._executor = None
+            return
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='file-writer')
+        self._in_flight = threading.BoundedSemaphore(max_in_flight if max_in_flight else workers * 4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, path: str, data: bytes) -> None:
+        """Writes a file, blocks if too many files are still pending."""
+        if self._executor is None:
+            self._done(path, write_file(path, data))
+            return
+        self._in_flight.acquire()
+        future = self._executor.submit(write_file, path, data)
+        future.add_done_callback(lambda f: self._finished(path, f))
+
+    def _finished(self, path: str, future: Future) -> None:
+        self._in_flight.release()
+        error = future.exception()
+        if error is None or isinstance(error, OSError):
+            self._done(path, error if error is not None else future.result())
+            return
+        with self._lock:
+            self.failures[path] = error
+
+    def _done(self, path: str, error: Optional[OSError]) -> None:
+        if error is not None:
+            with self._lock:
+                self.errors[path] = error
+
+    def close(self) -> dict[str, OSError]:
+        """Waits until all files are written.
+
+        :return: errors of all files that could not be written by path
+        :raises Exception: the first exception of a writer thread that is not an OSError
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self.failures:
+            raise next(iter(self.failures.values()))
+        return self.errors
+
+
+class TarFileWriter:
+    def __init__(self, archive_file: str):
+        """Writes the files into a tar archive instead of the file system, with the same interface as FileWriter.
+
+        The archive is compressed in a background thread if its extension is '.gz', '.tgz', '.bz2' or '.xz'.
+
+        :param archive_file: path of the tar archive
+        """
+        from pathlib import Path  # create folder path if not existent
+        from compression import open_output
+        Path(archive_file).parent.mkdir(parents=True, exist_ok=True)
+        self.archive_file = archive_file
+        self.errors = {}
+        self.mtime = time.time()
+        self._file = open_output(archive_file, mode='wb')
+        self._tar = tarfile.open(fileobj=self._file, mode='w|')  # stream, the archive is never read back
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, path: str, data: bytes) -> None:
+        """Appends a file with the given path to the archive."""
+        info = tarfile.TarInfo(name=path)
+        info.size = len(data)
+        info.mtime = self.mtime
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self) -> dict[str, OSError]:
+        """Finishes the archive.
+
+        :return: error of the archive by its path if it could not be written
+        """
+        try:
+            self._tar.close()
+            self._file.close()
+        except OSError as e:
+            self.errors[self.archive_file] = e
+        return self.errors
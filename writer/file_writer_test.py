@@ -0,0 +1,61 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+from writer import file_writer
+from writer.file_writer import FileWriter
+
+
+class TestFileWriter(TestCase):
+
+    def test_errors_are_collected_per_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for workers in (1, 4):
+                paths = [os.path.join(folder, '{}-{}.txt'.format(workers, i)) for i in range(20)]
+                failing = os.path.join(folder, 'missing', 'x.txt')
+                writer = FileWriter(workers, max_in_flight=2)
+                for path in paths[:10] + [failing] + paths[10:]:
+                    writer.submit(path, bytes(path, 'UTF-8'))
+                errors = writer.close()
+                self.assertEqual(list(errors), [failing])
+                for path in paths:
+                    with open(file=path, mode='rb') as f:
+                        self.assertEqual(f.read(), bytes(path, 'UTF-8'))
+
+    def test_in_flight_files_are_bounded(self):
+        lock = threading.Lock()
+        counts = {'current': 0, 'max': 0}
+
+        def slow_write(path: str, data: bytes):
+            with lock:
+                counts['current'] += 1
+                counts['max'] = max(counts['max'], counts['current'])
+            time.sleep(0.01)
+            with lock:
+                counts['current'] -= 1
+            return None
+
+        with patch.object(file_writer, 'write_file', slow_write):
+            writer = FileWriter(workers=8, max_in_flight=3)
+            for i in range(20):
+                writer.submit(str(i), b'')
+            self.assertEqual(writer.close(), {})
+        self.assertLessEqual(counts['max'], 3)
+        self.assertGreater(counts['max'], 1)
+
+    def test_other_exceptions_are_raised_by_close(self):
+        def failing_write(path: str, data: bytes):
+            if path == '3':
+                raise RuntimeError('failed')
+            return PermissionError(path) if path == '5' else None
+
+        with patch.object(file_writer, 'write_file', failing_write):
+            writer = FileWriter(workers=4)
+            for i in range(10):
+                writer.submit(str(i), b'')
+            with self.assertRaisesRegex(RuntimeError, 'failed'):
+                writer.close()
+        self.assertEqual(list(writer.failures), ['3'])
+        self.assertEqual(list(writer.errors), ['5'])
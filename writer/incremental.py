@@ -0,0 +1,123 @@
+"""Incremental conversion for DSV output with a file per image.
+
+A manifest in the output folder stores a hash of the effective config and the conversion options, and a content
+hash of the image record per annotation file. On the next run only files whose record, config or options changed
+are written, and files of images that are no longer part of the input or no longer written are deleted.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from image import Image
+from writer.delimiter_separated_values import annotation_filename
+
+MANIFEST_FILENAME = '.cvdfc-manifest.json'
+# config keys that do not change the content of the written files
+NON_CONTENT_KEYS = ('outputFolder', 'outputFile', 'bufferSize', 'writerWorkers', 'maxInFlight')
+
+
+def content_hash(value) -> str:
+    """Hashes a JSON serializable value independent of the key order."""
+    text = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(text.encode('UTF-8'), digest_size=16).hexdigest()
+
+
+def config_hash(options: dict = None, **kwargs) -> str:
+    """Hashes the config values and the conversion options that influence the content of the written files."""
+    values = {k: v for k, v in kwargs.items() if k not in NON_CONTENT_KEYS}
+    if options:
+        values = {'config': values, 'options': options}
+    return content_hash(values)
+
+
+class Manifest:
+    def __init__(self, output_folder: str, options: dict = None, **kwargs):
+        """Tracks which annotation files of an output folder are up to date.
+
+        :param output_folder: folder with a file per image
+        :param options: conversion options besides the config that change the written files (e.g. label filters)
+        :param kwargs: DSV writer config
+        """
+        if not kwargs.get('filePerImage'):
+            raise ValueError("Incremental conversion requires 'filePerImage'")
+        self.output_folder = Path(output_folder)
+        self.path = self.output_folder / MANIFEST_FILENAME
+        self.config = kwargs
+        self.config_hash = config_hash(options, **kwargs)
+        self.previous = {}  # files of the last run, the ones that are not part of this run are deleted
+        self.config_changed = False  # a changed config makes every file outdated
+        if self.path.is_file():
+            with open(file=self.path, mode='r') as f:
+                manifest = json.load(f)
+            self.previous = manifest.get('files', {})
+            self.config_changed = manifest.get('config') != self.config_hash
+        self.files = {}  # annotation filename -> hash of the image record for this run
+        self.changed = []  # filenames of the records that are written in this run
+        self.reached_writer = None  # filenames of the images that reached the writer, if they are tracked
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def changed_images(self, records: Iterable[dict]) -> Iterator[Image]:
+        """Yields the images whose record changed since the last run, unchanged records are not decoded.
+
+        :param records: image dicts of the standard JSON
+        """
+        for record in self.changed_records(records):
+            yield Image(**record)
+
+    def changed_records(self, records: Iterable[dict]) -> Iterator[dict]:
+        """Yields the image dicts whose content changed since the last run."""
+        for record in records:
+            filename = annotation_filename(record['filename'], **self.config)
+            record_hash = content_hash(record)
+            self.files[filename] = record_hash
+            if not self.config_changed and self.previous.get(filename) == record_hash \
+                    and (self.output_folder / filename).is_file():
+                self.unchanged += 1
+                continue
+            self.changed.append(filename)
+            self.written += 1
+            yield record
+
+    def track_written(self, images: Iterable[Image]) -> Iterator[Image]:
+        """Marks the images that reach the writer, so changed images that a later stage removed get no file.
+
+        :param images: images right before they are written
+        """
+        self.reached_writer = set()
+        return self._track(images)
+
+    def _track(self, images: Iterable[Image]) -> Iterator[Image]:
+        for image in images:
+            self.reached_writer.add(annotation_filename(image.filename, **self.config))
+            yield image
+
+    def finish(self, errors: dict = None) -> None:
+        """Deletes the files of removed images and saves the manifest.
+
+        :param errors: errors by file path of files that could not be written, they are written again next time
+        """
+        if self.reached_writer is not None:
+            for filename in self.changed:
+                if filename not in self.reached_writer:
+                    self.files.pop(filename, None)
+                    self.written -= 1
+        for file_path in errors or {}:
+            self.files.pop(os.path.relpath(file_path, self.output_folder), None)
+        # files of removed images, of images that are no longer written and of the previous config
+        for filename in (self.previous.keys() | set(self.changed)) - self.files.keys():
+            try:
+                os.remove(self.output_folder / filename)
+                self.removed += 1
+            except FileNotFoundError:
+                pass
+        temp_path = self.path.with_suffix('.tmp')
+        with open(file=temp_path, mode='w') as f:
+            json.dump({'config': self.config_hash, 'files': self.files}, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def __str__(self):
+        return '{} written, {} unchanged, {} removed'.format(self.written, self.unchanged, self.removed)
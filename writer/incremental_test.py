@@ -0,0 +1,65 @@
+import os
+import tempfile
+from unittest import TestCase
+from config import load_config
+from writer.delimiter_separated_values import dsv_writer
+from writer.incremental import Manifest
+
+
+def record(filename: str, label: str) -> dict:
+    return {'filename': filename, 'width': 100, 'height': 100, 'annotations': [
+        {'type': 'boundingBox', 'format': 'coco', 'label': label, 'x': 10, 'y': 10, 'width': 20, 'height': 20}]}
+
+
+class TestManifest(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.config = {**load_config('yolo'), 'outputFolder': self.folder.name, 'classMapping': None}
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def run_conversion(self, records: list[dict], config: dict = None, options: dict = None, fail: str = None,
+                       keep=lambda image: True) -> Manifest:
+        config = config or self.config
+        manifest = Manifest(self.folder.name, options, **config)
+        images = manifest.track_written(image for image in manifest.changed_images(records) if keep(image))
+        errors = dsv_writer(images, path='', **config)
+        if fail is not None:
+            errors[os.path.join(self.folder.name, fail)] = OSError('disk full')
+        manifest.finish(errors)
+        return manifest
+
+    def files(self) -> list[str]:
+        return sorted(name for name in os.listdir(self.folder.name) if not name.startswith('.'))
+
+    def test_unchanged_changed_and_deleted(self):
+        self.assertEqual(str(self.run_conversion([record('1.png', 'cat'), record('2.png', 'dog')])),
+                         '2 written, 0 unchanged, 0 removed')
+        manifest = self.run_conversion([record('1.png', 'cat'), record('3.png', 'dog')])
+        self.assertEqual(str(manifest), '1 written, 1 unchanged, 1 removed')
+        self.assertEqual(self.files(), ['1.txt', '3.txt'])
+        manifest = self.run_conversion([record('1.png', 'dog'), record('3.png', 'dog')])
+        self.assertEqual(str(manifest), '1 written, 1 unchanged, 0 removed')
+        with open(file=os.path.join(self.folder.name, '1.txt'), mode='r') as f:
+            self.assertIn('dog', f.read())
+
+    def test_config_and_option_changes(self):
+        self.run_conversion([record('1.png', 'cat'), record('2.png', 'dog'), record('3.png', 'dog')])
+        # changed options rewrite all files, images that are no longer written lose their file
+        manifest = self.run_conversion([record('1.png', 'cat'), record('2.png', 'dog'), record('3.png', 'dog')],
+                                       options={'labels': ['cat']}, keep=lambda image: image.filename == '1.png')
+        self.assertEqual(str(manifest), '1 written, 0 unchanged, 2 removed')
+        self.assertEqual(self.files(), ['1.txt'])
+        # files of the previous config are removed, also the ones of removed images
+        config = {**self.config, 'fileExtension': 'csv'}
+        manifest = self.run_conversion([record('2.png', 'dog')], config=config)
+        self.assertEqual(str(manifest), '1 written, 0 unchanged, 1 removed')
+        self.assertEqual(self.files(), ['2.csv'])
+
+    def test_failed_files_are_written_again(self):
+        self.run_conversion([record('1.png', 'cat'), record('2.png', 'dog')], fail='2.txt')
+        manifest = self.run_conversion([record('1.png', 'cat'), record('2.png', 'dog')])
+        self.assertEqual(str(manifest), '1 written, 1 unchanged, 0 removed')
+        self.assertEqual(self.files(), ['1.txt', '2.txt'])
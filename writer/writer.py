@@ -1,5 +1,78 @@
+"""Writes a stream of images into several outputs in a single pass."""
+from typing import Iterable
 
+from annotation.bounding_box import TransformCache
+from image import Image
 
-if __name__ == '__main__':
-    # TODO: Add subparser args here
-    print()
\ No newline at end of file
+
+def open_writer(path: str = None, **kwargs):
+    """Creates the image writer that is defined by the 'writer' key of the config.
+
+    :param path: folder path of the images for the DSV writer
+    :param kwargs: merged writer config
+    :return: an object with 'write_image(image, transform_cache)' and 'close() -> errors'
+    """
+    writer = kwargs.get('writer', 'dsv')
+    if writer == 'dsv':
+        from writer.delimiter_separated_values import DsvWriter
+        return DsvWriter(path, **kwargs)
+    if writer == 'json':
+        from writer.base_json_writer import BaseJsonImageWriter
+        return BaseJsonImageWriter(**kwargs)
+    raise ValueError("Writer '{}' is not supported".format(writer))
+
+
+def output_path(config: dict) -> str:
+    """Gets the output file, archive or folder of a writer config, used as key of its errors."""
+    if config.get('writer', 'dsv') == 'dsv' and config.get('filePerImage'):
+        return config.get('archiveFile') or config.get('outputFolder')
+    return config.get('outputFile')
+
+
+def close_writer(writer, target: str, errors: dict[str, OSError]) -> None:
+    try:
+        errors.update(writer.close())
+    except OSError as e:
+        errors.setdefault(target, e)
+
+
+def fan_out(images: Iterable[Image], configs: list[dict], path: str = None) -> dict[str, OSError]:
+    """Writes every image to all outputs, the input is only read once.
+
+    Box transformations are cached per image, so every box is transformed only once per format even if
+    several outputs use this format. The undecoded annotations of an image are taken before any output decodes
+    them, so JSON outputs with 'passThroughAnnotations' do not depend on the order of the outputs. An output
+    that cannot be opened or written is stopped and its error is returned, the other outputs are written to
+    the end.
+
+    :param images: images to write
+    :param configs: merged writer configs, one per output
+    :param path: folder path of the images for DSV writers
+    :return: errors of all files that could not be written by path
+    """
+    errors = {}
+    writers = []
+    for config in configs:
+        try:
+            pass_through = config.get('writer') == 'json' and bool(config.get('passThroughAnnotations'))
+            writers.append((output_path(config), open_writer(path, **config), pass_through))
+        except OSError as e:
+            errors[output_path(config)] = e
+    try:
+        for image in images:
+            transform_cache = TransformCache()
+            raw_annotations = image.raw_annotations
+            for target, writer, pass_through in list(writers):
+                try:
+                    if pass_through:
+                        writer.write_image(image, transform_cache, raw_annotations)
+                    else:
+                        writer.write_image(image, transform_cache)
+                except OSError as e:
+                    errors[target] = e
+                    writers.remove((target, writer, pass_through))
+                    close_writer(writer, target, errors)
+    finally:
+        for target, writer, _ in writers:
+            close_writer(writer, target, errors)
+    return errors
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from config import load_config, set_output
+from image import Image
+from writer.writer import fan_out
+
+IMAGES = [{'filename': '{}.png'.format(i), 'width': 640, 'height': 480, 'annotations': [
+    {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat' if j % 2 else 'Dog', 'x': 10 * i, 'y': 20 * j,
+     'width': 30, 'height': 40} for j in range(i % 3)]} for i in range(5)]
+
+
+def read_outputs(folder: str) -> dict[str, bytes]:
+    outputs = {}
+    for root, _, filenames in os.walk(folder):
+        for filename in filenames:
+            with open(file=os.path.join(root, filename), mode='rb') as f:
+                outputs[os.path.relpath(os.path.join(root, filename), folder)] = f.read()
+    return outputs
+
+
+class TestFanOut(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def configs(self, run: str) -> list[dict]:
+        folder = os.path.join(self.folder.name, run)
+        return [set_output({**load_config('yolo'), 'classMapping': None}, os.path.join(folder, 'labels')),
+                set_output(load_config('json'), os.path.join(folder, 'std.json'))]
+
+    def write(self, configs: list[dict]) -> dict:
+        return fan_out((Image(**image) for image in IMAGES), configs, path='')
+
+    def test_targets_equal_single_runs(self):
+        yolo, json = self.configs('single')
+        self.assertEqual(self.write([yolo]), {})
+        self.assertEqual(self.write([json]), {})
+        self.assertEqual(self.write(self.configs('fan_out')), {})
+        single = read_outputs(os.path.join(self.folder.name, 'single'))
+        self.assertEqual(len(single), 6)
+        self.assertEqual(read_outputs(os.path.join(self.folder.name, 'fan_out')), single)
+
+    def test_failing_target_does_not_stop_the_others(self):
+        yolo, json = self.configs('failing')
+        os.makedirs(os.path.dirname(json['outputFile']))
+        blocker = os.path.join(self.folder.name, 'failing', 'file')
+        with open(file=blocker, mode='w'):
+            pass
+        # the parent of the JSON output is a file, so it cannot be opened
+        json = {**json, 'outputFile': os.path.join(blocker, 'std.json')}
+        errors = self.write([json, yolo])
+        self.assertEqual(list(errors), [json['outputFile']])
+        self.assertIsInstance(errors[json['outputFile']], OSError)
+        self.assertEqual(len(os.listdir(yolo['outputFolder'])), 5)
+
+    def test_pass_through_after_dsv_target(self):
+        yolo, json_config = self.configs('pass_through')
+        json_config = {**json_config, 'boundingBox': 'coco', 'passThroughAnnotations': True}
+        box = {'type': 'boundingBox', 'format': 'coco', 'label': 'Cat', 'x': 1, 'y': 2, 'width': 3, 'height': 4,
+               'score': 0.5}
+        images = [Image(filename='a.png', width=10, height=10, annotations=[box])]
+        # the DSV target decodes the annotations before the JSON target writes them
+        self.assertEqual(fan_out(images, [yolo, json_config], path=''), {})
+        with open(file=json_config['outputFile']) as f:
+            self.assertEqual(json.load(f)['images'][0]['annotations'], [box])